@@ -0,0 +1,162 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.utils.annotation_io import FORMAT_V1
+from src.utils.annotation_store import write_annotations
+
+# 保存的合并窗口: 连续编辑停顿 AUTOSAVE_DELAY_MS 后保存，一直有编辑时最迟 AUTOSAVE_MAX_WAIT_MS 保存一次
+AUTOSAVE_DELAY_MS = 800
+AUTOSAVE_MAX_WAIT_MS = 5000
+# 编辑日志压缩的最小间隔 (与保存频率无关；切换数据集 / 关闭时总会压缩)
+JOURNAL_COMPACT_INTERVAL_MS = 30000
+
+
+class SaveJob:
+    """一次保存所需的全部数据 (在 GUI 线程拍快照，之后与界面状态无关)"""
+    __slots__ = ("path", "annotations", "image_names", "quality_map", "version", "journal", "journal_seq", "catalog",
+                 "compact")
+
+    def __init__(self, path, annotations, image_names, quality_map, version=FORMAT_V1, journal=None, journal_seq=0,
+                 catalog=None):
+        self.path = path
+        self.annotations = annotations
+        self.image_names = image_names
+        self.quality_map = quality_map
+        self.version = version      # 文件格式 (FORMAT_V1 / FORMAT_V2)
+        # 写入成功后压缩编辑日志: 删除 seq <= journal_seq 的记录
+        self.journal = journal
+        self.journal_seq = journal_seq
+        # 写入成功后同步到根目录的 Catalog (未启用时为 None)
+        self.catalog = catalog
+        # False 时这次只写主 JSON，日志留到下一次需要压缩的保存
+        self.compact = True
+
+    def write(self):
+        """写主 JSON、压缩日志 (compact 为 True 时)、同步 Catalog"""
+        write_annotations(self.path, self.annotations, self.image_names, self.quality_map, self.version,
+                          self.journal if self.compact else None, self.journal_seq, self.catalog)
+
+
+class AutoSaver(QObject):
+    """
+    后台合并写入的自动保存
+    - mark_dirty() 只置脏标记并重启定时器，连续编辑在 delay_ms 内合并为一次保存；
+      一直有编辑时最迟 max_wait_ms 也会保存一次
+    - 定时器到点时在 GUI 线程调用 snapshot() 拍快照，序列化和写盘在单独的工作线程完成
+    - 写盘期间又有新快照时只保留最新的一份，旧快照直接丢弃
+    - 写文件走临时文件 + os.replace，不会留下写了一半的 JSON
+    - 编辑日志最多每 compact_interval_ms 压缩一次；flush() (切换数据集 / 关闭) 时总会压缩
+    - snapshot() 返回 None (例如有事件缺少 caption) 时保持脏标记，下次编辑或 flush 时重试
+    """
+    # 信号: 保存成功 (文件路径, 完成时间戳)
+    saved = pyqtSignal(str, float)
+    # 信号: 保存失败 (文件路径, 错误信息)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, snapshot, delay_ms=AUTOSAVE_DELAY_MS, max_wait_ms=None, compact_interval_ms=None,
+                 parent=None):
+        """
+        :param snapshot: 无参回调，返回 SaveJob；返回 None 表示当前不能保存 (例如校验未通过)
+        """
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.dirty = False
+        self.max_wait = None if max_wait_ms is None else max_wait_ms / 1000.0
+        self.compact_interval = None if compact_interval_ms is None else compact_interval_ms / 1000.0
+        self._last_compact = time.monotonic()
+        self._uncompacted = None      # 最近一次未压缩日志的保存 (journal, journal_seq)        self._dirty_since = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.save_now)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._running = False
+        self._future = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def mark_dirty(self):
+        now = time.monotonic()
+        if not self.dirty:
+            self.dirty = True
+            self._dirty_since = now
+        if self.max_wait is not None and now - self._dirty_since >= self.max_wait:
+            self.save_now()
+        else:
+            self._timer.start()
+
+    def save_now(self, compact=False):
+        """
+        立即拍快照并交给后台线程 (不等待写完)
+        :param compact: 不论距上次压缩多久，都在写完后压缩编辑日志
+        """
+        self._timer.stop()
+        if not self.dirty: return
+        job = self.snapshot()
+        if job is None: return    # 保持脏标记，之后重试
+        self.dirty = False
+        now = time.monotonic()
+        job.compact = (compact or self.compact_interval is None
+                       or now - self._last_compact >= self.compact_interval)
+        if job.compact: self._last_compact = now
+        with self._lock:
+            self._pending = job
+            if not self._running:
+                self._running = True
+                self._future = self._executor.submit(self._drain)
+
+    def _compact_pending(self):
+        """没有新的修改，但之前的保存跳过了日志压缩: 在后台补做"""
+        with self._lock:
+            pending, self._uncompacted = self._uncompacted, None
+        if pending is None: return
+        journal, seq = pending
+        self._last_compact = time.monotonic()
+        self._future = self._executor.submit(self._compact, journal, seq)
+
+    @staticmethod
+    def _compact(journal, seq):
+        try:
+            journal.compact(seq)
+        except Exception as e:
+            print(f"[Auto-Save] Journal compaction failed: {e}")
+
+    def flush(self):
+        """切换数据集 / 关闭窗口前调用: 保存未写的修改 (并压缩日志)，等待后台写完"""
+        self.save_now(compact=True)
+        self._wait()
+        self._compact_pending()
+        self._wait()
+
+    def _wait(self):
+        future = self._future
+        if future is not None: future.result()
+
+    def wait_idle(self):
+        """丢弃尚未拍快照的脏标记并等待后台写完 (之后由调用方自行同步保存)"""
+        self._timer.stop()
+        self.dirty = False
+        self._wait()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._running = False
+                    return
+            try:
+                job.write()
+                if job.journal is not None:
+                    with self._lock:
+                        self._uncompacted = None if job.compact else (job.journal, job.journal_seq)
+                self.saved.emit(str(job.path), time.time())
+            except Exception as e:
+                print(f"[Auto-Save] Failed: {e}")
+                self.failed.emit(str(job.path), str(e))
+
+    def shutdown(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
@@ -1,6 +1,42 @@
+import math
+from collections import OrderedDict
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtCore import Qt, QRectF, QPointF, pyqtSignal
-from PyQt6.QtGui import QPainter, QPen, QColor, QBrush
+from PyQt6.QtCore import Qt, QRect, QRectF, QPointF, QSizeF, pyqtSignal
+from PyQt6.QtGui import QPainter, QPen, QColor, QBrush, QPixmap, QFont, QFontMetricsF, QStaticText, QRegion
+from src.ui.image_utils import array_to_qimage
+from src.utils.spatial_index import BoxGrid
+
+MAX_TILE_PIXMAPS = 128
+# 已排版标签 (QStaticText) 缓存上限，超过后整体清空
+MAX_LABEL_CACHE = 4096
+# 重绘区域外扩的像素 (线宽 + 抗锯齿余量)
+DIRTY_MARGIN = 4
+# 原始分辨率放大镜: 边长 (屏幕像素)、显示的原始像素数 (奇数，中心像素居中)、与画布边缘的距离
+LOUPE_SIZE = 217
+LOUPE_PIXELS = 31
+LOUPE_MARGIN = 10
+
+
+class BoxOverlay:
+    """一个框的绘制数据: 画笔/画刷/标签都在 set_annotations 时准备好，paintEvent 只负责绘制"""
+    __slots__ = ("rect", "color", "label", "is_sel", "eid", "pen", "brush", "label_bg", "text", "text_w", "text_h")
+
+    def __init__(self, rect, color, label, is_sel, eid, text, text_w, text_h):
+        self.rect = rect
+        self.color = color
+        self.label = label
+        self.is_sel = is_sel
+        self.eid = eid
+        # 线宽按屏幕像素计 (cosmetic)，与缩放无关，可以一直复用
+        pen = QPen(color, 2.0 if is_sel else 1.5, Qt.PenStyle.SolidLine if is_sel else Qt.PenStyle.DashLine)
+        pen.setCosmetic(True)
+        self.pen = pen
+        fill = QColor(color); fill.setAlpha(40 if is_sel else 0)
+        self.brush = QBrush(fill) if is_sel else QBrush(Qt.BrushStyle.NoBrush)
+        self.label_bg = QColor(color); self.label_bg.setAlpha(255 if is_sel else 200)
+        self.text = text
+        self.text_w = text_w
+        self.text_h = text_h
 
 class AnnotationCanvas(QWidget):
     # 信号: rect(Buffer坐标), is_new_creation
@@ -9,6 +45,10 @@ class AnnotationCanvas(QWidget):
     mouse_moved_info = pyqtSignal(int, int)
     # 信号: 选中了某个 Event ID
     event_selected = pyqtSignal(int)
+    # 信号: 左键按下，开始画框 / 移动 / 调整大小
+    edit_started = pyqtSignal()
+    # 信号: 后台瓦片读取完成 (可能从工作线程发出)
+    tiles_ready = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -17,11 +57,31 @@ class AnnotationCanvas(QWidget):
         self.setMouseTracking(True)
         
         self.pixmap = None
+        # pixmap 是否只是低分辨率预览 (正式图像到达后由 set_image 替换)
+        self.preview = False
+        # 缩小版金字塔 (从大到小，每级 1/2)，缩小视图时代替 pixmap 绘制
+        self._mips = []
+        # Buffer 坐标系的逻辑尺寸 (pixmap 可以比它小，绘制时拉伸到该尺寸)
+        self.image_size = QSizeF()
+        # 原图尺寸 (原始像素)，Buffer 被降采样时用于放大镜与原始像素吸附
+        self.native_size = QSizeF()
+        # 画框 / 移动 / 调整大小时把边吸附到原始像素边界
+        self.snap_native = False
+        # 放大镜中心 (Buffer 坐标)，跟随光标或正在移动的框的左上角
+        self.loupe_enabled = False
+        self._loupe_center = None
         self.view_scale = 1.0
         self.view_offset = QPointF(0, 0)
         
         # item结构: (rect, color, label, is_sel, eid)
         self.annotations_to_draw = [] 
+        # 绘制缓存: 按绘制顺序排列的 BoxOverlay (选中的在最后) 与双击命中测试用的网格索引
+        self._overlays = []
+        self._hit_grid = None
+        self._hit_boxes = []    # 建立网格时的框 (只有框的几何变化时才需要重建)
+        self._label_font = QFont(self.font()); self._label_font.setBold(True)
+        self._label_metrics = QFontMetricsF(self._label_font)
+        self._label_cache = {}
         
         self.mode = "IDLE" 
         self.last_mouse_pos = QPointF()
@@ -30,11 +90,70 @@ class AnnotationCanvas(QWidget):
         
         self.active_rect_index = -1    
         self.active_rect_geo = QRectF() 
+        self._move_geo = QRectF()
         
         self.handle_screen_radius = 12 
 
-    def set_image(self, pixmap):
+        # 瓦片引擎 (GeoTIFF 放大时按视口读取原分辨率细节)
+        self.tile_source = None
+        self._tile_pixmaps = OrderedDict()
+        self.tiles_ready.connect(self.update)
+
+    def set_image(self, pixmap, logical_size=None, preview=False, native_size=None):
+        """
+        替换显示的图像；view_scale / view_offset、选中框和进行中的拖动都不受影响
+        (logical_size 不变时，预览图可以直接换成高分辨率图像)
+        :param native_size: 原图尺寸，缺省时与 Buffer 相同
+        """
         self.pixmap = pixmap
+        self.preview = preview
+        self._mips = []
+        if pixmap is None:
+            self.image_size = QSizeF()
+        elif logical_size is not None:
+            self.image_size = QSizeF(*logical_size)
+        else:
+            self.image_size = QSizeF(pixmap.width(), pixmap.height())
+        self.native_size = QSizeF(*native_size) if native_size is not None else QSizeF(self.image_size)
+        self.update()
+
+    def set_mips(self, pixmaps):
+        """设置当前图像的缩小版金字塔 (从大到小)"""
+        self._mips = list(pixmaps)
+        self.update()
+
+    def display_pixmap(self):
+        """按当前缩放选择要绘制的图: 屏幕宽度仍不超过其宽度的最小一级，放大时用原图"""
+        need = self.image_size.width() * self.view_scale
+        best = self.pixmap
+        for pix in self._mips:
+            if pix.width() < need: break
+            best = pix
+        return best
+
+    def set_loupe(self, enabled):
+        self.loupe_enabled = enabled
+        self.update()
+
+    def buf_per_native(self):
+        """
+        一个原始像素在 Buffer 坐标系中的 (宽, 高)
+        Buffer 宽高各自取整，两个方向的比例略有不同，必须分开使用 (与 display_to_image 一致)
+        """
+        nw, nh = self.native_size.width(), self.native_size.height()
+        kx = self.image_size.width() / nw if nw > 0 else 1.0
+        ky = self.image_size.height() / nh if nh > 0 else 1.0
+        return kx, ky
+
+    def snap_point(self, buf_pos):
+        """吸附到最近的原始像素边界 (snap_native 关闭时原样返回)"""
+        if not self.snap_native: return buf_pos
+        kx, ky = self.buf_per_native()
+        return QPointF(round(buf_pos.x() / kx) * kx, round(buf_pos.y() / ky) * ky)
+
+    def set_tile_source(self, engine):
+        self.tile_source = engine
+        self._tile_pixmaps.clear()
         self.update()
 
     def set_annotations(self, annos):
@@ -46,12 +165,40 @@ class AnnotationCanvas(QWidget):
                 self.active_rect_index = i
                 self.active_rect_geo = item[0]
                 break
+
+        # 绘制顺序：先未选中，后选中
+        overlays, selected = [], None
+        for rect, color, label, is_sel, eid in annos:
+            text, text_w, text_h = self.label_layout(label)
+            ov = BoxOverlay(rect, color, label, is_sel, eid, text, text_w, text_h)
+            if is_sel and selected is None: selected = ov
+            else: overlays.append(ov)
+        if selected is not None: overlays.append(selected)
+        self._overlays = overlays
+        # 网格索引在第一次双击时才建立；选中 / 标签变化 (框不变) 时沿用已有网格
+        boxes = [(r.x(), r.y(), r.width(), r.height()) for r, *_ in annos]
+        if boxes != self._hit_boxes:
+            self._hit_boxes = boxes
+            self._hit_grid = None
         self.update()
 
+    def label_layout(self, label):
+        """标签的 QStaticText 与背景尺寸 (按文本缓存，同一事件在各帧上的标签只排版一次)"""
+        cached = self._label_cache.get(label)
+        if cached is None:
+            if len(self._label_cache) >= MAX_LABEL_CACHE: self._label_cache.clear()
+            text = QStaticText(label)
+            text.setTextFormat(Qt.TextFormat.PlainText)
+            text.prepare(font=self._label_font)
+            fm = self._label_metrics
+            cached = (text, fm.horizontalAdvance(label) + 12, fm.height() + 4)
+            self._label_cache[label] = cached
+        return cached
+
     def reset_view(self):
         if not self.pixmap: return
         cw, ch = self.width(), self.height()
-        pw, ph = self.pixmap.width(), self.pixmap.height()
+        pw, ph = self.image_size.width(), self.image_size.height()
         self.view_scale = min(cw/pw, ch/ph) * 0.95
         new_w, new_h = pw * self.view_scale, ph * self.view_scale
         self.view_offset = QPointF((cw - new_w)/2, (ch - new_h)/2)
@@ -60,8 +207,8 @@ class AnnotationCanvas(QWidget):
     def screen_to_buffer(self, pos):
         raw_pos = (pos - self.view_offset) / self.view_scale
         if self.pixmap:
-            w = float(self.pixmap.width())
-            h = float(self.pixmap.height())
+            w = self.image_size.width()
+            h = self.image_size.height()
             x = max(0.0, min(raw_pos.x(), w))
             y = max(0.0, min(raw_pos.y(), h))
             return QPointF(x, y)
@@ -69,7 +216,7 @@ class AnnotationCanvas(QWidget):
 
     def get_img_rect(self):
         if self.pixmap:
-            return QRectF(0, 0, self.pixmap.width(), self.pixmap.height())
+            return QRectF(QPointF(0, 0), self.image_size)
         return QRectF()
 
     def get_resize_handle(self, rect):
@@ -81,6 +228,33 @@ class AnnotationCanvas(QWidget):
                       buffer_radius * 2, 
                       buffer_radius * 2)
 
+    def to_screen(self, rect):
+        """Buffer 坐标矩形 -> 屏幕坐标 (x0, y0, x1, y1)"""
+        k = self.view_scale; ox = self.view_offset.x(); oy = self.view_offset.y()
+        return ox + rect.left() * k, oy + rect.top() * k, ox + rect.right() * k, oy + rect.bottom() * k
+
+    def overlay_screen_rect(self, rect, ov=None):
+        """框 (含标签与手柄) 在屏幕上占据的范围，用于局部重绘"""
+        x0, y0, x1, y1 = self.to_screen(rect)
+        if ov is not None:
+            y0 -= ov.text_h
+            x1 = max(x1, x0 + ov.text_w)
+        if ov is None or ov.is_sel:
+            r = self.handle_screen_radius
+            x1 += r; y1 += r
+        m = DIRTY_MARGIN
+        return QRectF(x0 - m, y0 - m, x1 - x0 + 2 * m, y1 - y0 + 2 * m).toAlignedRect()
+
+    def update_overlay(self, old_rect, new_rect, ov=None):
+        """只重绘框移动前后覆盖的区域"""
+        region = QRegion(self.overlay_screen_rect(old_rect, ov))
+        region = region.united(self.overlay_screen_rect(new_rect, ov))
+        self.update(region)
+
+    def active_overlay(self):
+        if self._overlays and self._overlays[-1].is_sel: return self._overlays[-1]
+        return None
+
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
@@ -88,71 +262,218 @@ class AnnotationCanvas(QWidget):
         if self.pixmap:
             painter.translate(self.view_offset)
             painter.scale(self.view_scale, self.view_scale)
-            painter.drawPixmap(0, 0, self.pixmap)
-
-            inv_scale = 1.0 / self.view_scale
-            
-            # 分离选中和未选中
-            unselected_items = []
-            selected_item = None
-
-            for item in self.annotations_to_draw:
-                if item[3]: # is_sel
-                    selected_item = item
-                else:
-                    unselected_items.append(item)
-            
-            # 绘制顺序：先未选中，后选中
-            draw_queue = unselected_items
-            if selected_item:
-                draw_queue.append(selected_item)
-
-            for rect, color, label, is_sel, eid in draw_queue:
-                draw_rect = self.active_rect_geo if (is_sel and self.mode in ["MOVING", "RESIZING"]) else rect
-                
-                # A. 绘制边框
-                pen_width = 2.0 * inv_scale if is_sel else 1.5 * inv_scale
-                style = Qt.PenStyle.SolidLine if is_sel else Qt.PenStyle.DashLine
-                painter.setPen(QPen(color, pen_width, style))
-                
-                brush = QColor(color); brush.setAlpha(40 if is_sel else 0)
-                painter.setBrush(QBrush(brush))
-                painter.drawRect(draw_rect)
-                
-                # B. 绘制手柄
-                if is_sel:
-                    vis_radius = self.handle_screen_radius * inv_scale
-                    painter.setPen(QPen(Qt.GlobalColor.white, 2 * inv_scale))
-                    painter.setBrush(QBrush(Qt.GlobalColor.cyan))
-                    center = draw_rect.bottomRight()
-                    handle_rect = QRectF(center.x() - vis_radius, center.y() - vis_radius, 
-                                         vis_radius * 2, vis_radius * 2)
-                    painter.drawRect(handle_rect)
-
-                # C. 绘制标签 (防止覆盖逻辑)
-                painter.save()
-                painter.translate(draw_rect.topLeft())
-                painter.scale(inv_scale, inv_scale)
-                
-                font = painter.font(); font.setBold(True); painter.setFont(font)
-                fm = painter.fontMetrics()
-                text_w = fm.horizontalAdvance(label) + 12
-                text_h = fm.height() + 4
-                bg_rect = QRectF(0, -text_h, text_w, text_h)
-                
-                bg_color = QColor(color)
-                bg_color.setAlpha(255 if is_sel else 200) 
-                painter.fillRect(bg_rect, bg_color)
-                
-                painter.setPen(Qt.GlobalColor.black)
-                painter.drawText(bg_rect, Qt.AlignmentFlag.AlignCenter, label)
-                painter.restore()
+            pix = self.display_pixmap()
+            # 金字塔级别只会被缩小绘制，平滑采样代价很小；预览图平滑放大避免马赛克；
+            # 原图保持最近邻 (放大时看清像素)
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, pix is not self.pixmap or self.preview)
+            painter.drawPixmap(self.get_img_rect(), pix, QRectF(pix.rect()))
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+            self.draw_tiles(painter)
+            self.draw_overlays(painter, QRectF(event.rect()))
 
             if self.mode == "DRAWING":
-                painter.setPen(QPen(Qt.GlobalColor.white, 1.0 * inv_scale, Qt.PenStyle.DotLine))
+                pen = QPen(Qt.GlobalColor.white, 1.0, Qt.PenStyle.DotLine); pen.setCosmetic(True)
+                painter.setPen(pen)
                 painter.setBrush(QBrush(QColor(255, 255, 255, 30)))
                 painter.drawRect(self.current_rect)
 
+            if self.loupe_enabled:
+                painter.resetTransform()
+                self.draw_loupe(painter)
+
+    def draw_overlays(self, painter, dirty):
+        """
+        绘制框、手柄和标签 (painter 处于 Buffer 坐标系)
+        - 只画与重绘区域相交的框 (视口外 / 局部重绘区域外的直接跳过)
+        - 框用 cosmetic 画笔直接在 Buffer 坐标系绘制；标签和手柄在屏幕坐标系绘制，不随缩放变形
+        """
+        k = self.view_scale; ox = self.view_offset.x(); oy = self.view_offset.y()
+        left, top, right, bottom = dirty.left(), dirty.top(), dirty.right(), dirty.bottom()
+        r = self.handle_screen_radius
+        buffer_tf = painter.transform()
+        moving = self.mode in ("MOVING", "RESIZING")
+
+        visible = []
+        for ov in self._overlays:
+            rect = self.active_rect_geo if (ov.is_sel and moving) else ov.rect
+            x0 = ox + rect.left() * k; y0 = oy + rect.top() * k
+            x1 = ox + rect.right() * k; y1 = oy + rect.bottom() * k
+            # 范围包括左上角上方的标签和右下角的手柄
+            if max(x1 + r, x0 + ov.text_w) < left or x0 > right or y1 + r < top or y0 - ov.text_h > bottom:
+                continue
+            visible.append((ov, rect, x0, y0, x1, y1))
+
+        for ov, rect, x0, y0, x1, y1 in visible:
+            # A. 绘制边框
+            painter.setTransform(buffer_tf)
+            painter.setPen(ov.pen)
+            painter.setBrush(ov.brush)
+            painter.drawRect(rect)
+
+            painter.resetTransform()
+            # B. 绘制手柄
+            if ov.is_sel:
+                painter.setPen(QPen(Qt.GlobalColor.white, 2))
+                painter.setBrush(QBrush(Qt.GlobalColor.cyan))
+                painter.drawRect(QRectF(x1 - r, y1 - r, r * 2, r * 2))
+
+            # C. 绘制标签 (预先排版的静态文本)
+            bg_rect = QRectF(x0, y0 - ov.text_h, ov.text_w, ov.text_h)
+            painter.fillRect(bg_rect, ov.label_bg)
+            painter.setPen(Qt.GlobalColor.black)
+            painter.setFont(self._label_font)
+            painter.drawStaticText(QPointF(x0 + 6, y0 - ov.text_h + 2), ov.text)
+        painter.setTransform(buffer_tf)
+
+    # === 原始分辨率放大镜 ===
+
+    def loupe_rect(self):
+        """放大镜在屏幕上的位置: 右上角，光标移到它上面时换到左上角"""
+        right = QRect(self.width() - LOUPE_SIZE - LOUPE_MARGIN, LOUPE_MARGIN, LOUPE_SIZE, LOUPE_SIZE)
+        c = self._loupe_center
+        if c is not None and right.contains(QPointF(self.view_offset + c * self.view_scale).toPoint()):
+            return QRect(LOUPE_MARGIN, LOUPE_MARGIN, LOUPE_SIZE, LOUPE_SIZE)
+        return right
+
+    def move_loupe(self, buf_pos):
+        if not self.loupe_enabled: return
+        old = self.loupe_rect()
+        self._loupe_center = buf_pos
+        self.update(QRegion(old).united(self.loupe_rect()))
+
+    def draw_loupe(self, painter):
+        """
+        光标周围 LOUPE_PIXELS x LOUPE_PIXELS 个原始像素 (painter 处于屏幕坐标系)
+        - GeoTIFF 用瓦片引擎第 1 级 (原分辨率) 瓦片: 按窗口读取 + LRU 缓存，未到的瓦片后台读取后重绘
+        - 其他图像用显示缓冲区 (Buffer 未降采样时即原始像素)
+        - 框和正在画的框按原始像素坐标叠加，配合像素网格检查边是否对齐
+        """
+        c = self._loupe_center
+        if c is None or self.native_size.width() <= 0: return
+        kx, ky = self.buf_per_native()
+        box = self.loupe_rect()
+        mag = box.width() / LOUPE_PIXELS
+        half = LOUPE_PIXELS // 2
+        cx, cy = math.floor(c.x() / kx), math.floor(c.y() / ky)
+        x0, y0 = cx - half, cy - half
+        window = QRectF(x0, y0, LOUPE_PIXELS, LOUPE_PIXELS)
+
+        painter.save()
+        painter.setClipRect(box)
+        painter.fillRect(box, QColor(0, 0, 0))
+        # 原始像素坐标 -> 放大镜
+        painter.translate(box.left() - x0 * mag, box.top() - y0 * mag)
+        painter.scale(mag, mag)
+        native = self.draw_loupe_pixels(painter, window)
+
+        grid = QPen(QColor(255, 255, 255, 40), 1.0); grid.setCosmetic(True)
+        painter.setPen(grid)
+        for i in range(LOUPE_PIXELS + 1):
+            painter.drawLine(QPointF(x0 + i, y0), QPointF(x0 + i, y0 + LOUPE_PIXELS))
+            painter.drawLine(QPointF(x0, y0 + i), QPointF(x0 + LOUPE_PIXELS, y0 + i))
+
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        moving = self.mode in ("MOVING", "RESIZING")
+        for ov in self._overlays:
+            rect = self.active_rect_geo if ov.is_sel and moving else ov.rect
+            rect = QRectF(rect.x() / kx, rect.y() / ky, rect.width() / kx, rect.height() / ky)
+            if not rect.adjusted(-1, -1, 1, 1).intersects(window): continue
+            painter.setPen(ov.pen)
+            painter.drawRect(rect)
+        if self.mode == "DRAWING":
+            r = self.current_rect
+            pen = QPen(Qt.GlobalColor.white, 1.0, Qt.PenStyle.DotLine); pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawRect(QRectF(r.x() / kx, r.y() / ky, r.width() / kx, r.height() / ky))
+
+        pen = QPen(QColor(255, 255, 0), 2.0); pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.drawRect(QRectF(cx, cy, 1, 1))
+        painter.restore()
+
+        painter.setPen(QPen(QColor(255, 255, 255), 1.0))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRect(box.adjusted(0, 0, -1, -1))
+        source = "native" if native else "buffer"
+        caption = QRect(box.left() + 1, box.bottom() - int(self._label_metrics.height()) - 3,
+                        box.width() - 2, int(self._label_metrics.height()) + 3)
+        painter.fillRect(caption, QColor(0, 0, 0, 170))
+        painter.setFont(self._label_font)
+        painter.drawText(caption.adjusted(4, 0, -4, 0), Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft,
+                         f"{cx}, {cy} ({source})")
+
+    def draw_loupe_pixels(self, painter, window):
+        """
+        绘制窗口内的原始像素 (painter 处于原始像素坐标系)
+        :return: 是否全部为原分辨率数据 (瓦片还没读到时先用 Buffer 顶替)
+        """
+        nw, nh = self.native_size.width(), self.native_size.height()
+        if self.pixmap:
+            sx, sy = self.pixmap.width() / nw, self.pixmap.height() / nh
+            src = QRectF(window.x() * sx, window.y() * sy, window.width() * sx, window.height() * sy)
+            painter.drawPixmap(window, self.pixmap, src)
+        engine = self.tile_source
+        if engine is None:
+            # 没有瓦片引擎: Buffer 本身就是原分辨率时同样精确
+            return self.pixmap is not None and self.pixmap.width() >= nw
+        keys = engine.tiles_for_region(window.left(), window.top(), window.right(), window.bottom(), 1)
+        missing = []
+        for key in keys:
+            pix = self.tile_pixmap(key)
+            if pix is None:
+                missing.append(key)
+                continue
+            x, y, w, h = engine.tile_rect(key)
+            painter.drawPixmap(QRectF(x, y, w, h), pix, QRectF(pix.rect()))
+        if missing:
+            engine.request(missing, lambda _key: self.tiles_ready.emit())
+        return not missing
+
+    def draw_tiles(self, painter):
+        """在预览图之上叠加视口内的高分辨率瓦片 (painter 已处于 Buffer 坐标系)"""
+        engine = self.tile_source
+        if engine is None or self.image_size.width() <= 0: return
+        # Buffer 宽高各自取整，x / y 的比例分开计算，否则瓦片在 y 方向会与预览错开
+        kx = self.image_size.width() / engine.width
+        ky = self.image_size.height() / engine.height
+        screen_per_orig = self.view_scale * kx
+        # 预览分辨率已经足够时不需要瓦片
+        if screen_per_orig <= engine.preview_per_orig(): return
+
+        top_left = (QPointF(0, 0) - self.view_offset) / self.view_scale
+        visible = QRectF(top_left, QSizeF(self.width(), self.height()) / self.view_scale)
+        visible = visible.intersected(self.get_img_rect())
+        if visible.isEmpty(): return
+
+        level = engine.level_for_scale(screen_per_orig)
+        keys = engine.tiles_for_region(visible.left() / kx, visible.top() / ky,
+                                       visible.right() / kx, visible.bottom() / ky,
+                                       level)
+        missing = []
+        for key in keys:
+            pix = self.tile_pixmap(key)
+            if pix is None:
+                missing.append(key)
+                continue
+            x, y, w, h = engine.tile_rect(key)
+            target = QRectF(x * kx, y * ky, w * kx, h * ky)
+            painter.drawPixmap(target, pix, QRectF(pix.rect()))
+        if missing:
+            engine.request(missing, lambda _key: self.tiles_ready.emit())
+
+    def tile_pixmap(self, key):
+        pix = self._tile_pixmaps.get(key)
+        if pix is not None:
+            self._tile_pixmaps.move_to_end(key)
+            return pix
+        tile = self.tile_source.get_tile(key)
+        if tile is None: return None
+        pix = QPixmap.fromImage(array_to_qimage(tile))
+        self._tile_pixmaps[key] = pix
+        while len(self._tile_pixmaps) > MAX_TILE_PIXMAPS:
+            self._tile_pixmaps.popitem(last=False)
+        return pix
+
     def mousePressEvent(self, event):
         if not self.pixmap: return
         buf_pos = self.screen_to_buffer(event.position())
@@ -164,6 +485,7 @@ class AnnotationCanvas(QWidget):
             return
 
         elif event.button() == Qt.MouseButton.LeftButton:
+            self.edit_started.emit()
             # 1. 检查是否操作【当前已选中】的框 (调整大小 或 移动)
             # 只有当已经是选中状态时，单击才有效
             if self.active_rect_index != -1:
@@ -172,13 +494,16 @@ class AnnotationCanvas(QWidget):
                     self.mode = "RESIZING"; self.start_pos = buf_pos; return
                 # 检查内部
                 if self.active_rect_geo.contains(buf_pos):
-                    self.mode = "MOVING"; self.start_pos = buf_pos; return
+                    self.mode = "MOVING"; self.start_pos = buf_pos
+                    # 未吸附的位置 (吸附时每一步都取整会吃掉小于半个像素的移动)
+                    self._move_geo = QRectF(self.active_rect_geo)
+                    return
 
             # 2. 如果没点中当前选中的框，或者是点在空白处 -> 直接开始 DRAWING
             # 注意：这里不再循环检查其他未选中的框了，因为那个逻辑移到了双击事件里
             self.mode = "DRAWING"
-            self.start_pos = buf_pos
-            self.current_rect = QRectF(buf_pos, buf_pos)
+            self.start_pos = self.snap_point(buf_pos)
+            self.current_rect = QRectF(self.start_pos, self.start_pos)
 
     # === 新增：双击事件 (用于选中) ===
     def mouseDoubleClickEvent(self, event):
@@ -186,16 +511,13 @@ class AnnotationCanvas(QWidget):
         if event.button() == Qt.MouseButton.LeftButton:
             buf_pos = self.screen_to_buffer(event.position())
             
-            # 倒序遍历（优先选中最上层的框）
-            for item in reversed(self.annotations_to_draw):
-                rect = item[0]
-                eid = item[4]
-                if rect.contains(buf_pos):
-                    # 发送选中信号
-                    self.event_selected.emit(eid)
-                    # 可以在这里打印一下调试
-                    # print(f"Double Clicked ID: {eid}")
-                    return
+            # 网格索引查找，命中多个时优先选中最上层 (列表中靠后) 的框
+            if self._hit_grid is None:
+                self._hit_grid = BoxGrid.for_image(self._hit_boxes, self.image_size.width(), self.image_size.height())
+            i = self._hit_grid.top_at(buf_pos.x(), buf_pos.y())
+            if i is not None:
+                # 发送选中信号
+                self.event_selected.emit(self.annotations_to_draw[i][4])
 
    
     def mouseMoveEvent(self, event):
@@ -226,26 +548,34 @@ class AnnotationCanvas(QWidget):
             self.update()
 
         elif self.mode == "DRAWING":
-            raw_rect = QRectF(self.start_pos, buf_pos).normalized()
+            raw_rect = QRectF(self.start_pos, self.snap_point(buf_pos)).normalized()
+            old_rect = self.current_rect
             self.current_rect = raw_rect.intersected(self.get_img_rect())
-            self.update()
+            self.update_overlay(old_rect, self.current_rect)
 
         elif self.mode == "MOVING":
             delta = buf_pos - self.start_pos
-            new_geo = self.active_rect_geo.translated(delta)
+            new_geo = self._move_geo.translated(delta)
             img_rect = self.get_img_rect()
             if new_geo.left() < img_rect.left(): new_geo.moveLeft(img_rect.left())
             if new_geo.top() < img_rect.top(): new_geo.moveTop(img_rect.top())
             if new_geo.right() > img_rect.right(): new_geo.moveRight(img_rect.right())
             if new_geo.bottom() > img_rect.bottom(): new_geo.moveBottom(img_rect.bottom())
+            self._move_geo = QRectF(new_geo)
+            if self.snap_native: new_geo.moveTopLeft(self.snap_point(new_geo.topLeft()))
+            old_geo = self.active_rect_geo
             self.active_rect_geo = new_geo
             self.start_pos = buf_pos 
-            self.update()
+            self.update_overlay(old_geo, new_geo, self.active_overlay())
 
         elif self.mode == "RESIZING":
-            raw_rect = QRectF(self.active_rect_geo.topLeft(), buf_pos).normalized()
+            raw_rect = QRectF(self.active_rect_geo.topLeft(), self.snap_point(buf_pos)).normalized()
+            old_geo = self.active_rect_geo
             self.active_rect_geo = raw_rect.intersected(self.get_img_rect())
-            self.update()
+            self.update_overlay(old_geo, self.active_rect_geo, self.active_overlay())
+
+        # 移动框时看的是框的边，其余情况看光标处
+        self.move_loupe(self.active_rect_geo.topLeft() if self.mode == "MOVING" else buf_pos)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.RightButton:
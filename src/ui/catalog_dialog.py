@@ -0,0 +1,147 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit,
+                             QPushButton, QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView,
+                             QMessageBox)
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+QUERY_DEBOUNCE_MS = 200
+QUERY_LIMIT = 2000
+
+
+class CatalogSync(QObject):
+    """在后台线程增量同步整个根目录的 Catalog (只重新索引标注文件有变化的数据集)"""
+    # 信号: 同步完成 (数据集总数, 实际同步数, 耗时秒)
+    finished = pyqtSignal(int, int, float)
+    # 信号: 进度 (已处理, 总数)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def start(self, catalog, root):
+        self._executor.submit(self._run, catalog, str(root))
+
+    def _run(self, catalog, root):
+        t0 = time.perf_counter()
+        try:
+            total, synced = catalog.sync_root(root, progress=self.progress.emit)
+        except Exception as e:
+            print(f"Catalog Sync Error: {e}")
+            return
+        self.finished.emit(total, synced, time.perf_counter() - t0)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CatalogDialog(QDialog):
+    """
+    跨数据集查询面板: 按类别 / 质量 / 数据集 / 帧文件名 / caption 关键字过滤
+    双击结果发出 event_activated(数据集路径, 事件 ID)
+    """
+    event_activated = pyqtSignal(str, int)
+
+    def __init__(self, parent, catalog):
+        super().__init__(parent)
+        self.setWindowTitle("标注目录查询 (Catalog Query)")
+        self.resize(1000, 600)
+        self.catalog = catalog
+        self.rows = []
+
+        layout = QVBoxLayout(self)
+        bar = QHBoxLayout()
+        self.combo_cat = QComboBox()
+        self.combo_cat.addItem("全部类别 (All)", None)
+        for cat in catalog.categories():
+            self.combo_cat.addItem(cat, cat)
+        self.combo_quality = QComboBox()
+        self.combo_quality.addItem("全部质量 (All)", None)
+        self.combo_quality.addItem("✅ good", "good")
+        self.combo_quality.addItem("❌ bad", "bad")
+        self.edit_text = QLineEdit()
+        self.edit_text.setPlaceholderText("Caption 关键字 (Full-text)")
+        self.edit_dataset = QLineEdit()
+        self.edit_dataset.setPlaceholderText("数据集名 (Dataset)")
+        self.edit_frame = QLineEdit()
+        self.edit_frame.setPlaceholderText("帧文件名 (Frame)")
+        for w in (self.combo_cat, self.combo_quality, self.edit_text, self.edit_dataset, self.edit_frame):
+            bar.addWidget(w)
+        btn_stats = QPushButton("📊 按类别统计 (Stats)")
+        btn_stats.clicked.connect(self.show_stats)
+        bar.addWidget(btn_stats)
+        layout.addLayout(bar)
+
+        self.table = QTableWidget(0, 7)
+        self.table.setHorizontalHeaderLabels(["Dataset", "ID", "Category", "Caption", "QC", "Frames", "First Frame"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.cellDoubleClicked.connect(self.on_double_clicked)
+        layout.addWidget(self.table)
+
+        self.lbl_result = QLabel("")
+        layout.addWidget(self.lbl_result)
+
+        # 输入停顿后再查询，避免每个按键都查一次
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(QUERY_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.run_query)
+        self.combo_cat.currentIndexChanged.connect(self.run_query)
+        self.combo_quality.currentIndexChanged.connect(self.run_query)
+        for edit in (self.edit_text, self.edit_dataset, self.edit_frame):
+            edit.textChanged.connect(lambda _: self._debounce.start())
+
+        self.run_query()
+
+    def filters(self):
+        return {
+            "category": self.combo_cat.currentData(),
+            "quality": self.combo_quality.currentData(),
+            "text": self.edit_text.text().strip() or None,
+            "dataset": self.edit_dataset.text().strip() or None,
+            "frame": self.edit_frame.text().strip() or None,
+        }
+
+    def run_query(self):
+        filters = self.filters()
+        t0 = time.perf_counter()
+        try:
+            self.rows = self.catalog.query(limit=QUERY_LIMIT, **filters)
+            total = self.catalog.count(**filters)
+        except Exception as e:
+            self.lbl_result.setText(f"⚠️ Query failed: {e}")
+            return
+        elapsed = (time.perf_counter() - t0) * 1000
+
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(self.rows))
+        for r, row in enumerate(self.rows):
+            qc = "❌ " + (row["reject_reason"] or "") if row["quality_status"] == "bad" else "✅"
+            frames = "" if row["first_frame"] is None else \
+                f"{row['first_frame'] + 1}-{row['last_frame'] + 1} ({row['frame_count']})"
+            values = [row["dataset"], str(row["eid"]), row["category"], row["caption"], qc, frames,
+                      row["first_name"] or ""]
+            for c, value in enumerate(values):
+                self.table.setItem(r, c, QTableWidgetItem(value))
+        self.table.setUpdatesEnabled(True)
+
+        shown = f" (showing first {len(self.rows)})" if total > len(self.rows) else ""
+        self.lbl_result.setText(f"{total} events{shown} · {elapsed:.1f} ms")
+
+    def show_stats(self):
+        filters = self.filters()
+        filters.pop("category")
+        t0 = time.perf_counter()
+        groups = self.catalog.count(group_by="category", **filters)
+        elapsed = (time.perf_counter() - t0) * 1000
+        text = "\n".join(f"{cat}: {n}" for cat, n in groups) or "No events."
+        self.lbl_result.setText(f"{len(groups)} categories · {elapsed:.1f} ms")
+        QMessageBox.information(self, "Catalog Stats", text)
+
+    def on_double_clicked(self, r, _c):
+        if 0 <= r < len(self.rows):
+            row = self.rows[r]
+            self.event_activated.emit(row["folder"], row["eid"])
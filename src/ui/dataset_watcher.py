@@ -0,0 +1,160 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from src.utils import dataset_scanner
+from src.utils.manifest import DatasetManifest
+
+CHANGE_DEBOUNCE_MS = 500
+POLL_INTERVAL_MS = 10000
+
+
+class DatasetWatcher(QObject):
+    """
+    监视根目录与打开过的数据集文件夹
+    - QFileSystemWatcher (inotify 等) 负责即时通知，定时轮询目录 mtime 兜底 (网络盘上 inotify 通常无效)
+    - 通知先合并 CHANGE_DEBOUNCE_MS，再在工作线程中增量刷新清单 (DatasetManifest)，
+      只有帧列表真的变化时才发出 dataset_changed；自己写标注文件引起的目录变化会被忽略
+    - 根目录变化时检查新出现的数据集文件夹
+    - 开始监视数据集时在同一个工作线程里补读清单中缺少的文件头 (GUI 线程打开数据集时不读文件头)
+    """
+    # 信号: 数据集帧列表变化 (文件夹路径, 新的 DatasetManifest)
+    dataset_changed = pyqtSignal(str, object)
+    # 信号: 根目录下出现新的数据集 (路径, 是否已有标注文件)
+    folder_added = pyqtSignal(str, bool)
+    # 信号: 清单的文件头已补齐 (文件夹路径, 新的 DatasetManifest)
+    headers_ready = pyqtSignal(str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = None
+        self._lock = threading.Lock()
+        self._orders = {}         # 数据集 -> 已知的帧列表 (tuple)
+        self._folders = set()     # 根目录下已知的数据集
+        self._mtimes = {}         # 被监视目录 -> 上次看到的 mtime (轮询用)
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._fs = QFileSystemWatcher(self)
+        self._fs.directoryChanged.connect(self._on_directory_changed)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(CHANGE_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._flush_pending)
+        self._poll = QTimer(self)
+        self._poll.setInterval(POLL_INTERVAL_MS)
+        self._poll.timeout.connect(lambda: self._executor.submit(self._poll_mtimes))
+
+    # === GUI 线程接口 ===
+
+    def set_root(self, root):
+        """打开新的根目录: 清空之前的监视"""
+        dirs = self._fs.directories()
+        if dirs: self._fs.removePaths(dirs)
+        with self._lock:
+            self._orders = {}
+            self._folders = set()
+            self._mtimes = {}
+        self._pending.clear()
+        self.root = str(root)
+        self._add_path(self.root)
+        self._poll.start()
+
+    def add_folder(self, folder):
+        """扫描发现的数据集 (根目录变化时据此判断哪些是新文件夹)"""
+        with self._lock:
+            self._folders.add(str(folder))
+
+    def watch(self, folder, order):
+        """打开数据集后开始监视，order 为当前显示的帧文件名列表"""
+        folder = str(folder)
+        with self._lock:
+            self._orders[folder] = tuple(order)
+        self._add_path(folder)
+        self._executor.submit(self._fill_headers, folder)
+
+    def _add_path(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            self._mtimes[path] = mtime
+        if path not in self._fs.directories():
+            self._fs.addPath(path)
+
+    def _on_directory_changed(self, path):
+        self._pending.add(path)
+        self._debounce.start()
+
+    def _flush_pending(self):
+        paths, self._pending = self._pending, set()
+        for path in paths:
+            self._executor.submit(self._check, path)
+
+    # === 工作线程 ===
+
+    def _poll_mtimes(self):
+        with self._lock:
+            watched = list(self._mtimes.items())
+        for path, old in watched:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime != old:
+                self._check(path)
+
+    def _check(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            self._mtimes[path] = mtime
+            is_dataset = path in self._orders
+            is_root = path == self.root and path not in self._folders
+        try:
+            if is_dataset: self._check_dataset(path)
+            if is_root: self._check_root()
+        except Exception as e:
+            print(f"Watcher Error ({path}): {e}")
+
+    def _check_root(self):
+        with self._lock:
+            known = set(self._folders)
+        for d in dataset_scanner.list_subdirs(self.root):
+            if str(d) in known: continue
+            info = dataset_scanner.scan_folder(d)
+            if not info.has_images: continue
+            with self._lock:
+                self._folders.add(str(d))
+            self.folder_added.emit(str(d), info.has_json)
+
+    def _fill_headers(self, folder):
+        try:
+            manifest = DatasetManifest.load(folder)
+            if manifest.fill_headers():
+                self.headers_ready.emit(folder, manifest)
+        except Exception as e:
+            print(f"Watcher Error ({folder}): {e}")
+
+    def _check_dataset(self, folder):
+        with self._lock:
+            old = self._orders.get(folder)
+        if old is None: return
+        # 图片文件名集合没变 (自动保存的标注 JSON / 编辑日志 / 缓存目录引起的通知): 不重扫、不写清单
+        names = {e.name for e in dataset_scanner.scan_images(folder)}
+        if names == set(old): return
+        manifest = DatasetManifest.load_or_build(folder)
+        order = tuple(manifest.order)
+        if order == old: return
+        with self._lock:
+            self._orders[folder] = order
+        self.dataset_changed.emit(folder, manifest)
+
+    def shutdown(self):
+        self._poll.stop()
+        self._debounce.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QBrush, QColor
+
+
+class EventListModel(QAbstractListModel):
+    """
+    事件列表模型: 每行对应一个 Event ID
+    - 行 <-> ID 直接映射，不再解析文字
+    - 显示文字按事件缓存，只有被修改的事件才重新格式化帧区间
+    """
+    EventIdRole = Qt.ItemDataRole.UserRole + 1
+    CategoryRole = Qt.ItemDataRole.UserRole + 2
+    QualityRole = Qt.ItemDataRole.UserRole + 3
+    StartFrameRole = Qt.ItemDataRole.UserRole + 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.annotations = {}
+        self.ids = []          # 行号 -> eid (按 ID 升序)
+        self._text = {}        # eid -> 缓存的显示文字
+        self._start = {}       # eid -> 起始帧 (排序用)
+
+    # === 数据同步 ===
+
+    def reset(self, annotations):
+        self.beginResetModel()
+        self.annotations = annotations
+        self.ids = sorted(annotations.keys())
+        self._text = {}
+        self._start = {}
+        for eid in self.ids: self._cache(eid)
+        self.endResetModel()
+
+    def _cache(self, eid):
+        ev = self.annotations[eid]
+        text = f"ID {eid}: {ev.category} [{ev.frames.format()}]"
+        # 如果是 bad，增加标记
+        if ev.is_bad:
+            text += " ❌"
+        self._text[eid] = text
+        first = ev.frames.first()
+        self._start[eid] = -1 if first is None else first
+
+    def event_changed(self, eid):
+        """新增或修改了一个事件，只刷新这一行"""
+        if eid not in self.annotations:
+            self.event_removed(eid)
+            return
+        row = self.row_for_id(eid)
+        if row == -1:
+            row = self._insert_pos(eid)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.ids.insert(row, eid)
+            self._cache(eid)
+            self.endInsertRows()
+        else:
+            self._cache(eid)
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+    def event_removed(self, eid):
+        row = self.row_for_id(eid)
+        if row == -1: return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        self._text.pop(eid, None)
+        self._start.pop(eid, None)
+        self.endRemoveRows()
+
+    def _insert_pos(self, eid):
+        lo, hi = 0, len(self.ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ids[mid] < eid: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def row_for_id(self, eid):
+        row = self._insert_pos(eid)
+        return row if row < len(self.ids) and self.ids[row] == eid else -1
+
+    def id_for_row(self, row):
+        return self.ids[row] if 0 <= row < len(self.ids) else None
+
+    # === Qt 接口 ===
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        eid = self.ids[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._text[eid]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            # 如果是 bad，标红
+            if self.annotations[eid].is_bad:
+                return QBrush(QColor("red"))
+            return None
+        if role == self.EventIdRole:
+            return eid
+        if role == self.CategoryRole:
+            return self.annotations[eid].category
+        if role == self.QualityRole:
+            return self.annotations[eid].quality_status
+        if role == self.StartFrameRole:
+            return self._start[eid]
+        return None
+
+
+class EventFilterProxy(QSortFilterProxyModel):
+    """按类别 / 质检状态过滤，按 ID / 类别 / 起始帧排序 (不重建源模型)"""
+    SORT_ROLES = {
+        "id": EventListModel.EventIdRole,
+        "category": EventListModel.CategoryRole,
+        "start": EventListModel.StartFrameRole,
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.category = None   # None = 全部
+        self.quality = None    # None / "good" / "bad"
+        self.setDynamicSortFilter(True)
+        self.setSortRole(EventListModel.EventIdRole)
+
+    def set_category(self, category):
+        self.category = category or None
+        self.invalidateFilter()
+
+    def set_quality(self, quality):
+        self.quality = quality or None
+        self.invalidateFilter()
+
+    def set_sort_key(self, key):
+        self.setSortRole(self.SORT_ROLES.get(key, EventListModel.EventIdRole))
+        self.sort(0)
+
+    def filterAcceptsRow(self, row, parent):
+        src = self.sourceModel()
+        idx = src.index(row, 0, parent)
+        if self.category and src.data(idx, EventListModel.CategoryRole) != self.category:
+            return False
+        if self.quality and src.data(idx, EventListModel.QualityRole) != self.quality:
+            return False
+        return True
+
+    def lessThan(self, left, right):
+        src = self.sourceModel()
+        role = self.sortRole()
+        a, b = src.data(left, role), src.data(right, role)
+        if a == b:
+            return src.data(left, EventListModel.EventIdRole) < src.data(right, EventListModel.EventIdRole)
+        return a < b
+
+    def id_for_index(self, index):
+        if not index.isValid(): return None
+        return self.data(index, EventListModel.EventIdRole)
+
+    def index_for_id(self, eid):
+        row = self.sourceModel().row_for_id(eid)
+        if row == -1: return QModelIndex()
+        return self.mapFromSource(self.sourceModel().index(row))
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src.utils import dataset_scanner
+
+
+class FolderScanner(QObject):
+    """
+    后台扫描根目录下的数据集，发现一个就发出一个 (不等全部扫描完)
+    - 每次 start() 生成新的 generation，旧扫描的结果被丢弃并尽快停止
+    """
+    # 信号: 发现数据集 (generation, 路径, 是否为根目录本身, 是否已有标注文件)
+    folder_found = pyqtSignal(int, str, bool, bool)
+    # 信号: 扫描结束 (generation, 数据集数量)
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def start(self, root):
+        self._generation += 1
+        gen = self._generation
+        self._executor.submit(self._scan, gen, str(root))
+        return gen
+
+    def cancel(self):
+        self._generation += 1
+
+    def _scan(self, gen, root):
+        count = 0
+        try:
+            for info in dataset_scanner.iter_datasets(root, cancelled=lambda: not self.is_current(gen)):
+                is_root = str(info.path) == root
+                count += 1
+                self.folder_found.emit(gen, str(info.path), is_root, info.has_json)
+        except Exception as e:
+            print(f"Scan Error: {e}")
+        if self.is_current(gen):
+            self.finished.emit(gen, count)
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
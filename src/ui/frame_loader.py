@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from src.utils.mipmap import build_mip_levels
+from src.utils.tile_engine import TileEngine
+from src.ui.image_utils import array_to_qimage
+
+
+class LoadResult:
+    """后台加载完成的一帧 (QImage 已在工作线程构建，QPixmap 需在 GUI 线程生成)"""
+    __slots__ = ("generation", "index", "path", "qimage", "buffer", "engine", "orig_size", "preview")
+
+    def __init__(self, generation, index, path, preview=False):
+        self.generation = generation
+        self.index = index
+        self.path = path
+        self.qimage = None
+        self.buffer = None      # QImage 引用的内存，需与 QImage 同生命周期
+        self.engine = None
+        self.orig_size = (0, 0)
+        self.preview = preview  # True: 低分辨率预览，同一 generation 之后还会发出正式结果
+
+
+class AsyncFrameLoader(QObject):
+    """
+    GUI 线程之外的帧加载器
+    - 每次 request() 生成新的 generation，旧请求即被视为取消
+    - 单工作线程按顺序处理，过期请求在解码前/后都会被直接丢弃，
+      因此按住方向键快速拖动时只有最后一帧会被完整解码并显示
+    - 整帧不在内存缓存中时，先发出一次低分辨率预览 (preview=True)，再发出正式结果
+    """
+    # 信号: 加载完成 (LoadResult)，只会为最新的请求发出
+    frame_loaded = pyqtSignal(object)
+
+    def __init__(self, prefetcher, parent=None):
+        super().__init__(parent)
+        self.prefetcher = prefetcher
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def request(self, index, path):
+        self._generation += 1
+        gen = self._generation
+        self._executor.submit(self._load, gen, index, str(path))
+        return gen
+
+    def cancel(self):
+        self._generation += 1
+
+    def _load(self, gen, index, path):
+        if not self.is_current(gen): return
+        self._emit_preview(gen, index, path)
+        if not self.is_current(gen): return
+        result = LoadResult(gen, index, path)
+        try:
+            frame = self.prefetcher.load(path)
+            if not self.is_current(gen): return
+            if frame is not None:
+                result.orig_size = frame.orig_size
+                # 直接引用解码数组的内存，不再 tobytes 拷贝
+                result.buffer = frame.image
+                result.qimage = array_to_qimage(frame.image)
+                if frame.stretch is not None:
+                    result.engine = TileEngine(path, preview=(frame.image, frame.stretch))
+        except Exception as e:
+            print(f"Frame Load Error: {e}")
+
+        if not self.is_current(gen):
+            if result.engine is not None: result.engine.close()
+            return
+        # 解码失败时 qimage 为空，仍然通知 GUI 以便结束进度提示
+        self.frame_loaded.emit(result)
+
+    def _emit_preview(self, gen, index, path):
+        try:
+            thumb = self.prefetcher.preview(path)
+        except Exception as e:
+            print(f"Preview Error: {e}")
+            return
+        if thumb is None or not self.is_current(gen): return
+        result = LoadResult(gen, index, path, preview=True)
+        result.orig_size = thumb.orig_size
+        result.buffer = thumb.image
+        result.qimage = array_to_qimage(thumb.image)
+        self.frame_loaded.emit(result)
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MipBuilder(QObject):
+    """
+    在工作线程为当前帧建立缩小版金字塔 (每级 1/2)，缩小视图时绘制尺寸最接近的级别
+    - 与 AsyncFrameLoader 相同的 generation 机制: 新请求 / cancel() 使旧任务作废，
+      旧任务在每一级之间检查并尽早退出
+    - QImage 在工作线程转成 RGB32，GUI 线程 QPixmap.fromImage 几乎不需要再转换
+    """
+    # 信号: 金字塔完成 (generation, [QImage, ...] 从大到小)
+    mips_ready = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def request(self, image):
+        self._generation += 1
+        gen = self._generation
+        self._executor.submit(self._build, gen, image)
+        return gen
+
+    def cancel(self):
+        self._generation += 1
+
+    def _build(self, gen, image):
+        if not self.is_current(gen): return
+        try:
+            levels = build_mip_levels(image, cancelled=lambda: not self.is_current(gen))
+            images = [array_to_qimage(level).convertToFormat(QImage.Format.Format_RGB32) for level in levels]
+        except Exception as e:
+            print(f"Mipmap Error: {e}")
+            return
+        if images and self.is_current(gen):
+            self.mips_ready.emit(gen, images)
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
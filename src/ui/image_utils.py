@@ -0,0 +1,14 @@
+from PyQt6.QtGui import QImage
+
+
+def array_to_qimage(img_data):
+    """
+    把 (H, W, C) uint8 数组直接包装成 QImage (不经过 tobytes 拷贝)
+    C=1 使用 Grayscale8，C=3 使用 RGB888
+    注意: QImage 引用数组内存，调用方需保证数组在 QImage 使用期间存活
+    """
+    if not img_data.flags['C_CONTIGUOUS']:
+        raise ValueError("array_to_qimage expects a C-contiguous array")
+    h, w, c = img_data.shape
+    fmt = QImage.Format.Format_Grayscale8 if c == 1 else QImage.Format.Format_RGB888
+    return QImage(img_data.data, w, h, img_data.strides[0], fmt)
@@ -1,16 +1,34 @@
 import json
-import re
+from bisect import bisect_left
+from collections import Counter
+import time
 from pathlib import Path
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QFileDialog, QListWidget, 
+                             QPushButton, QLabel, QFileDialog, QListWidget, QListView, 
                              QInputDialog, QMessageBox, QSplitter, QMenu, 
-                             QScrollArea, QProgressBar, QApplication, 
+                             QProgressBar, QApplication, 
                              QListWidgetItem, QAbstractItemView, QGroupBox, 
-                             QRadioButton, QButtonGroup, QComboBox)
-from PyQt6.QtCore import Qt, QRectF, QTime
-from PyQt6.QtGui import QAction, QColor, QImage, QPixmap, QIcon, QBrush
+                             QRadioButton, QButtonGroup, QComboBox, QSpinBox, QCheckBox)
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QAction, QColor, QPixmap, QIcon, QBrush
 
 from src.utils.image_loader import ImageLoader
+from src.utils.frame_cache import FramePrefetcher
+from src.utils.disk_cache import DiskFrameCache, CACHE_DIR_NAME
+from src.utils import dataset_scanner
+from src.utils.manifest import DatasetManifest
+from src.utils.annotation_store import AnnotationStore, clamp_box, display_to_image, snap_box
+from src.ui.frame_loader import AsyncFrameLoader, MipBuilder
+from src.ui.playback import TimelapsePlayer
+from src.ui.timeline import FrameTimeline
+from src.ui.folder_scanner import FolderScanner
+from src.ui.dataset_watcher import DatasetWatcher
+from src.ui.event_model import EventListModel, EventFilterProxy
+from src.ui.catalog_dialog import CatalogDialog, CatalogSync
+from src.ui.autosave import (AutoSaver, SaveJob, AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_WAIT_MS,
+                             JOURNAL_COMPACT_INTERVAL_MS)
+from src.utils.annotation_io import FORMAT_V2
+from src.utils.catalog import Catalog, CATALOG_NAME
 from src.utils.config_manager import ConfigManager
 from src.ui.canvas import AnnotationCanvas
 from src.ui.batch_dialog import BatchDialog
@@ -29,13 +47,14 @@ class MainWindow(QMainWindow):
         self.current_folder_path = None 
         
         self.image_paths = []
-        self.image_map = {} 
+        self.manifest = None    # 当前数据集的元数据清单 (文件列表 + 栅格头信息)
         self.current_idx = 0
         
-        # 1. 事件数据 (内存中)
-        self.annotations = {}
-        # 2. 质量数据
-        self.quality_map = {} 
+        # 标注数据 (事件 / 逐帧质量 / 帧 -> 事件索引 / 编辑日志)，所有编辑都通过 store 完成
+        self.store = AnnotationStore()
+        # 类别筛选下拉框的引用计数: 编辑单个事件时按增减更新，不再遍历全部事件
+        self._event_cats = {}         # eid -> 类别
+        self._cat_counts = Counter()  # 类别 -> 事件数
         
         self.current_event_id = None
         
@@ -43,6 +62,45 @@ class MainWindow(QMainWindow):
         self.original_size = (1, 1) # (w, h)
         self.current_pixmap_size = (1, 1) # (w, h)
         self.downsample_ratio = 1.0
+        # 当前帧的瓦片引擎 (仅 GeoTIFF)
+        self.tile_engine = None
+        # 相邻帧后台预取 + 解码帧 LRU 缓存
+        self.prefetcher = FramePrefetcher()
+        # 后台帧加载 (带 generation 取消机制)
+        self.frame_loader = AsyncFrameLoader(self.prefetcher, self)
+        self.frame_loader.frame_loaded.connect(self.on_frame_loaded)
+        # 当前显示的是哪次加载的低分辨率预览 (None: 没有预览在等待替换)
+        self.preview_generation = None
+        # 当前帧的缩小版金字塔 (缩小视图时绘制)
+        self.mip_builder = MipBuilder(self)
+        self.mip_builder.mips_ready.connect(self.on_mips_ready)
+        # 延时播放 (按 FPS 循环播放，解码跟不上时丢帧)
+        self.player = TimelapsePlayer(self.prefetcher, self)
+        self.player.frame_ready.connect(self.on_playback_frame)
+        self.player.stats.connect(self.on_playback_stats)
+        # 自动保存: 编辑只置脏标记，合并后在后台线程原子写入主 JSON 并压缩日志
+        self.autosaver = AutoSaver(lambda: self.make_save_job(silent=True),
+                                   delay_ms=AUTOSAVE_DELAY_MS, max_wait_ms=AUTOSAVE_MAX_WAIT_MS,
+                                   compact_interval_ms=JOURNAL_COMPACT_INTERVAL_MS, parent=self)
+        self.autosaver.saved.connect(self.on_saved)
+        self.autosaver.failed.connect(self.on_save_failed)
+        self.last_saved_at = None
+        # 后台扫描根目录，发现数据集即加入列表
+        self.folder_scanner = FolderScanner(self)
+        self.folder_scanner.folder_found.connect(self.on_folder_found)
+        self.folder_scanner.finished.connect(self.on_scan_finished)
+        # 监视根目录与打开过的数据集: 新帧增量插入时间轴，其他数据集标记为有变化
+        self.watcher = DatasetWatcher(self)
+        self.watcher.dataset_changed.connect(self.on_dataset_changed)
+        self.watcher.folder_added.connect(self.on_folder_added)
+        self.watcher.headers_ready.connect(self.on_headers_ready)
+        self.folder_names = []      # 列表中的数据集名 (有序，用于按名称插入)
+        self.folder_items = {}      # 路径 -> QListWidgetItem
+        # 根目录下的全局标注目录 (SQLite，可选): 保存时同步当前数据集，打开根目录时后台增量同步全部数据集
+        self.catalog = None
+        self.catalog_sync = CatalogSync(self)
+        self.catalog_sync.progress.connect(lambda done, total: self.lbl_status.setText(f"Catalog: {done}/{total}"))
+        self.catalog_sync.finished.connect(self.on_catalog_synced)
         
         self.config = ConfigManager()
 
@@ -53,6 +111,20 @@ class MainWindow(QMainWindow):
         self.init_ui()
         self.setup_shortcuts()
 
+    # === 标注数据的快捷访问 (只读，数据本身在 self.store 中) ===
+
+    @property
+    def annotations(self): return self.store.annotations
+
+    @property
+    def quality_map(self): return self.store.quality_map
+
+    @property
+    def image_map(self): return self.store.image_map
+
+    @property
+    def frame_index(self): return self.store.frame_index
+
     def setup_shortcuts(self):
         # 上一张：左箭头 或 上箭头
         QShortcut(QKeySequence(Qt.Key.Key_Left), self).activated.connect(self.prev_frame)
@@ -63,6 +135,19 @@ class MainWindow(QMainWindow):
         QShortcut(QKeySequence(Qt.Key.Key_Down), self).activated.connect(self.next_frame)
 
 
+    def closeEvent(self, event):
+        self.watcher.shutdown()
+        self.folder_scanner.shutdown()
+        self.catalog_sync.shutdown()
+        self.autosaver.shutdown()
+        self.store.close()
+        self.player.shutdown()
+        self.frame_loader.shutdown()
+        self.mip_builder.shutdown()
+        self.prefetcher.shutdown()
+        self.set_tile_engine(None)
+        super().closeEvent(event)
+
     def load_error_config(self):
         """读取 config/error_reasons.json"""
         try:
@@ -86,6 +171,92 @@ class MainWindow(QMainWindow):
         act_cats.triggered.connect(lambda: CategoryManagerDialog(self, self.config).exec())
         settings_menu.addAction(act_cats)
 
+        act_quality = QAction("高质量缩放 JPEG/PNG (LANCZOS, 较慢)", self)
+        act_quality.setCheckable(True)
+        act_quality.setChecked(ImageLoader.high_quality)
+        act_quality.toggled.connect(self.set_high_quality_resample)
+        settings_menu.addAction(act_quality)
+
+        self.act_disk_cache = QAction("启用磁盘帧缓存 (Disk Frame Cache)", self)
+        self.act_disk_cache.setCheckable(True)
+        self.act_disk_cache.setToolTip(f"解码结果缓存到数据集下的 {CACHE_DIR_NAME} 目录，再次打开时直接 mmap 读取")
+        self.act_disk_cache.toggled.connect(lambda _: self.update_disk_cache())
+        settings_menu.addAction(self.act_disk_cache)
+
+        self.act_compact_format = QAction("紧凑标注格式 v2 (Compact JSON)", self)
+        self.act_compact_format.setCheckable(True)
+        self.act_compact_format.setToolTip("帧表只写一次、事件帧按区间保存、只记录劣质帧，不缩进；"
+                                           "可用 python -m tools.convert_annotations 批量转换")
+        self.act_compact_format.toggled.connect(lambda _: self.save_all(silent=True))
+        settings_menu.addAction(self.act_compact_format)
+
+        settings_menu.addSeparator()
+        self.act_catalog = QAction("启用全局标注目录 (Catalog)", self)
+        self.act_catalog.setCheckable(True)
+        self.act_catalog.setToolTip(f"在根目录下维护 {CATALOG_NAME}，索引所有数据集的事件/帧/类别/caption/质量，"
+                                    "可跨数据集查询；也可用 python -m tools.catalog 在命令行查询")
+        self.act_catalog.toggled.connect(lambda _: self.update_catalog())
+        settings_menu.addAction(self.act_catalog)
+
+        act_query = QAction("查询标注目录 (Query Catalog)...", self)
+        act_query.triggered.connect(self.open_catalog_query)
+        settings_menu.addAction(act_query)
+
+    # === 全局标注目录 (Catalog) ===
+
+    def update_catalog(self):
+        """按设置与当前根目录启用/关闭 Catalog；启用时在后台增量同步全部数据集"""
+        self.catalog = None
+        if not self.act_catalog.isChecked() or self.root_dir is None: return
+        try:
+            self.catalog = Catalog.for_root(self.root_dir)
+        except Exception as e:
+            print(f"[Catalog] Disabled: {e}")
+            return
+        self.catalog_sync.start(self.catalog, self.root_dir)
+
+    def on_catalog_synced(self, total, synced, elapsed):
+        self.lbl_status.setText(f"Catalog synced: {synced}/{total} datasets updated in {elapsed:.1f}s")
+
+    def open_catalog_query(self):
+        if self.catalog is None:
+            QMessageBox.information(self, "Catalog", "请先打开根目录并启用 \"全局标注目录 (Catalog)\"。")
+            return
+        # 当前数据集可能还有未写入的修改: 先落盘 (并同步 Catalog) 再查询
+        self.autosaver.flush()
+        dlg = CatalogDialog(self, self.catalog)
+        dlg.event_activated.connect(self.open_catalog_event)
+        dlg.exec()
+
+    def open_catalog_event(self, folder, eid):
+        """查询结果双击: 切换到对应数据集并选中事件、跳到其首帧"""
+        folder = Path(folder)
+        if self.current_folder_path is None or Path(self.current_folder_path) != folder:
+            item = self.folder_items.get(str(folder))
+            if item is not None: self.folder_list.setCurrentItem(item)
+            self.load_dataset(folder)
+        ev = self.annotations.get(eid)
+        if ev is None: return
+        first = ev.frames.first()
+        if first is not None: self.jump_frame(first)
+        self.select_by_id(eid)
+
+    def update_disk_cache(self):
+        """按当前数据集与设置启用/关闭持久化帧缓存"""
+        if self.act_disk_cache.isChecked() and self.current_folder_path:
+            try:
+                self.prefetcher.disk_cache = DiskFrameCache.for_dataset(self.current_folder_path)
+                return
+            except OSError as e:
+                print(f"Disk Cache Error: {e}")
+        self.prefetcher.disk_cache = None
+
+    def set_high_quality_resample(self, enabled):
+        ImageLoader.high_quality = enabled
+        # 内存中的帧按旧模式解码，需要清空后重新加载当前帧 (磁盘缓存的 key 含解码方式，自动区分)
+        self.prefetcher.clear()
+        self.load_image()
+
     
 
     # === [关键逻辑] 质量评价与自动保存 ===
@@ -99,8 +270,8 @@ class MainWindow(QMainWindow):
         self.qc_group.setEnabled(True)
         data = self.annotations[eid]
         
-        status = data.get("quality_status", "good")
-        reason = data.get("reject_reason", "")
+        status = data.quality_status
+        reason = data.reject_reason or ""
         
         self.rb_good.blockSignals(True)
         self.rb_bad.blockSignals(True)
@@ -133,14 +304,9 @@ class MainWindow(QMainWindow):
         self.combo_reason.setEnabled(is_bad)
         
         # 更新数据
-        self.annotations[self.current_event_id]["quality_status"] = "bad" if is_bad else "good"
-        if is_bad:
-            self.annotations[self.current_event_id]["reject_reason"] = self.combo_reason.currentText()
-        else:
-            self.annotations[self.current_event_id]["reject_reason"] = None
-        
-        # 1. 强制刷新列表 (更新红色的❌)
-        self.refresh_list()
+        self.store.set_qc(self.current_event_id, "bad" if is_bad else "good", self.combo_reason.currentText())
+        # 1. 刷新该行 (更新红色的❌)
+        self.refresh_event(self.current_event_id)
         # 2. 保持选中状态
         self.select_by_id(self.current_event_id)
         # 3. 自动保存
@@ -149,7 +315,7 @@ class MainWindow(QMainWindow):
     def on_reason_changed(self, text):
         """原因修改 -> 自动保存"""
         if self.current_event_id and self.rb_bad.isChecked():
-            self.annotations[self.current_event_id]["reject_reason"] = text
+            self.store.set_qc(self.current_event_id, "bad", text)
             self.save_all(silent=True)
 
     # === 1. 精准坐标计算 ===
@@ -163,12 +329,8 @@ class MainWindow(QMainWindow):
             self.lbl_coords.setText(f"X: {real_x}, Y: {real_y}")
 
     def rect_to_real(self, rect):
-        orig_w, orig_h = self.original_size
-        pix_w, pix_h = self.current_pixmap_size
-        if pix_w == 0: return [0,0,0,0]
-        sx = orig_w / pix_w
-        sy = orig_h / pix_h
-        return [rect.x() * sx, rect.y() * sy, rect.width() * sx, rect.height() * sy]
+        box = [rect.x(), rect.y(), rect.width(), rect.height()]
+        return display_to_image(box, self.current_pixmap_size, self.original_size)
 
     def init_ui(self):
         main_widget = QWidget()
@@ -197,10 +359,19 @@ class MainWindow(QMainWindow):
 
         btn_fit = QPushButton("Fit View")
         btn_fit.clicked.connect(lambda: self.canvas.reset_view())
+
+        # 原始分辨率放大镜 / 原始像素吸附 (Buffer 被降采样到 8192 时框仍能精确到原图像素)
+        self.btn_loupe = QPushButton("🔍 放大镜 (Loupe)")
+        self.btn_loupe.setCheckable(True)
+        self.btn_loupe.toggled.connect(lambda on: self.canvas.set_loupe(on))
+        self.chk_snap = QCheckBox("吸附原始像素 (Snap)")
+        self.chk_snap.toggled.connect(lambda on: setattr(self.canvas, "snap_native", on))
         
         top_layout.addWidget(self.lbl_info)
         top_layout.addStretch()
         top_layout.addWidget(self.btn_flag)
+        top_layout.addWidget(self.chk_snap)
+        top_layout.addWidget(self.btn_loupe)
         top_layout.addWidget(btn_fit)
         
         # 2. Canvas
@@ -209,20 +380,13 @@ class MainWindow(QMainWindow):
         self.canvas.mouse_moved_info.connect(self.update_status_bar)
         
         # === 修改点 1: 连接点击选中信号 ===
-        self.canvas.event_selected.connect(self.select_by_id) 
+        self.canvas.event_selected.connect(self.select_by_id)
+        self.canvas.edit_started.connect(self.on_canvas_edit_started) 
         # ================================
         
         # 3. Frame Strip
-        self.frame_layout = QHBoxLayout()
-        frame_container = QWidget()
-        frame_container.setLayout(self.frame_layout)
-        self.frame_layout.setContentsMargins(0,0,0,0)
-        self.frame_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        scroll = QScrollArea()
-        scroll.setFixedHeight(50)
-        scroll.setWidgetResizable(True)
-        scroll.setWidget(frame_container)
-        scroll.setStyleSheet("border: none; background: #2b2b2b;")
+        self.timeline = FrameTimeline()
+        self.timeline.frame_clicked.connect(self.jump_frame)
         
         # 4. Bottom Bar
         nav_layout = QHBoxLayout()
@@ -231,6 +395,20 @@ class MainWindow(QMainWindow):
         btn_next = QPushButton("Next >>")
         btn_next.clicked.connect(self.next_frame)
         self.pbar = QProgressBar(); self.pbar.setVisible(False)
+
+        # 延时播放
+        self.btn_play = QPushButton("▶ Play")
+        self.btn_play.setCheckable(True)
+        self.btn_play.toggled.connect(self.toggle_playback)
+        self.spin_fps = QSpinBox()
+        self.spin_fps.setRange(1, 30); self.spin_fps.setValue(5); self.spin_fps.setSuffix(" fps")
+        self.spin_fps.valueChanged.connect(self.player.set_fps)
+        self.chk_play_event = QCheckBox("仅选中事件 (Event only)")
+        self.chk_play_good = QCheckBox("跳过劣质帧 (Skip poor)")
+        for chk in (self.chk_play_event, self.chk_play_good):
+            chk.toggled.connect(self.restart_playback)
+        self.lbl_fps = QLabel("")
+        self.lbl_fps.setStyleSheet("font-family: monospace;")
         
         self.lbl_size = QLabel("Size: -")
         self.lbl_size.setStyleSheet("font-family: monospace; margin-left: 20px; color: black; font-weight: bold;")
@@ -239,6 +417,11 @@ class MainWindow(QMainWindow):
         
         nav_layout.addWidget(btn_prev)
         nav_layout.addWidget(btn_next)
+        nav_layout.addWidget(self.btn_play)
+        nav_layout.addWidget(self.spin_fps)
+        nav_layout.addWidget(self.chk_play_event)
+        nav_layout.addWidget(self.chk_play_good)
+        nav_layout.addWidget(self.lbl_fps)
         nav_layout.addWidget(self.pbar)
         nav_layout.addWidget(self.lbl_size)
         nav_layout.addWidget(self.lbl_coords)
@@ -246,7 +429,7 @@ class MainWindow(QMainWindow):
         
         left_layout.addLayout(top_layout)
         left_layout.addWidget(self.canvas, 1)
-        left_layout.addWidget(scroll)
+        left_layout.addWidget(self.timeline)
         left_layout.addLayout(nav_layout)
         
         # ==========================
@@ -267,10 +450,39 @@ class MainWindow(QMainWindow):
         l_events = QVBoxLayout(w_events)
         l_events.setContentsMargins(0,0,0,0)
         l_events.addWidget(QLabel("📝 Events in Current Image:"))
-        self.event_list = QListWidget()
+
+        # 过滤 / 排序
+        filter_layout = QHBoxLayout()
+        self.combo_filter_cat = QComboBox()
+        self.combo_filter_cat.addItem("全部类别 (All)", None)
+        self.combo_filter_cat.currentIndexChanged.connect(
+            lambda _: self.event_proxy.set_category(self.combo_filter_cat.currentData()))
+        self.combo_filter_qc = QComboBox()
+        for text, value in [("全部 (All)", None), ("✅ Good", "good"), ("❌ Bad", "bad")]:
+            self.combo_filter_qc.addItem(text, value)
+        self.combo_filter_qc.currentIndexChanged.connect(
+            lambda _: self.event_proxy.set_quality(self.combo_filter_qc.currentData()))
+        self.combo_sort = QComboBox()
+        for text, value in [("按 ID", "id"), ("按类别", "category"), ("按起始帧", "start")]:
+            self.combo_sort.addItem(text, value)
+        self.combo_sort.currentIndexChanged.connect(
+            lambda _: self.event_proxy.set_sort_key(self.combo_sort.currentData()))
+        filter_layout.addWidget(self.combo_filter_cat, 2)
+        filter_layout.addWidget(self.combo_filter_qc, 1)
+        filter_layout.addWidget(self.combo_sort, 1)
+        l_events.addLayout(filter_layout)
+
+        self.event_model = EventListModel(self)
+        self.event_proxy = EventFilterProxy(self)
+        self.event_proxy.setSourceModel(self.event_model)
+        self.event_proxy.sort(0)
+        self.event_list = QListView()
+        self.event_list.setModel(self.event_proxy)
+        self.event_list.setUniformItemSizes(True)
+        self.event_list.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.event_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.event_list.customContextMenuRequested.connect(self.show_context_menu)
-        self.event_list.itemClicked.connect(self.select_event)
+        self.event_list.clicked.connect(self.select_event)
         self.event_list.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         l_events.addWidget(self.event_list)
         
@@ -352,8 +564,7 @@ class MainWindow(QMainWindow):
         splitter.setStretchFactor(0, 4)
         splitter.setStretchFactor(1, 1)
         layout.addWidget(splitter)
-        
-        self.frame_btns = []
+
 
     def render_annotations(self):
         to_draw = []
@@ -364,55 +575,53 @@ class MainWindow(QMainWindow):
         inv_sx = pix_w / orig_w
         inv_sy = pix_h / orig_h
         
-        for eid, data in self.annotations.items():
-            if self.current_idx in data["frame_indices"]:
-                rx, ry, rw, rh = data["box"]
-                bx = rx * inv_sx
-                by = ry * inv_sy
-                bw = rw * inv_sx
-                bh = rh * inv_sy
-                
-                rect = QRectF(bx, by, bw, bh)
-                is_sel = (eid == self.current_event_id)
-                label = f"ID {eid}: {data['category']}"
-                if data.get("quality_status") == "bad":
-                    label += " (BAD)"
-                    
-                # === 修改点 2: 传递 eid 给画布，用于点击识别 ===
-                # 结构: (rect, color, label, is_sel, eid)
-                to_draw.append((rect, self.get_color(eid), label, is_sel, eid))
-                # ============================================
+        for eid in self.frame_index.events_at(self.current_idx):
+            data = self.annotations[eid]
+            rx, ry, rw, rh = data.box
+            bx = rx * inv_sx
+            by = ry * inv_sy
+            bw = rw * inv_sx
+            bh = rh * inv_sy
+            
+            rect = QRectF(bx, by, bw, bh)
+            is_sel = (eid == self.current_event_id)
+            label = f"ID {eid}: {data.category}"
+            if data.is_bad:
+                label += " (BAD)"
                 
+            # === 修改点 2: 传递 eid 给画布，用于点击识别 ===
+            # 结构: (rect, color, label, is_sel, eid)
+            to_draw.append((rect, self.get_color(eid), label, is_sel, eid))
+            # ============================================
+            
         self.canvas.set_annotations(to_draw)
 
     # === 2. 核心增删改逻辑 (含自动保存) ===
 
+    def on_canvas_edit_started(self):
+        # 开始画框 / 改框即暂停播放: 否则播放会在画框 (及弹窗) 期间继续换帧
+        if self.player.is_playing: self.stop_playback()
+
     def on_geometry_changed(self, rect, is_new):
-        # 1. 坐标修正（防止负数或超出）
+        if self.player.is_playing: self.stop_playback()
+        # 框所在的帧 (弹窗的事件循环里当前帧仍可能变化，之后一律使用这里记下的帧)
+        frame_idx = self.current_idx
+        # 1. 坐标修正: 换算到原图 (可选吸附到原始像素) 并限制在图片范围内 (Clamp)
         real_box = self.rect_to_real(rect)
-        rx, ry, rw, rh = real_box
-        orig_w, orig_h = self.original_size
-        
-        # 限制坐标在图片范围内 (Clamp)
-        x1 = max(0, min(rx, orig_w))
-        y1 = max(0, min(ry, orig_h))
-        x2 = max(0, min(rx + rw, orig_w))
-        y2 = max(0, min(ry + rh, orig_h))
-        
-        # 更新修正后的 box
-        real_box = [x1, y1, x2 - x1, y2 - y1]
+        if self.canvas.snap_native: real_box = snap_box(real_box)
+        real_box = clamp_box(real_box, self.original_size)
         
         # 如果框太小（无效框），直接重绘并退出
-        if real_box[2] < 1 or real_box[3] < 1:
+        if real_box is None:
             self.render_annotations()
             return
 
         if is_new:
             # 准备数据给弹窗
-            existing = {eid: {'category': d.get('category',''), 'caption': d.get('caption','')} 
+            existing = {eid: {'category': d.category, 'caption': d.caption} 
                         for eid, d in self.annotations.items()}
             
-            dlg = BatchDialog(self, self.config.categories, self.current_idx, len(self.image_paths), existing)
+            dlg = BatchDialog(self, self.config.categories, frame_idx, len(self.image_paths), existing)
             
             # === 只有点击了 OK (dlg.exec() 为 True) 才执行下面的逻辑 ===
             if dlg.exec():
@@ -420,14 +629,11 @@ class MainWindow(QMainWindow):
                 # 确保在这里定义 target_id
                 target_id = data["target_id"] 
                 end_idx = data["end_idx"]
-                new_indices = set(range(self.current_idx, end_idx + 1))
 
                 if target_id != -1:
                     # 追加到已有事件 (Append)
-                    if target_id in self.annotations:
-                        self.annotations[target_id]["frame_indices"].update(new_indices)
-                        self.annotations[target_id]["box"] = real_box # 使用修正后的 box
-                        self.refresh_list()
+                    if self.store.append_range(target_id, frame_idx, end_idx, real_box): # 使用修正后的 box
+                        self.refresh_event(target_id)
                         self.select_by_id(target_id)
                         self.lbl_status.setText(f"Appended to ID {target_id}.")
                 else:
@@ -438,16 +644,8 @@ class MainWindow(QMainWindow):
                     
                     self.config.add_category(group, sub_cat)
                     
-                    new_id = max(self.annotations.keys(), default=0) + 1
-                    self.annotations[new_id] = {
-                        "category": sub_cat, 
-                        "caption": caption, 
-                        "box": real_box, # 使用修正后的 box
-                        "frame_indices": new_indices,
-                        "quality_status": "good",
-                        "reject_reason": None
-                    }
-                    self.refresh_list()
+                    new_id = self.store.create_event(sub_cat, caption, real_box, frame_idx, end_idx)
+                    self.refresh_event(new_id)
                     self.select_by_id(new_id)
                     self.lbl_status.setText(f"Created New Event {new_id}.")
                 
@@ -460,7 +658,7 @@ class MainWindow(QMainWindow):
         else:
             # 修改已有框 (Modify)
             if self.current_event_id:
-                self.annotations[self.current_event_id]["box"] = real_box # 使用修正后的 box
+                self.store.set_box(self.current_event_id, real_box) # 使用修正后的 box
                 self.render_annotations()
                 self.lbl_status.setText(f"Updated ID {self.current_event_id}.")
                 self.save_all(silent=True)
@@ -469,272 +667,344 @@ class MainWindow(QMainWindow):
 
     def save_all(self, silent=False):
         """
-        :param silent: True=自动保存(不弹窗), False=手动保存(弹窗)
+        :param silent: True=自动保存(只置脏标记，由 AutoSaver 合并后在后台写入), False=手动保存(同步写入并弹窗)
         """
-        if not self.image_paths: return
-        folder = Path(self.image_paths[0]).parent
-        
-        # === 修改点 1: 获取文件夹名称作为 JSON 文件名 ===
-        json_filename = f"{folder.name}.json"
-        save_path = folder / json_filename
-        # ============================================
-        
-        # 1. 校验 (自动保存时不阻断，只打印)
-        for eid, data in self.annotations.items():
-            if not data.get("caption", "").strip():
-                if not silent:
-                    QMessageBox.warning(self, "Error", f"Event ID {eid} missing caption!")
-                else:
-                    print(f"[Auto-Save] Skipped: Event ID {eid} missing caption")
-                return
+        if silent:
+            if self.image_paths: self.autosaver.mark_dirty()
+            return
 
-        # 2. 构建 events 字典
-        events_dict = {}
-        for eid, data in self.annotations.items():
-            frames_indices = sorted(list(data["frame_indices"]))
-            frames_names = []
-            for idx in frames_indices:
-                if 0 <= idx < len(self.image_paths):
-                    frames_names.append(Path(self.image_paths[idx]).name)
-            
-            x, y, w, h = data["box"]
-            x2 = x + w
-            y2 = y + h
-            
-            events_dict[eid] = {
-                "category": data["category"],
-                "caption": data["caption"],
-                "box_2d": [x, y, x2, y2], 
-                "involved_frames": frames_names,
-                "quality_status": data.get("quality_status", "good"),
-                "reject_reason": data.get("reject_reason", None)
-            }
-            
-        # 3. 构建 image_quality 字典
-        quality_dict = {}
-        for path_str in self.image_paths:
-            fname = Path(path_str).name
-            status = self.quality_map.get(fname, "good")
-            quality_dict[fname] = status
-
-        final_json = {
-            "events": events_dict,
-            "image_quality": quality_dict
-        }
-            
+        job = self.make_save_job(silent=False)
+        if job is None: return
+        # 先等后台写完，避免旧快照在手动保存之后覆盖文件
+        self.autosaver.wait_idle()
         try:
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(final_json, f, indent=4, ensure_ascii=False)
-            
-            if not silent:
-                report = (f"✅ 保存成功!\n\n"
-                        f"📂 文件: {json_filename}\n"
-                        f"📝 事件数量: {len(events_dict)}")
-                QMessageBox.information(self, "Save Report", report)
-            else:
-                # 状态栏闪烁提示
-                t_str = QTime.currentTime().toString("HH:mm:ss")
-                self.lbl_status.setText(f"💾 Auto-saved to {json_filename} at {t_str}")
-
-            # 更新列表文件夹颜色
-            curr_items = self.folder_list.selectedItems()
-            if curr_items:
-                item = curr_items[0]
-                txt = item.text()
-                if "✅" not in txt:
-                    new_txt = txt.replace("⬜", "✅")
-                    item.setText(new_txt)
-                    item.setForeground(QBrush(QColor("#008000")))
+            job.write()
         except Exception as e:
+            QMessageBox.critical(self, "Save Error", str(e))
+            return
+        self.on_saved(str(job.path), time.time())
+        report = (f"✅ 保存成功!\n\n"
+                f"📂 文件: {job.path.name}\n"
+                f"📝 事件数量: {len(job.annotations)}")
+        QMessageBox.information(self, "Save Report", report)
+
+    def make_save_job(self, silent=True):
+        """在 GUI 线程给当前数据集拍快照 (校验不通过返回 None)"""
+        if not self.image_paths: return None
+
+        # 校验 (自动保存时不阻断，只打印)
+        eid = self.store.missing_caption()
+        if eid is not None:
             if not silent:
-                QMessageBox.critical(self, "Save Error", str(e))
+                QMessageBox.warning(self, "Error", f"Event ID {eid} missing caption!")
             else:
-                print(f"[Auto-Save] Failed: {e}")
+                # AutoSaver 保持脏标记，补上 caption 后的下一次编辑会重新保存
+                print(f"[Auto-Save] Skipped: Event ID {eid} missing caption")
+                self.lbl_status.setText(f"⚠️ Auto-save pending: Event ID {eid} missing caption")
+            return None
 
-    def load_annotations(self, folder):
-        folder_path = Path(folder)
-        
-        # === 修改点 2: 优先读取 {folder}.json，兼容 annotations.json ===
-        target_path = folder_path / f"{folder_path.name}.json"
-        legacy_path = folder_path / "annotations.json"
-        
-        load_path = None
-        if target_path.exists():
-            load_path = target_path
-        elif legacy_path.exists():
-            load_path = legacy_path
-            print(f"Warning: Loaded legacy file 'annotations.json'. Next save will convert to '{folder_path.name}.json'.")
-        # ==========================================================
+        annotations, image_names, quality_map, journal_seq = self.store.snapshot()
+        return SaveJob(self.store.path, annotations, image_names, quality_map,
+                       self.save_format(), self.store.journal, journal_seq, self.catalog)
 
-        self.annotations = {}
-        self.quality_map = {}
-        
-        if load_path and load_path.exists():
-            try:
-                with open(load_path, 'r', encoding='utf-8') as f: 
-                    raw = json.load(f)
-                
-                events_src = raw.get("events", {})
-                self.quality_map = raw.get("image_quality", {})
-
-                for eid_str, dat in events_src.items():
-                    eid = int(eid_str)
-                    idx_set = set()
-                    for fname in dat.get("involved_frames", []):
-                        if fname in self.image_map: idx_set.add(self.image_map[fname])
-                    
-                    if "box_2d" in dat:
-                        x1, y1, x2, y2 = dat["box_2d"]
-                        box_xywh = [x1, y1, x2-x1, y2-y1]
-                    else:
-                        box_xywh = dat.get("box", [0,0,0,0])
-
-                    self.annotations[eid] = {
-                        "category": dat.get("category", "Unk"),
-                        "caption": dat.get("caption", ""),
-                        "box": box_xywh,
-                        "frame_indices": idx_set,
-                        "quality_status": dat.get("quality_status", "good"),
-                        "reject_reason": dat.get("reject_reason", None)
-                    }
-                self.refresh_list()
-            except Exception as e: print(f"Load Error: {e}")
-        else:
-            self.refresh_list()
+    def save_format(self):
+        if self.act_compact_format.isChecked(): return FORMAT_V2
+        return self.store.format
+
+    def on_saved(self, path, timestamp):
+        """保存成功: 状态栏显示时间，并把对应的数据集标为已标注"""
+        self.last_saved_at = timestamp
+        path = Path(path)
+        t_str = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        self.lbl_status.setText(f"💾 Saved {path.name} at {t_str}")
+
+        # 更新列表文件夹颜色 (按路径查找，保存完成时可能已切换到别的数据集)
+        item = self.folder_items.get(str(path.parent))
+        if item is not None and "✅" not in item.text():
+            item.setText(item.text().replace("⬜", "✅"))
+            item.setForeground(QBrush(QColor("#008000")))
+
+    def on_save_failed(self, path, error):
+        self.lbl_status.setText(f"⚠️ Auto-save failed: {Path(path).name} ({error})")
+
+    def load_annotations(self, folder):
+        """读取标注 (v2 / 当前格式 / 旧版 annotations.json) 并回放编辑日志 (崩溃恢复)"""
+        names = [Path(p).name for p in self.image_paths]
+        self.store.close()
+        self.store = AnnotationStore.open(folder, names)
+        # 回放了上次未压缩进主 JSON 的编辑: 尽快写回主 JSON
+        if self.store.recovered: self.save_all(silent=True)
+        self.refresh_list()
 
     # === 4. 数据集管理 (Folder List) ===
 
     def open_root_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Root Folder or Dataset")
         if not folder: return
+        self.autosaver.flush()
+        self.stop_playback(reload=False)
         self.root_dir = Path(folder)
-        self.folder_list.clear(); self.event_list.clear(); self.image_paths = []; self.canvas.set_image(None)
-        self.lbl_info.setText("Scanning folders..."); QApplication.processEvents()
-        
-        if self.has_images(self.root_dir):
-            self.add_folder_item(self.root_dir, is_root=True)
-            self.folder_list.setCurrentRow(0); self.load_dataset(self.root_dir)
+        self.clear_folder_list(); self.store.close(); self.store = AnnotationStore(); self.refresh_list(); self.image_paths = []; self.canvas.set_image(None)
+        self.lbl_info.setText("Scanning folders...")
+        # 后台并行扫描，结果通过 on_folder_found 逐个加入列表
+        self.watcher.set_root(self.root_dir)
+        self.folder_scanner.start(self.root_dir)
+        self.update_catalog()
+
+    def on_folder_found(self, gen, path, is_root, has_json):
+        if not self.folder_scanner.is_current(gen): return
+        self.watcher.add_folder(path)
+        if path in self.folder_items: return
+        self.add_folder_item(path, is_root=is_root, has_json=has_json)
+        if is_root:
+            self.folder_list.setCurrentRow(0); self.load_dataset(Path(path))
+        else:
+            self.lbl_status.setText(f"Scanning... {len(self.folder_names)} datasets found")
+
+    def on_scan_finished(self, gen, count):
+        if not self.folder_scanner.is_current(gen): return
+        self.lbl_info.setText("")
+        if count == 0: QMessageBox.warning(self, "Info", "No images found.")
+        else: self.lbl_status.setText(f"Found {count} datasets.")
+
+    def on_folder_added(self, path, has_json):
+        """扫描结束后根目录下新出现的数据集"""
+        if path in self.folder_items: return
+        self.add_folder_item(path, has_json=has_json)
+        self.set_folder_changed(path, True)
+        self.lbl_status.setText(f"New dataset: {Path(path).name}")
+
+    def set_folder_changed(self, path, changed):
+        """数据集列表中标记 / 清除 "有新文件" 状态"""
+        item = self.folder_items.get(str(path))
+        if item is None: return
+        txt = item.text().removesuffix(" 🆕")
+        item.setText(txt + " 🆕" if changed else txt)
+        item.setToolTip("打开后有新文件 (New files since last opened)" if changed else "")
+
+    def on_dataset_changed(self, folder, manifest):
+        if self.current_folder_path is not None and Path(folder) == Path(self.current_folder_path):
+            self.apply_frame_update(manifest)
+        else:
+            self.set_folder_changed(folder, True)
+
+    def on_headers_ready(self, folder, manifest):
+        """后台补齐了文件头: 帧列表未变时换上新清单，并刷新当前帧的尺寸显示"""
+        if self.manifest is None or Path(folder) != self.manifest.folder: return
+        if manifest.order != self.manifest.order: return
+        self.manifest = manifest
+        if self.image_paths:
+            info = manifest.info(self.image_paths[self.current_idx])
+            if info and "width" in info:
+                self.lbl_size.setText(f"Size: {info['width']} x {info['height']}")
+
+    def apply_frame_update(self, manifest):
+        """
+        当前数据集的帧列表变化 (新影像到达 / 文件被删除):
+        按文件名重新映射事件帧序号与当前帧，不重新读取标注文件
+        """
+        new_paths = manifest.frame_paths()
+        new_names = [Path(p).name for p in new_paths]
+        old_names = self.store.image_names
+        if old_names == new_names: return
+        # 帧序号会变化: 停止播放，之后按正常流程加载当前帧
+        was_playing = self.player.is_playing
+        self.stop_playback(reload=False)
+
+        cur_name = old_names[self.current_idx] if 0 <= self.current_idx < len(old_names) else None
+        added, removed = self.store.remap_frames(new_names)
+        self.manifest = manifest
+        self.image_paths = new_paths
+
+        cur_idx = self.image_map.get(cur_name)
+        frame_gone = cur_idx is None
+        if frame_gone: cur_idx = max(0, min(self.current_idx, len(new_paths) - 1))
+        self.current_idx = cur_idx
+
+        self.refresh_list()
+        self.setup_frame_bar()
+        self.update_frame_bar()
+        if self.current_event_id in self.annotations: self.select_by_id(self.current_event_id)
+        if not new_paths:
+            self.canvas.set_image(None)
+        elif frame_gone or was_playing:
+            self.load_image()
         else:
-            subdirs = sorted([d for d in self.root_dir.iterdir() if d.is_dir()], key=lambda x: x.name)
-            count = 0
-            for d in subdirs:
-                if self.has_images(d): self.add_folder_item(d); count += 1
-            if count == 0: QMessageBox.warning(self, "Info", "No images found.")
-            else: self.lbl_status.setText(f"Found {count} datasets.")
+            self.render_annotations()
+            self.prefetcher.update(self.image_paths, self.current_idx)
+        self.lbl_status.setText(f"Dataset updated: +{added} / -{removed} frames")
+
+    def clear_folder_list(self):
+        self.folder_list.clear()
+        self.folder_names = []
+        self.folder_items = {}
 
     def has_images(self, folder):
-        for ext in ['*.tif', '*.tiff', '*.png', '*.jpg', '*.jpeg']:
-            if any(folder.glob(ext)) or any(folder.glob(ext.upper())): return True
-        return False
+        return dataset_scanner.has_images(folder)
 
-    def add_folder_item(self, path, is_root=False):
+    def add_folder_item(self, path, is_root=False, has_json=None):
         path = Path(path)
         
-        # === 修改点 3: 检查两种文件是否存在 ===
-        new_json = path / f"{path.name}.json"
-        old_json = path / "annotations.json"
-        has_json = new_json.exists() or old_json.exists()
+        # === 修改点 3: 检查两种文件是否存在 (扫描时已得到结果则不再 stat) ===
+        if has_json is None:
+            new_json = path / f"{path.name}.json"
+            old_json = path / "annotations.json"
+            has_json = new_json.exists() or old_json.exists()
         # ==================================
         
         status = "✅" if has_json else "⬜"
         item = QListWidgetItem(f"{status} {path.name}")
         item.setData(Qt.ItemDataRole.UserRole, str(path))
         item.setForeground(QBrush(QColor("#008000") if has_json else QColor("#555555")))
-        self.folder_list.addItem(item)
+        # 扫描结果乱序到达，按名称插入保持列表有序
+        row = bisect_left(self.folder_names, path.name)
+        self.folder_names.insert(row, path.name)
+        self.folder_items[str(path)] = item
+        self.folder_list.insertItem(row, item)
 
     def change_dataset_folder(self, item):
         path_str = item.data(Qt.ItemDataRole.UserRole)
         if path_str and Path(path_str) != self.current_folder_path: self.load_dataset(Path(path_str))
 
     def load_dataset(self, folder_path):
+        # 切换前把上一个数据集未写完的修改落盘
+        self.autosaver.flush()
         self.current_folder_path = folder_path
         self.lbl_status.setText(f"Loading: {folder_path.name}...")
         QApplication.processEvents()
         self.load_images_from_dir(folder_path)
 
     def load_images_from_dir(self, folder):
-        exts = ['*.tif', '*.tiff', '*.png', '*.jpg', '*.jpeg']
-        files = []
-        for ext in exts: files.extend(list(folder.glob(ext))); files.extend(list(folder.glob(ext.upper())))
-        files = list(set([str(f) for f in files]))
-        def extract_date(filename):
-            match = re.search(r'(\d{4})[-_](\d{2})[-_](\d{2})', Path(filename).name)
-            return (int(match.group(1)), int(match.group(2)), int(match.group(3))) if match else (9999, 99, 99)
-        try: self.image_paths = sorted(files, key=extract_date)
-        except: self.image_paths = sorted(files)
-        self.image_map = {Path(p).name: i for i, p in enumerate(self.image_paths)}
+        # 元数据清单: 目录未变化时直接复用文件列表与排序结果，不再遍历目录
+        # 文件头不在这里读 (几千帧会卡住界面)，开始监视后由 watcher 在后台补齐
+        self.manifest = DatasetManifest.load_or_build(folder, read_headers=False)
+        self.stop_playback(reload=False)
+        self.image_paths = self.manifest.frame_paths()
+        self.prefetcher.clear()
+        self.update_disk_cache()
         
         self.load_annotations(folder)
         
         self.setup_frame_bar(); self.current_idx = 0; self.load_image()
+        self.watcher.watch(folder, self.manifest.order)
+        self.set_folder_changed(folder, False)
         self.lbl_status.setText(f"Loaded {folder.name}")
 
     # === 5. 辅助功能 (含自动保存) ===
 
     def load_image(self):
+        """异步加载当前帧: 解码在工作线程完成，快速翻帧时中间帧会被跳过"""
         if not self.image_paths: return
-        self.pbar.setVisible(True); QApplication.processEvents()
         path = self.image_paths[self.current_idx]
-        img_data, _, (ow, oh) = ImageLoader.load(path)
-        if img_data is not None:
-            h, w, c = img_data.shape
+        self.pbar.setRange(0, 0); self.pbar.setVisible(True)
+        self.lbl_info.setText(f"Loading {Path(path).name} ...")
+        # 尺寸直接取自清单，不必等解码完成
+        info = self.manifest.info(path) if self.manifest is not None else None
+        if info and "width" in info:
+            self.lbl_size.setText(f"Size: {info['width']} x {info['height']}")
+        self.update_frame_bar()
+        # 翻帧后上一帧的金字塔不再需要，让出 CPU 给解码
+        self.mip_builder.cancel()
+        self.frame_loader.request(self.current_idx, path)
+
+    def on_frame_loaded(self, result):
+        # 过期结果 (用户已经翻到别的帧) 直接丢弃
+        if not self.frame_loader.is_current(result.generation) or result.index != self.current_idx:
+            if result.engine is not None: result.engine.close()
+            return
+        # 同一次加载的预览已经显示: 只替换图像，视图、选中框和正在进行的拖动都保持不变
+        refine = not result.preview and self.preview_generation == result.generation
+        self.preview_generation = result.generation if result.preview else None
+        self.set_tile_engine(result.engine)
+        if not result.preview: self.prefetcher.update(self.image_paths, self.current_idx)
+        if result.qimage is not None:
+            ow, oh = result.orig_size
+            # Buffer 坐标系始终按 MAX_TEXTURE_SIZE 计算，与预览图实际分辨率无关
+            scale = ImageLoader.display_scale(ow, oh)
+            buf_w, buf_h = int(ow * scale), int(oh * scale)
             self.original_size = (ow, oh)
-            self.current_pixmap_size = (w, h)
-            q_img = QImage(img_data.tobytes(), w, h, 3*w, QImage.Format.Format_RGB888)
-            self.canvas.set_image(QPixmap.fromImage(q_img))
+            self.current_pixmap_size = (buf_w, buf_h)
+            self.canvas.set_image(QPixmap.fromImage(result.qimage), (buf_w, buf_h), preview=result.preview,
+                                  native_size=(ow, oh))
             if self.canvas.view_scale == 1.0: self.canvas.reset_view()
+            if not result.preview: self.mip_builder.request(result.buffer)
             
-            fname = Path(path).name
-            self.lbl_info.setText(f"{fname}")
-            self.lbl_size.setText(f"Size: {ow} x {oh}")
-            self.btn_flag.setEnabled(True)
-            self.btn_flag.setChecked(self.quality_map.get(fname, "good") == "poor")
-        self.update_frame_bar(); self.render_annotations(); self.pbar.setVisible(False)
+            fname = Path(result.path).name
+            self.lbl_info.setText(f"{fname} (preview)" if result.preview else f"{fname}")
+            if not refine:
+                self.lbl_size.setText(f"Size: {ow} x {oh}")
+                self.btn_flag.setEnabled(True)
+                self.btn_flag.setChecked(self.quality_map.get(fname, "good") == "poor")
+        else:
+            self.lbl_info.setText(f"Failed to load {Path(result.path).name}")
+        if not refine: self.render_annotations()
+        if not result.preview: self.pbar.setVisible(False)
+
+    def on_mips_ready(self, generation, images):
+        if not self.mip_builder.is_current(generation): return
+        self.canvas.set_mips([QPixmap.fromImage(img) for img in images])
+
+    def set_tile_engine(self, engine):
+        old = self.tile_engine
+        self.tile_engine = engine
+        self.canvas.set_tile_source(engine)
+        if old is not None: old.close()
 
     def toggle_quality_flag(self):
         if not self.image_paths: return
         fname = Path(self.image_paths[self.current_idx]).name
         if self.btn_flag.isChecked():
-            self.quality_map[fname] = "poor"
+            self.store.set_image_quality(fname, "poor")
             self.lbl_status.setText(f"Marked {fname} as POOR.")
         else:
-            self.quality_map[fname] = "good"
+            self.store.set_image_quality(fname, "good")
             self.lbl_status.setText(f"Marked {fname} as GOOD.")
+        self.timeline.set_poor(self.current_idx, self.btn_flag.isChecked())
         # [自动保存]
         self.save_all(silent=True)
 
     def refresh_list(self):
-        self.event_list.clear()
-        def format_ranges(indices):
-            if not indices: return "Empty"
-            sorted_idx = sorted([i + 1 for i in indices])
-            ranges = []; start = prev = sorted_idx[0]
-            for i in sorted_idx[1:]:
-                if i == prev + 1: prev = i
-                else:
-                    ranges.append(f"{start}" if start == prev else f"{start}-{prev}"); start = prev = i
-            ranges.append(f"{start}" if start == prev else f"{start}-{prev}")
-            return ", ".join(ranges)
-        
-        for eid in sorted(self.annotations.keys()):
-            d = self.annotations[eid]; rng = format_ranges(d['frame_indices']); cat = d.get("category", "Unk")
-            
-            display_text = f"ID {eid}: {cat} [{rng}]"
-            # 如果是 bad，增加标记
-            if d.get("quality_status") == "bad":
-                display_text += " ❌"
-                
-            item = QListWidgetItem(display_text)
-            # 如果是 bad，标红
-            if d.get("quality_status") == "bad":
-                item.setForeground(QBrush(QColor("red")))
-                
-            self.event_list.addItem(item)
+        """整表重建 (仅在加载数据集时使用，编辑操作走 refresh_event；帧索引由 store 维护)"""
+        self.event_model.reset(self.annotations)
+        self._event_cats = {eid: d.category for eid, d in self.annotations.items()}
+        self._cat_counts = Counter(self._event_cats.values())
+        self.update_category_filter()
+        self.update_timeline_markers()
+
+    def refresh_event(self, eid):
+        """
+        单个事件新增/修改/删除后，只更新对应的行 (帧索引已由 store 增量更新)
+        类别计数按该事件增减，时间轴只刷新覆盖数变化的帧
+        """
+        self.event_model.event_changed(eid)
+        ev = self.annotations.get(eid)
+        old_cat = self._event_cats.pop(eid, None)
+        new_cat = ev.category if ev is not None else None
+        if new_cat is not None: self._event_cats[eid] = new_cat
+        if old_cat != new_cat:
+            if old_cat is not None:
+                self._cat_counts[old_cat] -= 1
+                if self._cat_counts[old_cat] <= 0: del self._cat_counts[old_cat]
+            if new_cat is not None: self._cat_counts[new_cat] += 1
+            self.update_category_filter()
+        self.update_timeline_coverage()
+
+    def update_category_filter(self):
+        cats = sorted(self._cat_counts)
+        current = self.combo_filter_cat.currentData()
+        existing = [self.combo_filter_cat.itemData(i) for i in range(1, self.combo_filter_cat.count())]
+        if existing == cats: return
+        self.combo_filter_cat.blockSignals(True)
+        while self.combo_filter_cat.count() > 1: self.combo_filter_cat.removeItem(1)
+        for c in cats: self.combo_filter_cat.addItem(c, c)
+        idx = self.combo_filter_cat.findData(current) if current else 0
+        self.combo_filter_cat.setCurrentIndex(max(0, idx))
+        self.combo_filter_cat.blockSignals(False)
+        self.event_proxy.set_category(self.combo_filter_cat.currentData())
 
     def show_context_menu(self, pos):
-        item = self.event_list.itemAt(pos)
-        if not item: return
-        eid = int(item.text().split(":")[0].replace("ID ", ""))
+        eid = self.event_proxy.id_for_index(self.event_list.indexAt(pos))
+        if eid is None: return
         menu = QMenu()
         act_edit = QAction("✏️ Edit Event Info (Category/Caption)", self)
         act_edit.triggered.connect(lambda: self.edit_event_info(eid))
@@ -750,86 +1020,146 @@ class MainWindow(QMainWindow):
         menu.exec(self.event_list.mapToGlobal(pos))
 
     def remove_box_on_current(self, eid):
-        if eid in self.annotations:
-            if self.current_idx in self.annotations[eid]["frame_indices"]:
-                self.annotations[eid]["frame_indices"].remove(self.current_idx)
-                self.refresh_list(); self.render_annotations()
-                self.save_all(silent=True) # [自动保存]
+        if self.store.remove_frame(eid, self.current_idx):
+            self.refresh_event(eid); self.render_annotations()
+            self.save_all(silent=True) # [自动保存]
 
     def trim_event_after(self, eid):
-        if eid not in self.annotations: return
-        frames = self.annotations[eid]["frame_indices"]; current = self.current_idx
-        indices = sorted(list(frames))
-        valid_prev = [i for i in indices if i < current]
-        if valid_prev:
-            for i in range(valid_prev[-1] + 1, current + 1): frames.add(i)
-        to_remove = [i for i in list(frames) if i > current]
-        for i in to_remove: frames.remove(i)
-        self.refresh_list(); self.render_annotations()
+        if not self.store.trim_after(eid, self.current_idx): return
+        self.refresh_event(eid); self.render_annotations()
         self.save_all(silent=True) # [自动保存]
 
     def set_frame_as_start(self, eid):
-        if eid not in self.annotations: return
-        frames = self.annotations[eid]["frame_indices"]; current = self.current_idx
-        indices = sorted(list(frames))
-        if not indices: return
-        old_start = indices[0]
-        if current < old_start:
-            for i in range(current, old_start): frames.add(i)
-        elif current > old_start:
-            to_remove = [i for i in list(frames) if i < current]
-            for i in to_remove: frames.remove(i)
-        self.refresh_list(); self.render_annotations()
+        if not self.store.set_start(eid, self.current_idx): return
+        self.refresh_event(eid); self.render_annotations()
         self.save_all(silent=True) # [自动保存]
 
     def delete_event(self, eid):
-        if eid in self.annotations: 
-            del self.annotations[eid]
+        if self.store.delete_event(eid):
             self.current_event_id = None
             self.qc_group.setEnabled(False) 
-            self.refresh_list(); self.render_annotations()
+            self.refresh_event(eid); self.render_annotations()
             self.save_all(silent=True) # [自动保存]
 
-    def select_event(self, item):
-        try: 
-            eid = int(item.text().split(":")[0].replace("ID ", ""))
-            self.current_event_id = eid
-            self.render_annotations()
-            self.update_qc_ui_from_data(eid)
-        except: pass
+    def select_event(self, index):
+        eid = self.event_proxy.id_for_index(index)
+        if eid is None: return
+        self.current_event_id = eid
+        self.render_annotations()
+        self.update_qc_ui_from_data(eid)
+        self.update_timeline_highlight()
 
     def select_by_id(self, eid):
         self.current_event_id = eid
-        for i in range(self.event_list.count()):
-            if self.event_list.item(i).text().startswith(f"ID {eid}:"): 
-                self.event_list.setCurrentRow(i); break
+        index = self.event_proxy.index_for_id(eid)
+        if index.isValid():
+            self.event_list.setCurrentIndex(index)
+            self.event_list.scrollTo(index)
         self.render_annotations()
         self.update_qc_ui_from_data(eid)
+        self.update_timeline_highlight()
 
     def get_color(self, eid): return QColor.fromHsv(int((eid * 137.5) % 360), 200, 255)
     
     def setup_frame_bar(self):
-            while self.frame_layout.count():
-                child = self.frame_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-            self.frame_btns = []
-            for i in range(len(self.image_paths)):
-                btn = QPushButton(str(i+1))
-                btn.setFixedSize(30, 30)
-                btn.setCursor(Qt.CursorShape.PointingHandCursor)
-                btn.clicked.connect(lambda _, x=i: self.jump_frame(x))
-                self.frame_layout.addWidget(btn)
-                self.frame_btns.append(btn)
-                
+        self.timeline.set_frame_count(len(self.image_paths))
+        self.timeline.set_poor_frames(i for i, p in enumerate(self.image_paths)
+                                      if self.quality_map.get(Path(p).name) == "poor")
+        self.update_timeline_markers()
+
+    def update_timeline_markers(self):
+        """事件覆盖数 (时间轴底部条)，整条重建"""
+        self.frame_index.take_dirty()
+        self.timeline.set_coverage(self.frame_index.coverage())
+        self.update_timeline_highlight()
+
+    def update_timeline_coverage(self):
+        """只刷新上次之后覆盖数变化的帧 (帧索引 rebuild 过则整条重建)"""
+        dirty = self.frame_index.take_dirty()
+        if dirty is None:
+            self.update_timeline_markers()
+            return
+        for start, end in dirty.runs():
+            self.timeline.update_coverage(start, end, self.frame_index.coverage_in(start, end))
+        self.update_timeline_highlight()
+
+    def update_timeline_highlight(self):
+        """选中事件的帧范围 (时间轴高亮底色)"""
+        sel = self.annotations.get(self.current_event_id)
+        self.timeline.set_highlight(sel.frames if sel else ())
+
     def update_frame_bar(self):
-        for i, b in enumerate(self.frame_btns): b.setStyleSheet("background:#007ACC;color:white" if i==self.current_idx else "background:#444;color:#aaa;border:none")
+        self.timeline.set_current(self.current_idx)
     def jump_frame(self, idx): 
-        if idx!=self.current_idx: self.current_idx=idx; self.load_image()
+        if self.player.is_playing:
+            # 手动翻帧即暂停播放 (播放中显示的是缩小版，需要重新加载原分辨率)
+            self.stop_playback(reload=False); self.current_idx=idx; self.load_image()
+        elif idx!=self.current_idx: self.current_idx=idx; self.load_image()
     def prev_frame(self): 
         if self.current_idx>0: self.jump_frame(self.current_idx-1)
     def next_frame(self): 
         if self.current_idx<len(self.image_paths)-1: self.jump_frame(self.current_idx+1)
+
+    # === 延时播放 ===
+
+    def playback_sequence(self):
+        """要播放的帧序号: 全部帧，或选中事件的帧范围；可再跳过劣质帧"""
+        indices = range(len(self.image_paths))
+        if self.chk_play_event.isChecked():
+            sel = self.annotations.get(self.current_event_id)
+            if sel is None or not sel.frames: return []
+            indices = range(sel.frames.first(), sel.frames.last() + 1)
+        if self.chk_play_good.isChecked():
+            return [i for i in indices if self.quality_map.get(Path(self.image_paths[i]).name) != "poor"]
+        return list(indices)
+
+    def toggle_playback(self, checked):
+        if checked: self.start_playback()
+        else: self.stop_playback()
+
+    def start_playback(self):
+        sequence = self.playback_sequence() if self.image_paths else []
+        if not sequence:
+            self.lbl_status.setText("No frames to play (select an event or clear the filters).")
+            self.btn_play.setChecked(False)
+            return
+        # 播放期间不再单帧加载原分辨率，也不需要瓦片和金字塔
+        self.frame_loader.cancel(); self.mip_builder.cancel()
+        self.set_tile_engine(None)
+        self.btn_play.setText("⏸ Pause")
+        self.lbl_fps.setText("")
+        self.player.start(self.image_paths, sequence, self.spin_fps.value(), self.current_idx)
+
+    def stop_playback(self, reload=True):
+        """暂停: 停在当前帧，并按正常流程加载其原分辨率 (reload=False 时由调用方加载)"""
+        was_playing = self.player.is_playing
+        self.player.stop()
+        self.btn_play.blockSignals(True); self.btn_play.setChecked(False); self.btn_play.blockSignals(False)
+        self.btn_play.setText("▶ Play")
+        if was_playing:
+            self.lbl_fps.setText(f"shown {self.player.shown}, dropped {self.player.dropped}")
+            if reload: self.load_image()
+
+    def restart_playback(self):
+        if self.player.is_playing: self.start_playback()
+
+    def on_playback_frame(self, frame):
+        if not self.player.is_playing or frame.index >= len(self.image_paths): return
+        self.current_idx = frame.index
+        ow, oh = frame.orig_size
+        scale = ImageLoader.display_scale(ow, oh)
+        self.original_size = (ow, oh)
+        self.current_pixmap_size = (int(ow * scale), int(oh * scale))
+        self.canvas.set_image(QPixmap.fromImage(frame.qimage), self.current_pixmap_size, preview=True,
+                              native_size=(ow, oh))
+        if self.canvas.view_scale == 1.0: self.canvas.reset_view()
+        self.lbl_info.setText(f"{Path(frame.path).name} (playing)")
+        self.update_frame_bar()
+        self.render_annotations()
+
+    def on_playback_stats(self, fps, dropped):
+        self.lbl_fps.setText(f"{fps:.1f} fps, dropped {dropped}")
+
     # def keyPressEvent(self, event):
     #     if event.key() in [Qt.Key.Key_Left, Qt.Key.Key_Up]: self.prev_frame()
     #     elif event.key() in [Qt.Key.Key_Right, Qt.Key.Key_Down]: self.next_frame()
@@ -839,8 +1169,8 @@ class MainWindow(QMainWindow):
         if eid not in self.annotations: return
         
         data = self.annotations[eid]
-        old_cat = data.get("category", "")
-        old_cap = data.get("caption", "")
+        old_cat = data.category
+        old_cap = data.caption
         
         # 弹出编辑对话框
         dlg = EditEventDialog(self, self.config.categories, old_cat, old_cap)
@@ -851,12 +1181,12 @@ class MainWindow(QMainWindow):
             new_cap = res["caption"]
             
             # 1. 更新内存数据
-            self.annotations[eid]["category"] = new_cat
-            self.annotations[eid]["caption"] = new_cap
+            self.store.set_info(eid, new_cat, new_cap)
             
             # 2. 如果是新类别，保存到配置
             self.config.add_category(new_group, new_cat)
-            
+
             # 3. 刷新界面
-            self.refresh_list()
-            self.lbl_status.setText(f"Updated info for Event {eid}.")
\ No newline at end of file
+            self.refresh_event(eid)
+            self.lbl_status.setText(f"Updated info for Event {eid}.")
+            self.save_all(silent=True)
\ No newline at end of file
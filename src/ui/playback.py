@@ -0,0 +1,175 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from src.ui.image_utils import array_to_qimage
+
+PLAYBACK_MAX_DIM = 2048     # 播放时的显示分辨率 (最长边)，原分辨率在暂停后加载
+PLAYBACK_LOOKAHEAD = 8      # 至少提前准备的帧数 (解码慢时按耗时自动加大)
+PLAYBACK_WORKERS = 2
+STATS_INTERVAL_S = 1.0
+
+
+class PlaybackFrame:
+    """工作线程准备好的一帧 (RGB32 QImage，GUI 线程 QPixmap.fromImage 无需再转换)"""
+    __slots__ = ("index", "path", "qimage", "orig_size")
+
+    def __init__(self, index, path, qimage, orig_size):
+        self.index = index
+        self.path = path
+        self.qimage = qimage
+        self.orig_size = orig_size
+
+
+class TimelapsePlayer(QObject):
+    """
+    延时播放: 按固定 FPS 在给定的帧序列上循环
+    - 工作线程池提前解码并缩小后面 PLAYBACK_LOOKAHEAD 帧 (FramePrefetcher.load_scaled)
+    - 时钟不等待解码: 到点时还没准备好的帧直接丢弃；按实测的准备耗时估计，
+      轮到之前来不及准备好的帧不会开始解码 (已排队的会被取消)，工作线程只做能赶上的帧
+    - 每秒报告一次实际显示的帧率与累计丢帧数
+    """
+    # 信号: 显示一帧 (PlaybackFrame)
+    frame_ready = pyqtSignal(object)
+    # 信号: 实际帧率, 累计丢帧数
+    stats = pyqtSignal(float, int)
+
+    def __init__(self, prefetcher, parent=None):
+        super().__init__(parent)
+        self.prefetcher = prefetcher
+        self.paths = []
+        self.sequence = []
+        self._seq_pos = {}  # 帧序号 -> 在 sequence 中的位置
+        self._pos = -1
+        self._interval_s = 0.2
+        self._cost = 0.0    # 一帧的准备耗时 (秒，指数平均)
+        self._generation = 0
+        # 可重入: cancel() / 已完成 future 的 add_done_callback 会同步回调 _forget
+        self._lock = threading.RLock()
+        self._futures = {}  # 帧序号 -> Future
+        self._ready = {}    # 帧序号 -> PlaybackFrame
+        self._executor = ThreadPoolExecutor(max_workers=PLAYBACK_WORKERS)
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self.shown = 0
+        self.dropped = 0
+        self._window_start = 0.0
+        self._window_shown = 0
+
+    @property
+    def is_playing(self):
+        return self._timer.isActive()
+
+    def start(self, paths, sequence, fps, start_idx):
+        """
+        :param sequence: 要播放的帧序号 (升序)
+        :param start_idx: 当前帧；播放从序列中它之后的第一帧开始
+        """
+        self.stop()
+        if not sequence: return
+        self.paths = [str(p) for p in paths]
+        self.sequence = list(sequence)
+        self._seq_pos = {idx: i for i, idx in enumerate(self.sequence)}
+        i = bisect_left(self.sequence, start_idx)
+        in_seq = i < len(self.sequence) and self.sequence[i] == start_idx
+        self._pos = i if in_seq else i - 1
+        self.shown = self.dropped = self._window_shown = 0
+        self._window_start = time.perf_counter()
+        self._interval_s = 1.0 / fps
+        self._schedule()
+        self._timer.start(max(1, round(1000 / fps)))
+
+    def set_fps(self, fps):
+        self._interval_s = 1.0 / fps
+        if self.is_playing: self._timer.setInterval(max(1, round(1000 / fps)))
+
+    def stop(self):
+        self._timer.stop()
+        self._generation += 1
+        with self._lock:
+            for fut in list(self._futures.values()):
+                fut.cancel()
+            self._futures.clear()
+            self._ready.clear()
+
+    def _window(self):
+        """预读窗口长度: 至少覆盖一帧准备耗时内会经过的帧"""
+        return max(PLAYBACK_LOOKAHEAD, math.ceil(self._cost / self._interval_s) + PLAYBACK_WORKERS)
+
+    def _upcoming(self):
+        n = len(self.sequence)
+        return [self.sequence[(self._pos + k) % n] for k in range(1, min(self._window(), n) + 1)]
+
+    def _reachable(self, idx):
+        """按当前的准备耗时估计，该帧能否在轮到它之前准备好"""
+        n = len(self.sequence)
+        # 整个序列都在预读窗口内: 准备好的帧会一直保留到下一轮，总能用上
+        if n <= self._window(): return True
+        ticks = (self._seq_pos[idx] - self._pos - 1) % n + 1
+        return ticks * self._interval_s >= self._cost
+
+    def _schedule(self):
+        wanted = self._upcoming()
+        keep = set(wanted)
+        gen = self._generation
+        with self._lock:
+            for idx in [i for i in self._ready if i not in keep]:
+                del self._ready[idx]
+            for idx, fut in list(self._futures.items()):
+                if (idx not in keep or not self._reachable(idx)) and fut.cancel():
+                    self._futures.pop(idx, None)
+            for idx in wanted:
+                if idx in self._ready or idx in self._futures or not self._reachable(idx): continue
+                fut = self._executor.submit(self._prepare, gen, idx)
+                self._futures[idx] = fut
+                fut.add_done_callback(lambda f, i=idx: self._forget(i, f))
+
+    def _forget(self, idx, fut):
+        with self._lock:
+            if self._futures.get(idx) is fut:
+                del self._futures[idx]
+
+    def _prepare(self, gen, idx):
+        if gen != self._generation or not self._reachable(idx): return
+        path = self.paths[idx]
+        t0 = time.perf_counter()
+        try:
+            frame = self.prefetcher.load_scaled(path, PLAYBACK_MAX_DIM)
+            if frame is None: return
+            qimage = array_to_qimage(frame.image).convertToFormat(QImage.Format.Format_RGB32)
+        except Exception as e:
+            print(f"Playback Decode Error: {e}")
+            return
+        cost = time.perf_counter() - t0
+        self._cost = cost if self._cost == 0 else 0.7 * self._cost + 0.3 * cost
+        with self._lock:
+            if gen == self._generation:
+                self._ready[idx] = PlaybackFrame(idx, path, qimage, frame.orig_size)
+
+    def _tick(self):
+        self._pos = (self._pos + 1) % len(self.sequence)
+        idx = self.sequence[self._pos]
+        with self._lock:
+            frame = self._ready.get(idx)
+        if frame is None:
+            self.dropped += 1
+        else:
+            self.shown += 1
+            self._window_shown += 1
+            self.frame_ready.emit(frame)
+        self._schedule()
+
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed >= STATS_INTERVAL_S:
+            self.stats.emit(self._window_shown / elapsed, self.dropped)
+            self._window_start += elapsed
+            self._window_shown = 0
+
+    def shutdown(self):
+        self.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,173 @@
+from PyQt6.QtWidgets import QAbstractScrollArea
+from PyQt6.QtCore import Qt, QRect, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen
+
+from src.utils.event_record import FrameRuns
+
+
+class FrameTimeline(QAbstractScrollArea):
+    """
+    自绘的帧时间轴 (替代每帧一个 QPushButton)
+    - 只绘制可见范围内的帧格子，帧数再多也只和窗口宽度相关
+    - 切换当前帧只重绘新旧两个格子 (O(1))
+    - 每帧可显示标记: 劣质帧 (顶部红条)、事件覆盖数 (底部条)、选中事件范围 (高亮底色)
+    """
+    # 信号: 点击某一帧 (0-based)
+    frame_clicked = pyqtSignal(int)
+
+    CELL_W = 36
+    CELL_GAP = 2
+
+    COLOR_BG = QColor("#2b2b2b")
+    COLOR_CELL = QColor("#444444")
+    COLOR_CURRENT = QColor("#007ACC")
+    COLOR_HIGHLIGHT = QColor("#3a5a3a")
+    COLOR_TEXT = QColor("#aaaaaa")
+    COLOR_POOR = QColor("#FF4444")
+    COLOR_COVERAGE = QColor("#E5C07B")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(50)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.setFrameShape(QAbstractScrollArea.Shape.NoFrame)
+        self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+        self.frame_count = 0
+        self.current = -1
+        self.poor_frames = set()
+        self.coverage = {}        # idx -> 覆盖该帧的事件数
+        self.highlight = set()    # 选中事件所在的帧
+
+    # === 数据接口 ===
+
+    def set_frame_count(self, count):
+        self.frame_count = count
+        self.current = -1
+        self.poor_frames = set()
+        self.coverage = {}
+        self.highlight = set()
+        self.update_scrollbar()
+        self.viewport().update()
+
+    def set_current(self, idx):
+        if idx == self.current: return
+        old, self.current = self.current, idx
+        self.update_cell(old)
+        self.update_cell(idx)
+        self.ensure_visible(idx)
+
+    def set_poor(self, idx, is_poor):
+        if is_poor: self.poor_frames.add(idx)
+        else: self.poor_frames.discard(idx)
+        self.update_cell(idx)
+
+    def set_poor_frames(self, indices):
+        self.poor_frames = set(indices)
+        self.viewport().update()
+
+    def set_coverage(self, coverage):
+        self.coverage = dict(coverage)
+        self.viewport().update()
+
+    def update_coverage(self, start, end, coverage):
+        """只替换 [start, end] 内的覆盖数 (coverage 只含非空帧)，并只重绘这些帧"""
+        for idx in range(start, end + 1):
+            self.coverage.pop(idx, None)
+        self.coverage.update(coverage)
+        if end < 0 or start >= self.frame_count: return
+        h = self.viewport().height()
+        x0 = self.cell_x(max(start, 0))
+        self.viewport().update(QRect(x0, 0, self.cell_x(min(end, self.frame_count - 1) + 1) - x0, h))
+
+    def set_highlight(self, indices):
+        # FrameRuns 直接按区间判断归属，不展开成逐帧集合
+        self.highlight = indices.copy() if isinstance(indices, FrameRuns) else set(indices)
+        self.viewport().update()
+
+    # === 几何 ===
+
+    def cell_x(self, idx):
+        return idx * self.CELL_W - self.horizontalScrollBar().value()
+
+    def cell_rect(self, idx):
+        h = self.viewport().height()
+        return QRect(self.cell_x(idx), 0, self.CELL_W - self.CELL_GAP, h)
+
+    def index_at(self, x):
+        idx = (x + self.horizontalScrollBar().value()) // self.CELL_W
+        return idx if 0 <= idx < self.frame_count else -1
+
+    def update_cell(self, idx):
+        if 0 <= idx < self.frame_count:
+            self.viewport().update(self.cell_rect(idx))
+
+    def update_scrollbar(self):
+        total = self.frame_count * self.CELL_W
+        bar = self.horizontalScrollBar()
+        bar.setRange(0, max(0, total - self.viewport().width()))
+        bar.setPageStep(self.viewport().width())
+        bar.setSingleStep(self.CELL_W)
+
+    def ensure_visible(self, idx):
+        if not (0 <= idx < self.frame_count): return
+        bar = self.horizontalScrollBar()
+        left = idx * self.CELL_W
+        right = left + self.CELL_W
+        vw = self.viewport().width()
+        if left < bar.value():
+            bar.setValue(left)
+        elif right > bar.value() + vw:
+            bar.setValue(right - vw)
+
+    # === 事件 ===
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbar()
+
+    def wheelEvent(self, event):
+        # 竖直滚轮也用来横向滚动
+        delta = event.angleDelta().y() or event.angleDelta().x()
+        bar = self.horizontalScrollBar()
+        bar.setValue(bar.value() - delta)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            idx = self.index_at(int(event.position().x()))
+            if idx != -1: self.frame_clicked.emit(idx)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        font = painter.font(); font.setPointSize(8); painter.setFont(font)
+        painter.fillRect(event.rect(), self.COLOR_BG)
+        if self.frame_count == 0: return
+
+        # 只绘制与重绘区域相交的格子
+        dirty = event.rect()
+        offset = self.horizontalScrollBar().value()
+        first = max(0, (dirty.left() + offset) // self.CELL_W)
+        last = min(self.frame_count - 1, (dirty.right() + offset) // self.CELL_W)
+        h = self.viewport().height()
+
+        for idx in range(first, last + 1):
+            rect = self.cell_rect(idx)
+            if idx == self.current:
+                bg = self.COLOR_CURRENT
+            elif idx in self.highlight:
+                bg = self.COLOR_HIGHLIGHT
+            else:
+                bg = self.COLOR_CELL
+            painter.fillRect(rect, bg)
+
+            if idx in self.poor_frames:
+                painter.fillRect(QRect(rect.left(), 0, rect.width(), 4), self.COLOR_POOR)
+            count = self.coverage.get(idx, 0)
+            if count:
+                bar_w = min(rect.width(), 6 * count)
+                painter.fillRect(QRect(rect.left(), h - 4, bar_w, 4), self.COLOR_COVERAGE)
+
+            painter.setPen(QPen(Qt.GlobalColor.white if idx == self.current else self.COLOR_TEXT))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, str(idx + 1))
@@ -0,0 +1,188 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+from src.utils.event_record import EventRecord, FrameRuns
+
+LEGACY_FILE_NAME = "annotations.json"
+
+# 紧凑格式 (v2) 标识
+FORMAT_NAME = "tracker-annotations"
+FORMAT_V1 = 1
+FORMAT_V2 = 2
+
+
+def annotation_path(folder):
+    """数据集标注文件: {folder}/{folder.name}.json"""
+    folder = Path(folder)
+    return folder / f"{folder.name}.json"
+
+
+def find_annotation_file(folder):
+    """
+    优先 {folder}.json，其次旧版 annotations.json
+    :return: (path 或 None, 是否旧版文件名)
+    """
+    folder = Path(folder)
+    target = annotation_path(folder)
+    if target.exists(): return target, False
+    legacy = folder / LEGACY_FILE_NAME
+    if legacy.exists(): return legacy, True
+    return None, False
+
+
+def find_missing_caption(annotations):
+    """返回第一个缺少 caption 的事件 ID，全部合法时返回 None"""
+    for eid, ev in annotations.items():
+        if not (ev.caption or "").strip():
+            return eid
+    return None
+
+
+# === 写出 ===
+
+def build_annotation_json(annotations, image_names, quality_map):
+    """
+    内存中的事件 -> 保存格式 (与原 save_all 输出一致)
+    :param image_names: 按帧序号排列的文件名
+    """
+    n = len(image_names)
+    events_dict = {}
+    for eid, ev in annotations.items():
+        x, y, w, h = ev.box
+        events_dict[eid] = {
+            "category": ev.category,
+            "caption": ev.caption,
+            "box_2d": [x, y, x + w, y + h],
+            "involved_frames": [image_names[idx] for idx in ev.frames if 0 <= idx < n],
+            "quality_status": ev.quality_status,
+            "reject_reason": ev.reject_reason,
+        }
+    quality_dict = {fname: quality_map.get(fname, "good") for fname in image_names}
+    return {"events": events_dict, "image_quality": quality_dict}
+
+
+def build_annotation_json_v2(annotations, image_names, quality_map):
+    """
+    紧凑格式 (v2):
+    - frames: 帧文件名表，只写一次
+    - events[*].ranges: 帧表下标的闭区间 [[start, end], ...]
+    - image_quality: 只记录非 good 的帧
+    """
+    n = len(image_names)
+    events_dict = {}
+    for eid, ev in annotations.items():
+        x, y, w, h = ev.box
+        ranges = [[max(s, 0), min(e, n - 1)] for s, e in ev.frames.runs() if e >= 0 and s < n]
+        events_dict[eid] = {
+            "category": ev.category,
+            "caption": ev.caption,
+            "box_2d": [x, y, x + w, y + h],
+            "ranges": ranges,
+            "quality_status": ev.quality_status,
+            "reject_reason": ev.reject_reason,
+        }
+    names = set(image_names)
+    quality_dict = {fname: status for fname, status in quality_map.items()
+                    if status != "good" and fname in names}
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_V2,
+        "frames": list(image_names),
+        "events": events_dict,
+        "image_quality": quality_dict,
+    }
+
+
+def save_annotations(path, annotations, image_names, quality_map, version=FORMAT_V1):
+    """按指定格式序列化并原子写入"""
+    if version == FORMAT_V2:
+        obj = build_annotation_json_v2(annotations, image_names, quality_map)
+        atomic_write_json(path, obj, indent=None)
+    else:
+        atomic_write_json(path, build_annotation_json(annotations, image_names, quality_map))
+
+
+def atomic_write_json(path, obj, indent=4):
+    """
+    先写同目录下的临时文件并 fsync，再 os.replace 原子替换
+    写入中途崩溃或断电时，原文件保持完整；临时文件名唯一，多个线程同时写同一文件也不会互相覆盖
+    indent=None 时写成不带空白的紧凑 JSON
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    separators = (",", ":") if indent is None else None
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=indent, separators=separators, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+
+
+# === 读取 ===
+
+def format_version(raw):
+    if raw.get("format") == FORMAT_NAME:
+        return int(raw.get("version", FORMAT_V2))
+    return FORMAT_V1
+
+
+def _box_from(dat):
+    if "box_2d" in dat:
+        x1, y1, x2, y2 = dat["box_2d"]
+        return [x1, y1, x2 - x1, y2 - y1]
+    return dat.get("box", [0, 0, 0, 0])
+
+
+def _frames_v2(ranges, remap):
+    """v2 区间 (文件内帧表下标) -> 当前数据集的 FrameRuns；remap 为 None 表示帧表与当前一致"""
+    if remap is None:
+        return FrameRuns(ranges)
+    return FrameRuns.from_indices(remap[i] for s, e in ranges for i in range(s, e + 1)
+                                  if 0 <= i < len(remap) and remap[i] is not None)
+
+
+def parse_annotations(raw, image_map):
+    """
+    解析标注 JSON (v2 紧凑格式 / 当前格式 / 旧版 annotations.json)
+    :param image_map: 文件名 -> 当前帧序号
+    :return: (annotations, quality_map, version)
+    """
+    version = format_version(raw)
+    events_src = raw.get("events", {})
+    quality_map = dict(raw.get("image_quality", {}))
+
+    remap = None
+    if version >= FORMAT_V2:
+        table = raw.get("frames", [])
+        remap = [image_map.get(name) for name in table]
+        # 帧表与当前数据集顺序完全一致时 (常见情况) 区间直接使用，不逐帧映射
+        if len(table) == len(image_map) and remap == list(range(len(table))):
+            remap = None
+
+    annotations = {}
+    for eid_str, dat in events_src.items():
+        if version >= FORMAT_V2:
+            frames = _frames_v2(dat.get("ranges", []), remap)
+        else:
+            frames = FrameRuns.from_indices(image_map[fname] for fname in dat.get("involved_frames", [])
+                                            if fname in image_map)
+        annotations[int(eid_str)] = EventRecord(
+            category=dat.get("category", "Unk"),
+            caption=dat.get("caption", ""),
+            box=_box_from(dat),
+            frames=frames,
+            quality_status=dat.get("quality_status", "good"),
+            reject_reason=dat.get("reject_reason", None),
+        )
+    return annotations, quality_map, version
+
+
+def load_annotations(path, image_map):
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    return parse_annotations(raw, image_map)
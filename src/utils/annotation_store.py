@@ -0,0 +1,320 @@
+import os
+from pathlib import Path
+
+from src.utils import annotation_io
+from src.utils.annotation_io import FORMAT_V1, annotation_path, find_missing_caption, save_annotations
+from src.utils.dataset_scanner import scan_images, sort_frames
+from src.utils.edit_journal import EditJournal, event_record, replay
+from src.utils.event_record import EventRecord, FrameRuns
+from src.utils.frame_index import FrameEventIndex
+
+# 小于 1 像素的框视为无效 (与 GUI 画框时的判定一致)
+MIN_BOX_SIZE = 1
+
+
+# === 坐标换算 ===
+
+def display_to_image(box, display_size, image_size):
+    """显示缓冲区坐标 [x, y, w, h] -> 原图像素坐标 (显示尺寸无效时返回全 0)"""
+    disp_w, disp_h = display_size
+    img_w, img_h = image_size
+    if disp_w == 0 or disp_h == 0: return [0, 0, 0, 0]
+    sx = img_w / disp_w
+    sy = img_h / disp_h
+    x, y, w, h = box
+    return [x * sx, y * sy, w * sx, h * sy]
+
+
+def snap_box(box):
+    """把框的四条边取整到原始像素边界 (宽高至少 MIN_BOX_SIZE)"""
+    x, y, w, h = box
+    x0, y0 = round(x), round(y)
+    x1 = max(round(x + w), x0 + MIN_BOX_SIZE)
+    y1 = max(round(y + h), y0 + MIN_BOX_SIZE)
+    return [x0, y0, x1 - x0, y1 - y0]
+
+
+def clamp_box(box, image_size):
+    """把框限制在图像范围内；裁剪后宽或高不足 MIN_BOX_SIZE 时返回 None"""
+    x, y, w, h = box
+    img_w, img_h = image_size
+    x1 = max(0, min(x, img_w))
+    y1 = max(0, min(y, img_h))
+    x2 = max(0, min(x + w, img_w))
+    y2 = max(0, min(y + h, img_h))
+    if x2 - x1 < MIN_BOX_SIZE or y2 - y1 < MIN_BOX_SIZE: return None
+    return [x1, y1, x2 - x1, y2 - y1]
+
+
+# === 保存 ===
+
+def write_annotations(path, annotations, image_names, quality_map, version=FORMAT_V1,
+                      journal=None, journal_seq=0, catalog=None):
+    """
+    写主 JSON (原子替换)，成功后压缩编辑日志并同步 Catalog
+    Catalog 失败只打印，不算保存失败
+    """
+    save_annotations(path, annotations, image_names, quality_map, version)
+    if journal is not None: journal.compact(journal_seq)
+    if catalog is not None:
+        try:
+            catalog.sync_dataset(Path(path).parent, annotations, image_names, quality_map, os.stat(path).st_mtime_ns)
+        except Exception as e:
+            print(f"[Catalog] Sync failed: {e}")
+
+
+class AnnotationStore:
+    """
+    一个数据集的全部标注: 事件、逐帧质量、帧 -> 事件索引、编辑日志 (不依赖 Qt)
+    - GUI 的所有编辑都通过这里完成，脚本可以直接使用同一套语义和文件格式:
+          store = AnnotationStore.open("/data/root/site_01")
+          store.set_qc(3, "bad", "云遮挡")
+          store.save()
+    - 每个编辑方法都会立即追加编辑日志并增量更新帧索引；保存时压缩日志
+    - 可以被 pickle 传给 multiprocessing 工作进程；对端的副本不带编辑日志
+      (两个进程各自编号追加同一个日志会导致 seq 冲突，compact 也会删掉对方尚未保存的编辑)
+    """
+
+    def __init__(self, folder=None, image_names=(), journal=None):
+        self.folder = Path(folder) if folder is not None else None
+        self.image_names = list(image_names)
+        self.image_map = {name: i for i, name in enumerate(self.image_names)}
+        self.annotations = {}
+        self.quality_map = {}
+        self.format = FORMAT_V1     # 读到的文件格式 (读到 v2 后保持 v2，不会被降级)
+        self.journal = journal
+        if journal is not None: journal.set_frame_table(self.image_names)
+        self.frame_index = FrameEventIndex()
+        self.recovered = 0          # 上次 load() 从编辑日志回放的编辑数
+
+    @classmethod
+    def open(cls, folder, image_names=None, journal=True):
+        """
+        打开数据集并加载标注 (含编辑日志回放)
+        :param image_names: 按帧顺序排列的文件名；缺省时按 GUI 相同规则扫描并按日期排序
+        :param journal: 是否启用编辑日志
+        """
+        if image_names is None:
+            image_names = sort_frames([e.name for e in scan_images(folder)])
+        edit_journal = None
+        if journal:
+            try:
+                edit_journal = EditJournal.for_dataset(folder)
+            except Exception as e:
+                print(f"[Journal] Disabled: {e}")
+        store = cls(folder, image_names, edit_journal)
+        store.load()
+        return store
+
+    def __getstate__(self):
+        # 编辑日志只属于打开它的进程: 副本只读写主 JSON (由调用方保证同一时间只有一方保存)
+        state = self.__dict__.copy()
+        state["journal"] = None
+        return state
+
+    @property
+    def path(self):
+        return annotation_path(self.folder)
+
+    def frame_name(self, idx):
+        return self.image_names[idx]
+
+    # === 读取 ===
+
+    def load(self):
+        """
+        读取 {folder}.json (兼容 annotations.json) 并回放上次未压缩进主 JSON 的编辑
+        :return: 回放的编辑数 (大于 0 时调用方应尽快保存)
+        """
+        self.annotations = {}
+        self.quality_map = {}
+        self.format = FORMAT_V1
+
+        load_path, is_legacy = annotation_io.find_annotation_file(self.folder)
+        if is_legacy:
+            print(f"Warning: Loaded legacy file 'annotations.json'. Next save will convert to '{self.folder.name}.json'.")
+        if load_path is not None:
+            try:
+                # v2 紧凑格式 / 当前格式 / 旧版格式 均可读取
+                self.annotations, self.quality_map, self.format = \
+                    annotation_io.load_annotations(load_path, self.image_map)
+            except Exception as e: print(f"Load Error: {e}")
+
+        self.recovered = 0
+        if self.journal is not None:
+            records = self.journal.read()
+            if records:
+                self.recovered = replay(records, self.annotations, self.quality_map, self.image_map)
+                print(f"[Journal] Recovered {self.recovered} edits from {self.journal.path.name}")
+        # 加载失败时也要重建帧索引，避免残留上一数据集的事件
+        self.frame_index.rebuild(self.annotations)
+        return self.recovered
+
+    def events_at(self, idx):
+        return self.frame_index.events_at(idx)
+
+    # === 编辑日志 ===
+
+    def _log_record(self, record):
+        if self.journal is None: return
+        try:
+            self.journal.append(record)
+        except Exception as e:
+            print(f"[Journal] Write failed: {e}")
+
+    def _log(self, op, eid, **extra):
+        """记录一次事件编辑 (字段由 op 决定，extra 追加额外字段)"""
+        ev = self.annotations.get(eid)
+        record = event_record(op, eid, ev) if ev is not None else {"op": op, "id": eid}
+        record.update(extra)
+        self._log_record(record)
+
+    def _changed(self, eid):
+        if eid in self.annotations:
+            self.frame_index.update_event(eid, self.annotations[eid].frames)
+        else:
+            self.frame_index.remove_event(eid)
+
+    # === 事件编辑 ===
+
+    def create_event(self, category, caption, box, start, end):
+        """新建事件，帧范围 [start, end]；返回新事件 ID"""
+        new_id = max(self.annotations.keys(), default=0) + 1
+        self.annotations[new_id] = EventRecord(
+            category=category,
+            caption=caption,
+            box=list(box),
+            frames=FrameRuns([(start, end)]),
+        )
+        self._log("create", new_id)
+        self._changed(new_id)
+        return new_id
+
+    def append_range(self, eid, start, end, box=None):
+        """把帧范围 [start, end] 并入已有事件 (box 不为 None 时同时更新框)"""
+        ev = self.annotations.get(eid)
+        if ev is None: return False
+        ev.frames.add_range(start, end)
+        extra = {"range": [start, end]}
+        if box is not None:
+            ev.box = list(box)
+            extra["box"] = ev.box
+        self._log("append", eid, **extra)
+        self._changed(eid)
+        return True
+
+    def set_box(self, eid, box):
+        ev = self.annotations.get(eid)
+        if ev is None: return False
+        ev.box = list(box)
+        self._log("box", eid)
+        return True
+
+    def set_info(self, eid, category, caption):
+        ev = self.annotations.get(eid)
+        if ev is None: return False
+        ev.category = category
+        ev.caption = caption
+        self._log("info", eid)
+        return True
+
+    def set_qc(self, eid, status, reason=None):
+        """事件质量评价: "bad" 时记录原因，"good" 时清空原因"""
+        ev = self.annotations.get(eid)
+        if ev is None: return False
+        ev.quality_status = "bad" if status == "bad" else "good"
+        ev.reject_reason = reason if ev.quality_status == "bad" else None
+        self._log("qc", eid)
+        return True
+
+    def remove_frame(self, eid, idx):
+        """从事件中移除单帧 (该帧不属于事件时返回 False)"""
+        ev = self.annotations.get(eid)
+        if ev is None or idx not in ev.frames: return False
+        ev.frames.discard(idx)
+        self._log("frames", eid)
+        self._changed(eid)
+        return True
+
+    def trim_after(self, eid, idx):
+        """把 idx 设为事件的最后一帧"""
+        ev = self.annotations.get(eid)
+        if ev is None: return False
+        ev.frames.trim_after(idx)
+        self._log("frames", eid)
+        self._changed(eid)
+        return True
+
+    def set_start(self, eid, idx):
+        """把 idx 设为事件的第一帧 (空事件不处理)"""
+        ev = self.annotations.get(eid)
+        if ev is None or not ev.frames: return False
+        ev.frames.set_start(idx)
+        self._log("frames", eid)
+        self._changed(eid)
+        return True
+
+    def delete_event(self, eid):
+        if eid not in self.annotations: return False
+        del self.annotations[eid]
+        self._log("delete", eid)
+        self._changed(eid)
+        return True
+
+    def set_image_quality(self, name, status):
+        """逐帧质量: "poor" / "good" (name 为帧文件名)"""
+        self.quality_map[name] = status
+        self._log_record({"op": "image_quality", "name": name, "status": status})
+
+    # === 帧列表变化 ===
+
+    def remap_frames(self, image_names):
+        """
+        帧列表变化 (新影像到达 / 文件被删除): 按文件名重新映射事件的帧序号
+        :return: (新增帧数, 删除帧数)
+        """
+        new_map = {name: i for i, name in enumerate(image_names)}
+        old_names = self.image_names
+        remap = [new_map.get(name) for name in old_names]
+        added = len(set(new_map) - set(old_names))
+        removed = sum(1 for i in remap if i is None)
+        for ev in self.annotations.values():
+            ev.frames = ev.frames.remapped(remap)
+        self.image_names = list(image_names)
+        self.image_map = new_map
+        if self.journal is not None: self.journal.set_frame_table(self.image_names)
+        self.frame_index.rebuild(self.annotations)
+        return added, removed
+
+    # === 保存 ===
+
+    def missing_caption(self):
+        """第一个缺少 caption 的事件 ID (全部合格返回 None)"""
+        return find_missing_caption(self.annotations)
+
+    def snapshot(self):
+        """
+        拍快照 (深拷贝事件)，之后的编辑不影响快照，可交给其他线程写盘
+        :return: (annotations, image_names, quality_map, journal_seq)
+        """
+        annotations = {eid: ev.copy() for eid, ev in self.annotations.items()}
+        journal_seq = self.journal.seq if self.journal is not None else 0
+        return annotations, list(self.image_names), dict(self.quality_map), journal_seq
+
+    def save(self, version=None, catalog=None):
+        """
+        同步保存到 {folder}.json 并压缩编辑日志
+        :param version: 文件格式，缺省沿用读到的格式
+        :raises ValueError: 有事件缺少 caption
+        """
+        eid = self.missing_caption()
+        if eid is not None:
+            raise ValueError(f"Event ID {eid} missing caption!")
+        annotations, image_names, quality_map, journal_seq = self.snapshot()
+        write_annotations(self.path, annotations, image_names, quality_map, version or self.format,
+                          self.journal, journal_seq, catalog)
+        return self.path
+
+    def close(self):
+        """把编辑日志缓冲中的记录写盘 (切换数据集 / 退出前调用，之后仍可继续使用)"""
+        if self.journal is not None: self.journal.close()
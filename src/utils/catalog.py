@@ -0,0 +1,331 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.utils import annotation_io
+from src.utils.dataset_scanner import find_datasets, scan_images, sort_frames
+
+CATALOG_NAME = ".tracker_catalog.sqlite"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    folder TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    file_mtime_ns INTEGER,
+    frame_count INTEGER,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    dataset_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    PRIMARY KEY (dataset_id, idx)
+);
+CREATE INDEX IF NOT EXISTS frames_name ON frames(name);
+CREATE INDEX IF NOT EXISTS frames_quality ON frames(quality);
+CREATE TABLE IF NOT EXISTS events (
+    dataset_id INTEGER NOT NULL,
+    eid INTEGER NOT NULL,
+    category TEXT,
+    caption TEXT,
+    quality_status TEXT,
+    reject_reason TEXT,
+    x REAL, y REAL, w REAL, h REAL,
+    first_frame INTEGER,
+    last_frame INTEGER,
+    frame_count INTEGER,
+    PRIMARY KEY (dataset_id, eid)
+);
+CREATE INDEX IF NOT EXISTS events_category ON events(category);
+CREATE INDEX IF NOT EXISTS events_quality ON events(quality_status);
+CREATE TABLE IF NOT EXISTS event_runs (
+    dataset_id INTEGER NOT NULL,
+    eid INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_runs_key ON event_runs(dataset_id, start, end);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    caption, category, tokenize = 'trigram'
+);
+"""
+
+GROUP_COLUMNS = {
+    "category": "e.category",
+    "dataset": "d.name",
+    "quality": "e.quality_status",
+    "reason": "e.reject_reason",
+}
+
+
+def catalog_path(root):
+    return Path(root) / CATALOG_NAME
+
+
+class Catalog:
+    """
+    根目录下全部数据集标注的 SQLite 索引 (<root>/.tracker_catalog.sqlite)
+    - 表: datasets / frames (帧名与质量) / events / event_runs (帧区间) / events_fts (caption 全文检索，rowid 与 events 相同)
+    - 每次调用独立打开连接，可在任意线程使用 (WAL 模式，读写互不阻塞)
+    - 数据集以整体替换的方式同步: sync_dataset 在一个事务中删除旧行并写入新行
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.has_fts = False
+        with self._connect() as conn:
+            # WAL 模式写在数据库文件里，之后的连接无需再设置
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite 未编译 FTS5 或不支持 trigram 分词: 退化为 LIKE 查询
+                self.has_fts = False
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @classmethod
+    def for_root(cls, root):
+        return cls(catalog_path(root))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # === 写入 ===
+
+    def sync_dataset(self, folder, annotations, image_names, quality_map, file_mtime_ns=None):
+        """用内存中的事件整体替换一个数据集的索引"""
+        conn = self._connect()
+        try:
+            with conn:
+                self._write_dataset(conn, folder, annotations, image_names, quality_map, file_mtime_ns)
+        finally:
+            conn.close()
+
+    def _write_if_newer(self, conn, folder, annotations, image_names, quality_map, file_mtime_ns):
+        """
+        在独立的写事务中同步一个数据集；库里的 mtime 比扫描到的新 (扫描期间自动保存已同步过) 时跳过
+        :return: True=已写入, False=跳过
+        """
+        with conn:
+            # IMMEDIATE: 先拿写锁再比较 mtime，比较与写入之间不会插入别的同步
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT file_mtime_ns FROM datasets WHERE folder = ?", (str(Path(folder)),)).fetchone()
+            stored = row["file_mtime_ns"] if row is not None else None
+            if stored is not None and file_mtime_ns is not None and stored > file_mtime_ns:
+                return False
+            self._write_dataset(conn, folder, annotations, image_names, quality_map, file_mtime_ns)
+            return True
+
+    def _write_dataset(self, conn, folder, annotations, image_names, quality_map, file_mtime_ns):
+        folder = str(Path(folder))
+        row = conn.execute("SELECT id FROM datasets WHERE folder = ?", (folder,)).fetchone()
+        if row is None:
+            ds_id = conn.execute("INSERT INTO datasets (folder, name) VALUES (?, ?)",
+                                 (folder, Path(folder).name)).lastrowid
+        else:
+            ds_id = row["id"]
+            self._delete_rows(conn, ds_id)
+        conn.execute("UPDATE datasets SET file_mtime_ns = ?, frame_count = ?, synced_at = ? WHERE id = ?",
+                     (file_mtime_ns, len(image_names), time.time(), ds_id))
+
+        conn.executemany("INSERT INTO frames VALUES (?, ?, ?, ?)",
+                         ((ds_id, i, name, quality_map.get(name, "good")) for i, name in enumerate(image_names)))
+        n = len(image_names)
+        event_rows, run_rows = [], []
+        for eid, ev in annotations.items():
+            x, y, w, h = ev.box
+            event_rows.append((ds_id, eid, ev.category, ev.caption, ev.quality_status, ev.reject_reason,
+                               x, y, w, h, ev.frames.first(), ev.frames.last(), len(ev.frames)))
+            run_rows.extend((ds_id, eid, s, e) for s, e in ev.frames.runs() if s < n)
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", event_rows)
+        conn.executemany("INSERT INTO event_runs VALUES (?, ?, ?, ?)", run_rows)
+        if self.has_fts:
+            conn.execute("INSERT INTO events_fts (rowid, caption, category) "
+                         "SELECT rowid, COALESCE(caption, ''), COALESCE(category, '') "
+                         "FROM events WHERE dataset_id = ?", (ds_id,))
+
+    def _delete_rows(self, conn, ds_id):
+        # FTS 行先按 events 的 rowid 删除 (FTS 表上没有 dataset_id 索引)
+        if self.has_fts:
+            conn.execute("DELETE FROM events_fts WHERE rowid IN (SELECT rowid FROM events WHERE dataset_id = ?)",
+                         (ds_id,))
+        for table in ("frames", "events", "event_runs"):
+            conn.execute(f"DELETE FROM {table} WHERE dataset_id = ?", (ds_id,))
+
+    @staticmethod
+    def read_dataset(folder, known_mtime=None, force=False):
+        """
+        读取数据集的帧列表与标注文件 (不访问数据库，可在工作线程并行执行)
+        :return: (annotations, image_names, quality_map, 标注文件 mtime)；mtime 与 known_mtime 相同且非 force 时返回 None
+        """
+        path, _ = annotation_io.find_annotation_file(folder)
+        mtime = os.stat(path).st_mtime_ns if path is not None else None
+        if not force and mtime == known_mtime:
+            return None
+        names = sort_frames([e.name for e in scan_images(folder)])
+        image_map = {name: i for i, name in enumerate(names)}
+        annotations, quality_map = {}, {}
+        if path is not None:
+            annotations, quality_map, _ = annotation_io.load_annotations(path, image_map)
+        return annotations, names, quality_map, mtime
+
+    def sync_file(self, folder, force=False):
+        """
+        从数据集的标注文件同步 (标注文件 mtime 未变且非 force 时跳过)
+        :return: True=已同步, False=跳过
+        """
+        data = self.read_dataset(folder, self.dataset_mtime(folder), force)
+        if data is None: return False
+        self.sync_dataset(folder, *data)
+        return True
+
+    def sync_root(self, root, workers=8, force=False, progress=None):
+        """
+        增量同步根目录下的全部数据集 (只处理标注文件有变化的)
+        - 读取/解析标注文件在线程池中并行，写库只用一个连接，每个数据集单独提交，
+          不会长时间占住写锁而挡住界面自动保存的 sync_dataset
+        - 写入前重新比较库里的 mtime，比扫描结果新的数据集 (已被自动保存同步) 不会被旧数据覆盖
+        :param progress: 可选回调 progress(done, total)
+        :return: (数据集总数, 实际同步数)
+        """
+        folders = find_datasets(root)
+        known = self.dataset_mtimes()
+
+        def read(folder):
+            try:
+                return folder, self.read_dataset(folder, known.get(str(Path(folder)), -1), force)
+            except Exception as e:
+                print(f"Catalog Sync Error ({Path(folder).name}): {e}")
+                return folder, None
+
+        synced = 0
+        conn = self._connect()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                for i, (folder, data) in enumerate(pool.map(read, folders), 1):
+                    if data is not None and self._write_if_newer(conn, folder, *data):
+                        synced += 1
+                    if progress is not None: progress(i, len(folders))
+        finally:
+            conn.close()
+        self.remove_missing(folders)
+        return len(folders), synced
+
+    def remove_missing(self, folders):
+        """删除已不存在的数据集"""
+        keep = {str(Path(f)) for f in folders}
+        conn = self._connect()
+        try:
+            with conn:
+                for row in conn.execute("SELECT id, folder FROM datasets").fetchall():
+                    if row["folder"] in keep: continue
+                    self._delete_rows(conn, row["id"])
+                    conn.execute("DELETE FROM datasets WHERE id = ?", (row["id"],))
+        finally:
+            conn.close()
+
+    def dataset_mtimes(self):
+        """数据集路径 -> 已索引的标注文件 mtime (未索引的数据集不在其中)"""
+        conn = self._connect()
+        try:
+            return {r["folder"]: r["file_mtime_ns"] for r in conn.execute("SELECT folder, file_mtime_ns FROM datasets")}
+        finally:
+            conn.close()
+
+    def dataset_mtime(self, folder):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT file_mtime_ns FROM datasets WHERE folder = ?", (str(Path(folder)),)).fetchone()
+            return row["file_mtime_ns"] if row is not None else -1
+        finally:
+            conn.close()
+
+    # === 查询 ===
+
+    def _where(self, category=None, quality=None, text=None, dataset=None, frame=None):
+        clauses, params = [], []
+        if category:
+            clauses.append("e.category = ?"); params.append(category)
+        if quality:
+            clauses.append("e.quality_status = ?"); params.append(quality)
+        if dataset:
+            clauses.append("d.name = ?"); params.append(dataset)
+        if text:
+            if self.has_fts and len(text) >= 3:
+                clauses.append("e.rowid IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                # 转义通配符: 搜索 "50%" 只匹配字面上的 50%
+                pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(e.caption LIKE ? ESCAPE '\\' OR e.category LIKE ? ESCAPE '\\')")
+                params.extend([pattern] * 2)
+        if frame:
+            # 覆盖指定帧 (文件名) 的事件
+            clauses.append("EXISTS (SELECT 1 FROM frames f JOIN event_runs r ON r.dataset_id = f.dataset_id "
+                           "WHERE f.dataset_id = e.dataset_id AND f.name = ? AND r.eid = e.eid "
+                           "AND f.idx BETWEEN r.start AND r.end)")
+            params.append(frame)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, category=None, quality=None, text=None, dataset=None, frame=None, limit=1000):
+        """
+        跨数据集查询事件
+        :return: dict 列表 (folder, dataset, eid, category, caption, quality_status, reject_reason,
+                 first_frame, last_frame, frame_count, first_name)
+        """
+        where, params = self._where(category, quality, text, dataset, frame)
+        sql = ("SELECT d.folder, d.name AS dataset, e.eid, e.category, e.caption, e.quality_status, e.reject_reason, "
+               "e.first_frame, e.last_frame, e.frame_count, "
+               "(SELECT name FROM frames f WHERE f.dataset_id = e.dataset_id AND f.idx = e.first_frame) AS first_name "
+               "FROM events e JOIN datasets d ON d.id = e.dataset_id" + where +
+               " ORDER BY d.name, e.eid")
+        if limit: sql += f" LIMIT {int(limit)}"
+        conn = self._connect()
+        try:
+            return [dict(r) for r in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def count(self, group_by=None, **filters):
+        """事件计数；group_by 为 category / dataset / quality / reason 时返回 [(key, count), ...]"""
+        where, params = self._where(**filters)
+        conn = self._connect()
+        try:
+            if group_by is None:
+                return conn.execute("SELECT COUNT(*) FROM events e JOIN datasets d ON d.id = e.dataset_id" + where,
+                                    params).fetchone()[0]
+            col = GROUP_COLUMNS[group_by]
+            sql = (f"SELECT {col} AS key, COUNT(*) AS n FROM events e JOIN datasets d ON d.id = e.dataset_id"
+                   f"{where} GROUP BY {col} ORDER BY n DESC")
+            return [(r["key"], r["n"]) for r in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def categories(self):
+        conn = self._connect()
+        try:
+            return [r[0] for r in conn.execute("SELECT DISTINCT category FROM events ORDER BY category")]
+        finally:
+            conn.close()
+
+    def summary(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT (SELECT COUNT(*) FROM datasets), (SELECT COUNT(*) FROM events), "
+                               "(SELECT COUNT(*) FROM frames WHERE quality != 'good')").fetchone()
+            return {"datasets": row[0], "events": row[1], "poor_frames": row[2]}
+        finally:
+            conn.close()
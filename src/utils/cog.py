@@ -0,0 +1,91 @@
+import os
+import uuid
+from pathlib import Path
+
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.shutil import copy as rio_copy
+
+COG_DIR_NAME = ".cog"      # 旁路 (sidecar) COG 存放目录，位于数据集内
+COG_BLOCK_SIZE = 512
+
+
+def sidecar_path(path):
+    path = Path(path)
+    return path.parent / COG_DIR_NAME / path.name
+
+
+def resolve_source(path):
+    """
+    读取 GeoTIFF 时实际打开的文件:
+    存在比原图新的旁路 COG 时用它 (瓦片 + 内部金字塔)，否则用原图
+    """
+    cog = sidecar_path(path)
+    try:
+        if cog.exists() and cog.stat().st_mtime >= os.stat(path).st_mtime:
+            return str(cog)
+    except OSError:
+        pass
+    return str(path)
+
+
+def inspect_tiff(path):
+    """返回 GeoTIFF 的布局信息，用于判断是否需要转换"""
+    with rasterio.open(path) as src:
+        block_h, block_w = src.block_shapes[0]
+        tiled = bool(src.profile.get("tiled"))
+        overviews = src.overviews(1)
+        return {
+            "width": src.width,
+            "height": src.height,
+            "count": src.count,
+            "dtype": src.dtypes[0],
+            "block": (block_w, block_h),
+            "tiled": tiled,
+            "overviews": overviews,
+            "is_cog_like": tiled and (bool(overviews) or max(src.width, src.height) <= COG_BLOCK_SIZE),
+        }
+
+
+def _overview_factors(width, height, block=COG_BLOCK_SIZE):
+    factors, f = [], 2
+    while max(width, height) / f >= block:
+        factors.append(f)
+        f *= 2
+    return factors
+
+
+def convert_to_cog(src_path, dst_path, compress="DEFLATE"):
+    """
+    把 GeoTIFF 转为瓦片化、带内部金字塔的 Cloud-Optimized GeoTIFF
+    先写临时文件再原子替换，dst_path 可以与 src_path 相同 (原地改写)
+    临时文件名带随机后缀，同一目标的并发转换 (多个进程/重复运行) 不会互相覆盖或删除对方的临时文件
+    """
+    dst_path = Path(dst_path)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_name(f".{dst_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        try:
+            # GDAL >= 3.1 自带 COG 驱动
+            rio_copy(str(src_path), str(tmp_path), driver="COG", COMPRESS=compress,
+                     BLOCKSIZE=COG_BLOCK_SIZE, OVERVIEW_RESAMPLING="AVERAGE", BIGTIFF="IF_SAFER")
+        except Exception:
+            if tmp_path.exists(): tmp_path.unlink()
+            _convert_gtiff_fallback(src_path, tmp_path, compress)
+        os.replace(tmp_path, dst_path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+
+
+def _convert_gtiff_fallback(src_path, dst_path, compress):
+    """旧版 GDAL: 普通 GTiff 瓦片化写出后再建立内部金字塔"""
+    with rasterio.open(src_path) as src:
+        profile = src.profile.copy()
+        profile.update(driver="GTiff", tiled=True, blockxsize=COG_BLOCK_SIZE,
+                       blockysize=COG_BLOCK_SIZE, compress=compress, BIGTIFF="IF_SAFER")
+        with rasterio.open(dst_path, "w", **profile) as dst:
+            for _, window in dst.block_windows(1):
+                dst.write(src.read(window=window), window=window)
+            factors = _overview_factors(src.width, src.height)
+            if factors:
+                dst.build_overviews(factors, Resampling.average)
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+SAMPLE_PIXELS = 1 << 20          # 统计百分位时最多采样的像素数
+CHUNK_PIXELS = 1 << 20           # 应用拉伸时每块处理的像素数
+LOW_PERCENT, HIGH_PERCENT = 2, 98
+
+
+def _is_lut_dtype(dtype):
+    """8/16 位整型可以直接用查找表 (最多 65536 项)"""
+    return dtype.kind in 'ui' and dtype.itemsize <= 2
+
+
+def _band_nodata(nodata, band_count):
+    if nodata is None or np.isscalar(nodata):
+        return [nodata] * band_count
+    return list(nodata)[:band_count] + [None] * max(0, band_count - len(nodata))
+
+
+def _sample_view(img_data):
+    """等间隔抽样 (切片视图，不拷贝)，保证最多约 SAMPLE_PIXELS 个像素"""
+    h, w = img_data.shape[:2]
+    step = max(1, int(math.ceil(math.sqrt(h * w / float(SAMPLE_PIXELS)))))
+    return img_data[::step, ::step]
+
+
+def _percentiles_from_hist(values, offset, low, high):
+    hist = np.bincount(values.astype(np.int64) - offset)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    lo = int(np.searchsorted(cdf, total * low / 100.0)) + offset
+    hi = int(np.searchsorted(cdf, total * high / 100.0)) + offset
+    return float(lo), float(hi)
+
+
+def compute_stretch(img_data, nodata=None, low=LOW_PERCENT, high=HIGH_PERCENT):
+    """
+    按波段计算 low%-high% 拉伸区间 (抽样 + 直方图，忽略 nodata / NaN)
+    :param img_data: (H, W, C) 原始数据
+    :return: (lows, highs)，各为长度 C 的 float64 数组
+    """
+    sample = _sample_view(img_data)
+    band_count = img_data.shape[2]
+    nodata = _band_nodata(nodata, band_count)
+    lows, highs = np.zeros(band_count), np.ones(band_count)
+    for b in range(band_count):
+        values = sample[:, :, b].ravel()
+        if nodata[b] is not None:
+            values = values[values != nodata[b]]
+        if values.dtype.kind == 'f':
+            values = values[np.isfinite(values)]
+        if values.size == 0:
+            continue
+        if _is_lut_dtype(values.dtype):
+            offset = int(np.iinfo(values.dtype).min)
+            lows[b], highs[b] = _percentiles_from_hist(values, offset, low, high)
+        else:
+            lows[b], highs[b] = np.percentile(values, [low, high])
+    return lows, highs
+
+
+def build_lut(dtype, lo, hi, nodata=None):
+    """8/16 位整型 -> uint8 的查找表，索引为 value - dtype.min"""
+    info = np.iinfo(dtype)
+    values = np.arange(info.min, info.max + 1, dtype=np.float32)
+    lut = np.empty(values.shape, dtype=np.uint8)
+    values -= np.float32(lo)
+    values *= np.float32(255.0 / (hi - lo + 1e-6))
+    np.clip(values, 0, 255, out=values)
+    lut[:] = values
+    if nodata is not None and info.min <= nodata <= info.max:
+        lut[int(nodata) - info.min] = 0
+    return lut
+
+
+def apply_stretch(img_data, stretch, nodata=None, out=None):
+    """
+    按波段把原始数据拉伸到 uint8，按行分块处理
+    - 8/16 位整型: 查找表 (不产生浮点临时数组)
+    - 其他类型: 块内 float32 计算，nodata / NaN 置 0
+    :param stretch: compute_stretch 的返回值 (lows, highs)
+    """
+    lows, highs = stretch
+    h, w, band_count = img_data.shape
+    if out is None:
+        out = np.empty((h, w, band_count), dtype=np.uint8)
+    nodata = _band_nodata(nodata, band_count)
+    rows = max(1, CHUNK_PIXELS // max(1, w))
+
+    use_lut = _is_lut_dtype(img_data.dtype)
+    offset = int(np.iinfo(img_data.dtype).min) if use_lut else 0
+    for b in range(band_count):
+        lo, hi = float(lows[b]), float(highs[b])
+        if use_lut:
+            lut = build_lut(img_data.dtype, lo, hi, nodata[b])
+            for r0 in range(0, h, rows):
+                chunk = img_data[r0:r0 + rows, :, b]
+                if offset:
+                    chunk = chunk.astype(np.int32) - offset
+                np.take(lut, chunk, out=out[r0:r0 + rows, :, b], mode='clip')
+            continue
+
+        factor = np.float32(255.0 / (hi - lo + 1e-6))
+        for r0 in range(0, h, rows):
+            src = img_data[r0:r0 + rows, :, b]
+            chunk = src.astype(np.float32)
+            chunk -= np.float32(lo)
+            chunk *= factor
+            np.clip(chunk, 0, 255, out=chunk)
+            if nodata[b] is not None:
+                chunk[src == nodata[b]] = 0
+            # NaN 转 uint8 结果未定义，统一置 0
+            np.nan_to_num(chunk, copy=False, nan=0.0)
+            out[r0:r0 + rows, :, b] = chunk
+    return out
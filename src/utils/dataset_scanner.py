@@ -0,0 +1,129 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+IMAGE_PATTERNS = ['*.tif', '*.tiff', '*.png', '*.jpg', '*.jpeg']
+# 与 IMAGE_PATTERNS 等价的后缀集合 (全小写或全大写，与原先 glob(ext) / glob(ext.upper()) 一致)
+IMAGE_SUFFIXES = frozenset([p[1:] for p in IMAGE_PATTERNS] + [p[1:].upper() for p in IMAGE_PATTERNS])
+ANNOTATION_NAMES = ("{name}.json", "annotations.json")
+SCAN_WORKERS = 16
+
+
+def _is_image_name(name):
+    # glob 不匹配以 . 开头的文件 (例如 macOS 的 ._xxx.tif)
+    return not name.startswith('.') and os.path.splitext(name)[1] in IMAGE_SUFFIXES
+
+
+class FolderInfo:
+    """单个文件夹的扫描结果"""
+    __slots__ = ("path", "has_images", "has_json")
+
+    def __init__(self, path, has_images, has_json):
+        self.path = path
+        self.has_images = has_images
+        self.has_json = has_json
+
+
+def scan_folder(folder):
+    """
+    单次 os.scandir 遍历: 找到第一张图片即停止
+    只有含图片的文件夹才检查标注文件 (扫描途中已经看到的就不再 stat)
+    """
+    folder = Path(folder)
+    json_names = {n.format(name=folder.name) for n in ANNOTATION_NAMES}
+    found_image = has_json = False
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name in json_names:
+                    has_json = True
+                elif _is_image_name(entry.name) and entry.is_file():
+                    found_image = True
+                    break
+    except OSError:
+        return FolderInfo(folder, False, False)
+    if found_image and not has_json:
+        has_json = any((folder / n).exists() for n in json_names)
+    return FolderInfo(folder, found_image, has_json)
+
+
+def has_images(folder):
+    return scan_folder(folder).has_images
+
+
+def list_subdirs(root):
+    """一级子目录 (按名称排序)"""
+    try:
+        with os.scandir(root) as it:
+            dirs = [Path(e.path) for e in it if e.is_dir()]
+    except OSError:
+        return []
+    return sorted(dirs, key=lambda x: x.name)
+
+
+def iter_datasets(root, workers=SCAN_WORKERS, cancelled=None):
+    """
+    与 GUI 的 Open Root Folder 相同的扫描规则，按发现顺序逐个产出含图片的 FolderInfo:
+    根目录本身有图片 -> 根目录就是唯一的数据集; 否则并行扫描一级子目录
+    :param cancelled: 可选回调，返回 True 时停止提交新的扫描并尽快返回
+    """
+    root = Path(root)
+    info = scan_folder(root)
+    if info.has_images:
+        yield info
+        return
+    subdirs = list_subdirs(root)
+    if not subdirs: return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(subdirs)))) as pool:
+        futures = [pool.submit(scan_folder, d) for d in subdirs]
+        try:
+            for fut in as_completed(futures):
+                if cancelled is not None and cancelled(): break
+                info = fut.result()
+                if info.has_images: yield info
+        finally:
+            for fut in futures: fut.cancel()
+
+
+def find_datasets(root):
+    """
+    与 GUI 的 Open Root Folder 相同的扫描规则:
+    根目录本身有图片 -> 根目录就是唯一的数据集; 否则取含图片的一级子目录 (按名称排序)
+    """
+    return sorted((info.path for info in iter_datasets(root)), key=lambda x: x.name)
+
+
+def scan_images(folder):
+    """数据集内全部图片的 os.DirEntry (单次 scandir，entry.stat() 通常无需额外系统调用)"""
+    with os.scandir(folder) as it:
+        return [e for e in it if _is_image_name(e.name) and e.is_file()]
+
+
+def list_images(folder, patterns=IMAGE_PATTERNS):
+    """数据集内的全部图片路径 (去重，未排序)"""
+    folder = Path(folder)
+    if patterns is IMAGE_PATTERNS:
+        return [os.path.join(folder, e.name) for e in scan_images(folder)]
+    files = []
+    for ext in patterns: files.extend(list(folder.glob(ext))); files.extend(list(folder.glob(ext.upper())))
+    return list(set([str(f) for f in files]))
+
+
+DATE_PATTERN = re.compile(r'(\d{4})[-_](\d{2})[-_](\d{2})')
+NO_DATE = (9999, 99, 99)
+
+
+def parse_date(filename):
+    """文件名中的日期 (YYYY-MM-DD / YYYY_MM_DD) -> [y, m, d]，没有则返回 None"""
+    match = DATE_PATTERN.search(Path(filename).name)
+    return [int(match.group(1)), int(match.group(2)), int(match.group(3))] if match else None
+
+
+def date_sort_key(date):
+    return tuple(date) if date else NO_DATE
+
+
+def sort_frames(files):
+    """按文件名中的日期排序 (无日期的排在最后，同日期按文件名)，与 GUI 的帧顺序一致"""
+    return sorted(files, key=lambda f: (date_sort_key(parse_date(f)), Path(f).name))
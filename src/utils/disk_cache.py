@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+import weakref
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.image_loader import ImageLoader
+
+CACHE_DIR_NAME = ".tracker_cache"
+DEFAULT_DISK_CACHE_BYTES = 4 * 1024 * 1024 * 1024   # 每个数据集缓存上限 4GB
+# 缓存内容的格式版本: 解码 / 缩放方式改变时加 1，旧条目自然失效 (之后被 LRU 淘汰)
+CACHE_FORMAT_VERSION = 2
+
+
+class DiskFrameCache:
+    """
+    持久化的解码帧缓存 (每个数据集一个目录)
+    - 以 路径 + mtime + 文件大小 + 解码方式 (普通图片的 LANCZOS / 快速缩放) + 格式版本 作为 key，
+      源文件或解码设置变化后自动失效
+    - 显示用 uint8 数组存为 .npy，读取时 mmap，不再经过 rasterio/Pillow 解码
+    - 超过容量按最近访问时间 (文件 mtime) 淘汰；仍被 mmap 数组引用的条目不删除
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_DISK_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._open = {}   # 文件名 -> 已 mmap 的数组 (weakref)，淘汰时跳过仍在使用的
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.total_bytes = sum(f.stat().st_size for f in self.cache_dir.glob("*.npy"))
+
+    @classmethod
+    def for_dataset(cls, folder, max_bytes=DEFAULT_DISK_CACHE_BYTES):
+        return cls(Path(folder) / CACHE_DIR_NAME, max_bytes)
+
+    @staticmethod
+    def key_for(path):
+        st = os.stat(path)
+        # GeoTIFF 的显示数组与缩放方式无关，不因切换而失效
+        mode = "geotiff" if ImageLoader.is_geotiff(path) else ("lanczos" if ImageLoader.high_quality else "fast")
+        raw = f"v{CACHE_FORMAT_VERSION}|{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{mode}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, path):
+        """
+        返回: (image_memmap, meta_dict) 或 None
+        meta_dict: {"orig_size": [w, h], "stretch": [[lows], [highs]] 或 None}
+        """
+        try:
+            key = self.key_for(path)
+        except OSError:
+            return None
+        npy_path = self.cache_dir / f"{key}.npy"
+        meta_path = self.cache_dir / f"{key}.json"
+        if not npy_path.exists() or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            image = np.load(npy_path, mmap_mode='r')
+            with self._lock:
+                self._open[npy_path.name] = weakref.ref(image)
+            os.utime(npy_path)   # 记录访问时间，用于 LRU
+            return image, meta
+        except Exception as e:
+            print(f"Disk Cache Read Error: {e}")
+            return None
+
+    def put(self, path, image, orig_size, stretch=None):
+        try:
+            key = self.key_for(path)
+        except OSError:
+            return
+        npy_path = self.cache_dir / f"{key}.npy"
+        meta_path = self.cache_dir / f"{key}.json"
+        if npy_path.exists():
+            return
+        meta = {
+            "source": os.path.abspath(path),
+            "orig_size": list(orig_size),
+            "stretch": None if stretch is None else [list(map(float, v)) for v in stretch],
+        }
+        tmp = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            # 先写临时文件再原子改名，避免读到写了一半的缓存
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(image))
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp, npy_path)
+        except Exception as e:
+            print(f"Disk Cache Write Error: {e}")
+            if tmp.exists(): tmp.unlink()
+            return
+        with self._lock:
+            self.total_bytes += npy_path.stat().st_size
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            entries = []
+            for f in self.cache_dir.glob("*.npy"):
+                try:
+                    st = f.stat()
+                    entries.append((st.st_mtime, st.st_size, f))
+                except OSError:
+                    pass
+            entries.sort()
+            # 只保留仍然存活的引用 (帧缓存 / 显示中的数组释放后 weakref 失效)
+            self._open = {name: ref for name, ref in self._open.items() if ref() is not None}
+            for _, size, f in entries:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                if f.name in self._open: continue
+                try:
+                    f.unlink()
+                    f.with_suffix(".json").unlink(missing_ok=True)
+                    self.total_bytes -= size
+                except OSError:
+                    pass
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from src.utils.event_record import EventRecord, FrameRuns
+
+# 追加的记录攒一小段时间再一起写盘 + fsync (GUI 线程的编辑只进内存缓冲，不等磁盘)
+JOURNAL_FLUSH_S = 0.25
+
+
+def journal_path(folder):
+    """数据集编辑日志: {folder}/{folder.name}.journal.jsonl (与标注 JSON 放在一起)"""
+    folder = Path(folder)
+    return folder / f"{folder.name}.journal.jsonl"
+
+
+class EditJournal:
+    """
+    只追加的编辑日志 (write-ahead log)
+    - append() 只把记录放进内存缓冲；后台定时器在 flush_delay 秒后把缓冲一次写盘并 fsync，
+      连续编辑合并为一次 fsync，进程崩溃最多丢失最后 flush_delay 秒内的编辑
+    - 每条记录带递增的 seq；主 JSON 保存成功后 compact(seq) 删除已经包含在主 JSON 里的记录
+    - 所有操作都是幂等的 (整体覆盖 / 区间并集)，compact 之前崩溃导致的重复回放不会出错
+
+    记录格式 (帧区间是帧表下标，帧表记录写在引用它的记录之前；回放时与 v2 格式一样按文件名逐帧映射):
+        {"seq", "op": "frame_table", "frames": [name, ...]}
+        {"seq", "op": "create", "id", "category", "caption", "box", "frames": [[start, end], ...],
+                                    "quality_status", "reject_reason"}
+        {"seq", "op": "append", "id", "range": [start, end], "box"}
+        {"seq", "op": "frames", "id", "frames": [[start, end], ...]}
+        {"seq", "op": "box", "id", "box"}
+        {"seq", "op": "qc", "id", "quality_status", "reject_reason"}
+        {"seq", "op": "info", "id", "category", "caption"}
+        {"seq", "op": "delete", "id"}
+        {"seq", "op": "image_quality", "name", "status"}
+    """
+
+    def __init__(self, path, flush_delay=JOURNAL_FLUSH_S):
+        self.path = Path(path)
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._buffer = []           # 已编号、尚未写盘的记录
+        self._timer = None
+        self._frame_table = None    # 当前帧表 (文件名列表)
+        self._table_pending = False # 帧表变化后尚未写出
+        records = self.read()
+        self.seq = max((r.get("seq", 0) for r in records), default=0)
+
+    @classmethod
+    def for_dataset(cls, folder):
+        return cls(journal_path(folder))
+
+    def read(self):
+        """读取全部记录 (含尚未写盘的缓冲)"""
+        return self._read_file() + list(self._buffer)
+
+    def _read_file(self):
+        """读取文件中的记录；最后一行写了一半 (崩溃) 时忽略该行"""
+        if not self.path.exists(): return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line: continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[Journal] Ignored damaged record in {self.path.name}")
+        return records
+
+    def set_frame_table(self, names):
+        """帧列表 (帧序号 -> 文件名)；之后记录里的帧区间都是它的下标"""
+        with self._lock:
+            self._frame_table = list(names)
+            self._table_pending = True
+
+    def append(self, record):
+        with self._lock:
+            if ("frames" in record or "range" in record) and self._table_pending:
+                self._push({"op": "frame_table", "frames": self._frame_table})
+                self._table_pending = False
+            self._push(record)
+            if self.flush_delay <= 0:
+                self._write_buffer()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return self.seq
+
+    def _push(self, record):
+        self.seq += 1
+        record = dict(record, seq=self.seq)
+        self._buffer.append(record)
+        return record
+
+    def _write_buffer(self):
+        if not self._buffer: return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for r in self._buffer:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._buffer = []
+
+    def flush(self):
+        """把缓冲的记录写盘并 fsync"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            try:
+                self._write_buffer()
+            except Exception as e:
+                print(f"[Journal] Write failed: {e}")
+
+    def close(self):
+        self.flush()
+
+    def compact(self, upto_seq):
+        """主 JSON 已包含 seq <= upto_seq 的全部编辑: 只保留之后的记录 (原子重写)"""
+        self.flush()
+        with self._lock:
+            if not self.path.exists(): return
+            # 只重写文件；flush 之后新追加的记录留在缓冲里，之后照常追加到新文件末尾
+            records = self._read_file()
+            remaining = [r for r in records if r.get("seq", 0) > upto_seq]
+            if not remaining and not self._buffer:
+                self.path.unlink()
+                # 文件里的帧表也一起删掉了，下一条带帧的记录前重新写出
+                self._table_pending = self._frame_table is not None
+                return
+            # 剩余 (及缓冲中) 记录引用的帧表可能在被删除的部分里
+            tables = [r for r in records if r.get("op") == "frame_table" and r.get("seq", 0) <= upto_seq]
+            if tables: remaining.insert(0, tables[-1])
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for r in remaining:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+# === 记录 <-> 事件 ===
+
+def names_to_runs(pairs, image_map):
+    """旧版记录的文件名区间 [first, last] -> FrameRuns (只为读取升级前留下的日志)"""
+    runs = FrameRuns()
+    for first, last in pairs:
+        if first in image_map and last in image_map:
+            runs.add_range(image_map[first], image_map[last])
+    return runs
+
+
+def _table_remap(names, image_map):
+    """帧表下标 -> 当前帧序号 (None 表示该帧已不存在)；与当前帧列表完全一致时返回 None"""
+    remap = [image_map.get(name) for name in names]
+    if len(remap) == len(image_map) and remap == list(range(len(remap))):
+        return None
+    return remap
+
+
+def _runs_from(ranges, remap, image_map):
+    """记录中的帧区间 -> 当前数据集的 FrameRuns (与 v2 格式一样逐帧映射，删除的帧单独去掉)"""
+    if ranges and isinstance(ranges[0][0], str):
+        return names_to_runs(ranges, image_map)
+    runs = FrameRuns(ranges)
+    return runs if remap is None else runs.remapped(remap)
+
+
+def event_record(op, eid, ev):
+    """根据操作类型从事件中取出需要记录的字段 (帧区间为当前帧表下标)"""
+    rec = {"op": op, "id": eid}
+    if op in ("create", "info"):
+        rec["category"] = ev.category
+        rec["caption"] = ev.caption
+    if op in ("create", "box"):
+        rec["box"] = list(ev.box)
+    if op in ("create", "frames"):
+        rec["frames"] = [list(run) for run in ev.frames.runs()]
+    if op in ("create", "qc"):
+        rec["quality_status"] = ev.quality_status
+        rec["reject_reason"] = ev.reject_reason
+    return rec
+
+
+def replay(records, annotations, quality_map, image_map):
+    """按顺序把日志记录应用到已加载的数据上，返回实际应用的记录数"""
+    applied = 0
+    remap = None
+    for rec in records:
+        op = rec.get("op"); eid = rec.get("id")
+        ev = annotations.get(eid)
+        if op == "frame_table":
+            remap = _table_remap(rec.get("frames", []), image_map)
+            continue
+        if op == "create":
+            annotations[eid] = EventRecord(
+                category=rec.get("category", "Unk"),
+                caption=rec.get("caption", ""),
+                box=rec.get("box"),
+                frames=_runs_from(rec.get("frames", []), remap, image_map),
+                quality_status=rec.get("quality_status", "good"),
+                reject_reason=rec.get("reject_reason"),
+            )
+        elif op == "delete":
+            annotations.pop(eid, None)
+        elif op == "image_quality":
+            quality_map[rec["name"]] = rec["status"]
+        elif ev is None:
+            continue
+        elif op == "append":
+            for s, e in _runs_from([rec["range"]], remap, image_map).runs():
+                ev.frames.add_range(s, e)
+            if "box" in rec: ev.box = list(rec["box"])
+        elif op == "frames":
+            ev.frames = _runs_from(rec.get("frames", []), remap, image_map)
+        elif op == "box":
+            ev.box = list(rec["box"])
+        elif op == "qc":
+            ev.quality_status = rec.get("quality_status", "good")
+            ev.reject_reason = rec.get("reject_reason")
+        elif op == "info":
+            ev.category = rec.get("category", ev.category)
+            ev.caption = rec.get("caption", ev.caption)
+        else:
+            continue
+        applied += 1
+    return applied
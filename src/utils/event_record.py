@@ -0,0 +1,162 @@
+from bisect import bisect_left, bisect_right
+
+
+class FrameRuns:
+    """
+    事件涉及的帧集合，存为有序、互不重叠且不相邻的闭区间 [start, end]
+    - 连续几千帧的事件只占一个区间，增删 / 截断 / 格式化都按区间计算
+    - 行为与 set 一致: in / 迭代 (升序) / len / bool
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, runs=()):
+        self.starts = []
+        self.ends = []
+        for start, end in runs:
+            self.add_range(start, end)
+
+    @classmethod
+    def from_indices(cls, indices):
+        runs = cls()
+        start = prev = None
+        for i in sorted(set(indices)):
+            if prev is not None and i == prev + 1:
+                prev = i
+                continue
+            if start is not None:
+                runs.starts.append(start); runs.ends.append(prev)
+            start = prev = i
+        if start is not None:
+            runs.starts.append(start); runs.ends.append(prev)
+        return runs
+
+    def runs(self):
+        return list(zip(self.starts, self.ends))
+
+    def copy(self):
+        other = FrameRuns()
+        other.starts = list(self.starts)
+        other.ends = list(self.ends)
+        return other
+
+    def remapped(self, mapping):
+        """帧序号重新映射后的副本: mapping[旧序号] = 新序号 (None 表示该帧已不存在)"""
+        n = len(mapping)
+        return FrameRuns.from_indices(mapping[i] for i in self if i < n and mapping[i] is not None)
+
+    # === 查询 ===
+
+    def __contains__(self, idx):
+        i = bisect_right(self.starts, idx) - 1
+        return i >= 0 and idx <= self.ends[i]
+
+    def __iter__(self):
+        for start, end in zip(self.starts, self.ends):
+            yield from range(start, end + 1)
+
+    def __len__(self):
+        return sum(e - s + 1 for s, e in zip(self.starts, self.ends))
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def __eq__(self, other):
+        return isinstance(other, FrameRuns) and self.starts == other.starts and self.ends == other.ends
+
+    def __repr__(self):
+        return f"FrameRuns({self.runs()})"
+
+    def first(self):
+        return self.starts[0] if self.starts else None
+
+    def last(self):
+        return self.ends[-1] if self.ends else None
+
+    def format(self):
+        """'1-3, 8, 10-12' (1-based)"""
+        if not self.starts: return "Empty"
+        return ", ".join(f"{s + 1}" if s == e else f"{s + 1}-{e + 1}"
+                         for s, e in zip(self.starts, self.ends))
+
+    # === 修改 ===
+
+    def add_range(self, start, end):
+        """加入 [start, end]，与相交或相邻的区间合并"""
+        if end < start: return
+        lo = bisect_left(self.ends, start - 1)       # 第一个可能相接的区间
+        hi = bisect_right(self.starts, end + 1)      # 最后一个可能相接的区间之后
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def add(self, idx):
+        self.add_range(idx, idx)
+
+    def remove_range(self, start, end):
+        """删除 [start, end] 内的所有帧，必要时拆分区间"""
+        if end < start or not self.starts: return
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo >= hi: return
+        new_starts, new_ends = [], []
+        if self.starts[lo] < start:
+            new_starts.append(self.starts[lo]); new_ends.append(start - 1)
+        if self.ends[hi - 1] > end:
+            new_starts.append(end + 1); new_ends.append(self.ends[hi - 1])
+        self.starts[lo:hi] = new_starts
+        self.ends[lo:hi] = new_ends
+
+    def discard(self, idx):
+        self.remove_range(idx, idx)
+
+    def trim_after(self, current):
+        """
+        把 current 设为终点 ("Set Current as END"):
+        current 之前有帧时，补齐最后一个早于 current 的帧到 current 之间的空隙；删除 current 之后的帧
+        """
+        i = bisect_left(self.starts, current) - 1    # 最后一个起点早于 current 的区间
+        if i >= 0:
+            self.add_range(self.starts[i], current)
+        if self.ends and self.ends[-1] > current:
+            self.remove_range(current + 1, self.ends[-1])
+
+    def set_start(self, current):
+        """
+        把 current 设为起点 ("Set Current as START"):
+        current 早于原起点则向前补齐，晚于原起点则删除 current 之前的帧
+        """
+        if not self.starts: return
+        old_start = self.starts[0]
+        if current < old_start:
+            self.add_range(current, old_start - 1)
+        elif current > old_start:
+            self.remove_range(old_start, current - 1)
+
+
+class EventRecord:
+    """单个事件 (紧凑记录，取代原先的 dict)"""
+    __slots__ = ("category", "caption", "box", "frames", "quality_status", "reject_reason")
+
+    def __init__(self, category="Unk", caption="", box=None, frames=None,
+                 quality_status="good", reject_reason=None):
+        self.category = category
+        self.caption = caption
+        self.box = list(box) if box is not None else [0, 0, 0, 0]   # [x, y, w, h] 原图坐标
+        self.frames = frames if frames is not None else FrameRuns()
+        self.quality_status = quality_status
+        self.reject_reason = reject_reason
+
+    def copy(self):
+        """独立副本 (后台保存时使用，避免与 GUI 线程的修改互相影响)"""
+        return EventRecord(self.category, self.caption, self.box, self.frames.copy(),
+                           self.quality_status, self.reject_reason)
+
+    @property
+    def is_bad(self):
+        return self.quality_status == "bad"
+
+    def __repr__(self):
+        return (f"EventRecord(category={self.category!r}, frames={self.frames.runs()}, "
+                f"quality_status={self.quality_status!r})")
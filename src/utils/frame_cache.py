@@ -0,0 +1,257 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.utils.image_loader import ImageLoader
+from src.utils.tile_engine import read_preview, read_thumbnail
+
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024   # 解码帧缓存上限 1GB
+DEFAULT_PREFETCH_RADIUS = 2                # 预取 current_idx ± k
+THUMB_SIZE = 512                           # 渐进显示缩略图的最长边
+THUMB_MIN_SOURCE = 2048                    # 原图长边不超过该值时直接解码，不先显示缩略图
+DEFAULT_THUMB_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class DecodedFrame:
+    """一帧解码结果 (显示用 uint8 数组 + 元信息)"""
+    __slots__ = ("path", "image", "orig_size", "stretch")
+
+    def __init__(self, path, image, orig_size, stretch=None):
+        self.path = path
+        self.image = image          # (H, W, C) uint8
+        self.orig_size = orig_size  # (w, h)
+        self.stretch = stretch      # GeoTIFF: 逐波段拉伸区间 (lows, highs)，供瓦片引擎复用
+
+    @property
+    def nbytes(self):
+        return self.image.nbytes
+
+
+def decode_frame(path):
+    """
+    解码一帧用于显示 (纯 numpy，可在工作线程中调用)
+    GeoTIFF 只读整图预览，细节交给 TileEngine; 其他格式走 ImageLoader
+    """
+    path = str(path)
+    if ImageLoader.is_geotiff(path):
+        try:
+            image, stretch, orig_size = read_preview(path)
+        except Exception as e:
+            print(f"GeoTIFF Load Error: {e}")
+            return None
+        return DecodedFrame(path, image, orig_size, stretch)
+
+    image, _, orig_size = ImageLoader.load(path)
+    if image is None:
+        return None
+    return DecodedFrame(path, image, orig_size)
+
+
+def decode_thumbnail(path, max_dim=THUMB_SIZE):
+    """
+    快速解码一张低分辨率缩略图 (GeoTIFF 读最小 overview，JPEG 用 DCT 缩放)
+    读不便宜 (无 overview / 其他格式) 或原图本身不大时返回 None
+    """
+    path = str(path)
+    try:
+        if ImageLoader.is_geotiff(path):
+            result = read_thumbnail(path, max_dim)
+            if result is None: return None
+            image, _, orig_size = result
+        else:
+            result = ImageLoader.load_thumbnail(path, max_dim)
+            if result is None: return None
+            image, orig_size = result
+    except Exception as e:
+        print(f"Thumbnail Error: {e}")
+        return None
+    if max(orig_size) <= THUMB_MIN_SOURCE: return None
+    return DecodedFrame(path, image, orig_size)
+
+
+def subsample(image, max_dim):
+    """隔点采样到最长边不超过 max_dim (已经足够小时原样返回)"""
+    h, w = image.shape[:2]
+    step = -(-max(h, w) // max_dim)
+    if step < 2: return image
+    return np.ascontiguousarray(image[::step, ::step])
+
+
+def thumbnail_of(frame, max_dim=THUMB_SIZE):
+    """从已解码的整帧抽取缩略图 (隔点采样，只作占位显示)"""
+    if frame is None or max(frame.orig_size) <= THUMB_MIN_SOURCE: return None
+    image = subsample(frame.image, max_dim)
+    if image is frame.image: return None
+    return DecodedFrame(frame.path, image, frame.orig_size)
+
+
+class FrameCache:
+    """按字节预算淘汰的 LRU 帧缓存 (key: 图片路径)，线程安全"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            frame = self._items.get(path)
+            if frame is not None:
+                self._items.move_to_end(path)
+            return frame
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._items
+
+    def put(self, frame):
+        # 单帧超过预算直接不缓存，避免把其他帧全部挤掉
+        if frame is None or frame.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(frame.path, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._items[frame.path] = frame
+            self.total_bytes += frame.nbytes
+            while self.total_bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+
+class FramePrefetcher:
+    """
+    后台预取相邻帧:
+    - 工作线程池解码 current_idx ± radius 的帧，放入 FrameCache
+    - 离开预取窗口的、还没开始的任务会被取消
+    - load() 命中缓存直接返回；正在解码的帧等待其结果，避免重复解码
+    """
+
+    def __init__(self, cache=None, radius=DEFAULT_PREFETCH_RADIUS, workers=2, decoder=decode_frame,
+                 thumb_decoder=decode_thumbnail):
+        self.cache = cache if cache is not None else FrameCache()
+        self.radius = radius
+        self.decoder = decoder
+        # 渐进显示用的缩略图 (整帧被淘汰后仍保留，回到该帧时可以立即显示)
+        self.thumbs = FrameCache(DEFAULT_THUMB_CACHE_BYTES)
+        self.thumb_decoder = thumb_decoder
+        # 可选的持久化缓存 (DiskFrameCache)，按数据集设置
+        self.disk_cache = None
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._futures = {}   # path -> Future
+        # 可重入: 已完成的 future 在 add_done_callback 时会同步回调 _forget
+        self._lock = threading.RLock()
+
+    def _decode_into_cache(self, path):
+        disk = self.disk_cache
+        frame = None
+        if disk is not None:
+            hit = disk.get(path)
+            if hit is not None:
+                image, meta = hit
+                stretch = meta.get("stretch")
+                frame = DecodedFrame(path, image, tuple(meta["orig_size"]),
+                                     None if stretch is None else tuple(np.array(v) for v in stretch))
+        if frame is None:
+            frame = self.decoder(path)
+            if frame is not None and disk is not None:
+                disk.put(path, frame.image, frame.orig_size, frame.stretch)
+        self.cache.put(frame)
+        if path not in self.thumbs:
+            self.thumbs.put(thumbnail_of(frame))
+        return frame
+
+    def _submit(self, path):
+        """调用方需持有 self._lock"""
+        fut = self._futures.get(path)
+        if fut is None:
+            fut = self._executor.submit(self._decode_into_cache, path)
+            self._futures[path] = fut
+            fut.add_done_callback(lambda f, p=path: self._forget(p, f))
+        return fut
+
+    def _forget(self, path, fut):
+        with self._lock:
+            if self._futures.get(path) is fut:
+                del self._futures[path]
+
+    def update(self, paths, current_idx):
+        """以 current_idx 为中心调度预取 (近的优先)"""
+        wanted = []
+        for dist in range(1, self.radius + 1):
+            for idx in (current_idx + dist, current_idx - dist):
+                if 0 <= idx < len(paths):
+                    wanted.append(str(paths[idx]))
+        keep = set(wanted)
+        if 0 <= current_idx < len(paths):
+            keep.add(str(paths[current_idx]))
+
+        with self._lock:
+            for path, fut in list(self._futures.items()):
+                if path not in keep:
+                    fut.cancel()
+            for path in wanted:
+                if path not in self.cache:
+                    self._submit(path)
+
+    def load(self, path):
+        """同步获取一帧 (缓存 > 等待进行中的预取 > 当场解码)"""
+        path = str(path)
+        frame = self.cache.get(path)
+        if frame is not None:
+            return frame
+        with self._lock:
+            fut = self._futures.get(path)
+        if fut is not None and not fut.cancelled():
+            try:
+                return fut.result()
+            except Exception as e:
+                print(f"Prefetch Error: {e}")
+        return self._decode_into_cache(path)
+
+    def preview(self, path):
+        """
+        正式解码前可以立即显示的低分辨率预览 (DecodedFrame)
+        整帧已在内存缓存中时不需要预览，返回 None；否则取缩略图缓存或快速解码
+        """
+        path = str(path)
+        if path in self.cache: return None
+        thumb = self.thumbs.get(path)
+        if thumb is None and self.thumb_decoder is not None:
+            thumb = self.thumb_decoder(path)
+            self.thumbs.put(thumb)
+        return thumb
+
+    def load_scaled(self, path, max_dim):
+        """
+        同步获取一帧的缩小版 (最长边不超过 max_dim，用于播放等不需要原分辨率的场景)
+        整帧已缓存时直接抽取；否则优先快速缩略图解码，不便宜时才整帧解码 (结果进入缓存)
+        """
+        path = str(path)
+        frame = self.cache.get(path)
+        if frame is None and self.thumb_decoder is not None:
+            frame = self.thumb_decoder(path, max_dim)
+        if frame is None:
+            frame = self.load(path)
+        if frame is None: return None
+        return DecodedFrame(path, subsample(frame.image, max_dim), frame.orig_size)
+
+    def clear(self):
+        with self._lock:
+            for fut in list(self._futures.values()):
+                fut.cancel()
+            self._futures.clear()
+        self.cache.clear()
+        self.thumbs.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+from bisect import bisect_right
+
+from src.utils.event_record import FrameRuns
+
+
+def _runs_minus(a, b):
+    """a 中不属于 b 的帧 (按区间计算)"""
+    out = a.copy()
+    for start, end in zip(b.starts, b.ends):
+        out.remove_range(start, end)
+    return out
+
+
+class FrameEventIndex:
+    """
+    帧 -> 事件 ID 的倒排索引 (按区间分段，不逐帧展开)
+    - 所有事件区间的端点把时间轴切成若干段，同一段内每帧的事件集合相同；
+      events_at(idx) 二分找到所在段，渲染一帧为 O(log 段数 + 该帧事件数)
+    - 每个事件保存一份 FrameRuns 快照，update_event 按新旧区间差增删，代价与变化的区间相关
+    - 内存与区间数 (而不是帧数) 成正比，几千帧的长事件只占一两个分段
+    - 记录自上次 take_dirty() 以来覆盖数可能变化的帧，界面据此只刷新这些帧
+    """
+
+    def __init__(self):
+        self._bounds = []      # 分段起点 (升序)；第 i 段为 [bounds[i], bounds[i + 1] - 1]
+        self._ids = []         # 第 i 段上的事件 ID 集合 (最后一段总是空集)
+        self._frames = {}      # eid -> FrameRuns (快照，不与 annotations 共享)
+        self._dirty = FrameRuns()
+        self._dirty_all = True
+
+    def rebuild(self, annotations):
+        """一次扫描所有区间端点建立分段 (比逐个 update_event 少做插入和集合复制)"""
+        self._dirty_all = True
+        self._frames = {eid: data.frames.copy() for eid, data in annotations.items()}
+        events = {}     # 端点 -> [(eid, +1/-1)]
+        for eid, runs in self._frames.items():
+            for start, end in zip(runs.starts, runs.ends):
+                events.setdefault(start, []).append((eid, 1))
+                events.setdefault(end + 1, []).append((eid, -1))
+        self._bounds = []
+        self._ids = []
+        active = set()
+        for pos in sorted(events):
+            for eid, delta in events[pos]:
+                if delta > 0: active.add(eid)
+                else: active.discard(eid)
+            if self._ids and self._ids[-1] == active: continue
+            if not self._ids and not active: continue
+            self._bounds.append(pos)
+            self._ids.append(set(active))
+
+    def _segment(self, idx):
+        """idx 所在段的位置 (早于第一段返回 -1)"""
+        return bisect_right(self._bounds, idx) - 1
+
+    def _split(self, pos):
+        """保证 pos 是某段的起点，返回该段位置"""
+        i = self._segment(pos)
+        if i >= 0 and self._bounds[i] == pos: return i
+        self._bounds.insert(i + 1, pos)
+        self._ids.insert(i + 1, set(self._ids[i]) if i >= 0 else set())
+        return i + 1
+
+    def _merge(self, lo, hi):
+        """合并 [lo - 1, hi] 内事件集合相同的相邻段，并去掉开头的空段"""
+        for k in range(min(hi, len(self._bounds) - 1), max(lo, 1) - 1, -1):
+            if self._ids[k] == self._ids[k - 1]:
+                del self._bounds[k]
+                del self._ids[k]
+        while self._ids and not self._ids[0]:
+            del self._bounds[0]
+            del self._ids[0]
+
+    def _apply(self, eid, runs, add):
+        for start, end in zip(runs.starts, runs.ends):
+            self._dirty.add_range(start, end)
+            lo = self._split(start)
+            hi = self._split(end + 1)
+            for k in range(lo, hi):
+                if add: self._ids[k].add(eid)
+                else: self._ids[k].discard(eid)
+            self._merge(lo, hi)
+
+    def update_event(self, eid, frames):
+        old = self._frames.get(eid, FrameRuns())
+        new = frames.copy() if isinstance(frames, FrameRuns) else FrameRuns.from_indices(frames)
+        self._apply(eid, _runs_minus(old, new), add=False)
+        self._apply(eid, _runs_minus(new, old), add=True)
+        self._frames[eid] = new
+
+    def remove_event(self, eid):
+        self.update_event(eid, FrameRuns())
+        self._frames.pop(eid, None)
+
+    def _ids_at(self, idx):
+        i = self._segment(idx)
+        return self._ids[i] if i >= 0 else ()
+
+    def events_at(self, idx):
+        """该帧上的事件 ID (按 ID 升序，保证绘制顺序稳定)"""
+        return sorted(self._ids_at(idx))
+
+    def count_at(self, idx):
+        return len(self._ids_at(idx))
+
+    def take_dirty(self):
+        """
+        取出并清空自上次调用以来覆盖数可能变化的帧
+        :return: FrameRuns；rebuild 之后返回 None (表示全部帧都需要刷新)
+        """
+        dirty = None if self._dirty_all else self._dirty
+        self._dirty = FrameRuns()
+        self._dirty_all = False
+        return dirty
+
+    def coverage_in(self, start, end):
+        """[start, end] 内的 idx -> 覆盖数 (只含非空帧)"""
+        cov = {}
+        i = max(self._segment(start), 0)
+        while i < len(self._bounds) and self._bounds[i] <= end:
+            ids = self._ids[i]
+            if ids:
+                n = len(ids)
+                for idx in range(max(self._bounds[i], start), min(self._bounds[i + 1] - 1, end) + 1):
+                    cov[idx] = n
+            i += 1
+        return cov
+
+    def coverage(self):
+        """idx -> 覆盖该帧的事件数 (只含非空帧)；按段展开，与事件数无关"""
+        cov = {}
+        for i, ids in enumerate(self._ids):
+            if not ids: continue
+            n = len(ids)
+            for idx in range(self._bounds[i], self._bounds[i + 1]):
+                cov[idx] = n
+        return cov
+
+    def __contains__(self, eid):
+        return eid in self._frames
@@ -2,6 +2,8 @@ import numpy as np
 import rasterio
 from PIL import Image
 import warnings
+from src.utils import contrast
+from src.utils.cog import resolve_source
 # 如果你的环境里安装了 rasterio，通常需要先 import 它才能引用具体的 Warning 类
 # 如果不确定，直接用字符串忽略也可以，但在 import rasterio 后过滤更精准
 try:
@@ -12,43 +14,57 @@ except ImportError:
 Image.MAX_IMAGE_PIXELS = None
 
 MAX_TEXTURE_SIZE = 8192 
+# 单通道模式直接解码为灰度 (Grayscale8)，不再复制成 3 通道
+GRAY_MODES = ('1', 'L', 'I', 'I;16', 'F')
 
 class ImageLoader:
+    # 普通图片缩放模式: False=交互模式 (JPEG DCT 缩放/reduce + BILINEAR)，True=整图解码 + LANCZOS
+    high_quality = False
+
+    @staticmethod
+    def is_geotiff(path):
+        return str(path).lower().endswith(('.tif', '.tiff'))
+
+    @staticmethod
+    def display_scale(orig_w, orig_h):
+        """原图 -> 显示缓冲区 (Buffer) 的缩放系数，与 MAX_TEXTURE_SIZE 限制保持一致"""
+        max_dim = max(orig_w, orig_h)
+        return MAX_TEXTURE_SIZE / max_dim if max_dim > MAX_TEXTURE_SIZE else 1.0
+
     @staticmethod
-    def load(path):
+    def load(path, high_quality=None):
         """
         通用图像加载器
+        :param high_quality: 普通图片是否使用 LANCZOS 高质量缩放，None 时取 ImageLoader.high_quality
         返回: (image_data_uint8, scale_factor, original_size_tuple)
-        image_data_uint8: (H, W, C) 格式的 numpy 数组
+        image_data_uint8: (H, W, C) 格式的 C 连续 numpy 数组，C=3 (RGB) 或 C=1 (灰度)
         """
-        if path.lower().endswith(('.tif', '.tiff')):
+        if ImageLoader.is_geotiff(path):
             return ImageLoader._load_geotiff(path)
         else:
-            return ImageLoader._load_standard_image(path)
+            if high_quality is None:
+                high_quality = ImageLoader.high_quality
+            return ImageLoader._load_standard_image(path, high_quality)
 
     @staticmethod
     def _load_geotiff(path):
         try:
-            with rasterio.open(path) as src:
+            # 有旁路 COG (tools.build_cogs 生成) 时优先读取
+            with rasterio.open(resolve_source(path)) as src:
                 orig_w, orig_h = src.width, src.height
-                max_dim = max(orig_w, orig_h)
-                scale = MAX_TEXTURE_SIZE / max_dim if max_dim > MAX_TEXTURE_SIZE else 1.0
+                scale = ImageLoader.display_scale(orig_w, orig_h)
                 target_w, target_h = int(orig_w * scale), int(orig_h * scale)
                 
-                # 读取并重采样
-                if src.count >= 3:
-                    img_data = src.read([1, 2, 3], out_shape=(3, target_h, target_w))
-                    img_data = np.transpose(img_data, (1, 2, 0)) # (H, W, C)
-                else:
-                    img_data = src.read(1, out_shape=(1, target_h, target_w))
-                    img_data = np.stack([img_data]*3, axis=-1)
+                # 读取并重采样: 波段交错直接写入预分配的 (H, W, C) 缓冲区，省去 transpose/stack 拷贝
+                bands = [1, 2, 3] if src.count >= 3 else [1]
+                raw = np.empty((target_h, target_w, len(bands)), dtype=src.dtypes[0])
+                src.read(bands, out=raw.transpose(2, 0, 1))
 
-                # 简单的对比度拉伸 (去除极值)
-                p2, p98 = np.percentile(img_data, 2), np.percentile(img_data, 98)
-                img_data = np.clip((img_data - p2) / (p98 - p2 + 1e-6) * 255, 0, 255).astype(np.uint8)
-                
-                if not img_data.flags['C_CONTIGUOUS']:
-                    img_data = np.ascontiguousarray(img_data)
+                # 逐波段 2%-98% 对比度拉伸 (抽样直方图 + 查找表，忽略 nodata)
+                nodata = [src.nodatavals[b - 1] for b in bands]
+                stretch = contrast.compute_stretch(raw, nodata)
+                img_data = contrast.apply_stretch(raw, stretch, nodata)
+                del raw
                     
                 return img_data, scale, (orig_w, orig_h)
         except Exception as e:
@@ -56,23 +72,67 @@ class ImageLoader:
             return None, 1.0, (0, 0)
 
     @staticmethod
-    def _load_standard_image(path):
+    def _load_standard_image(path, high_quality=False):
         try:
             # 使用 Pillow 加载普通图片
             with Image.open(path) as img:
-                img = img.convert('RGB') # 确保是3通道
+                # 单通道保持灰度，其余统一为 RGB (已经是 RGB/L 时不再转换)
+                target_mode = 'L' if img.mode in GRAY_MODES else 'RGB'
                 orig_w, orig_h = img.size
                 
                 # 依然应用最大尺寸限制，防止超大PNG卡顿
-                max_dim = max(orig_w, orig_h)
-                scale = MAX_TEXTURE_SIZE / max_dim if max_dim > MAX_TEXTURE_SIZE else 1.0
+                scale = ImageLoader.display_scale(orig_w, orig_h)
+                target_w, target_h = int(orig_w * scale), int(orig_h * scale)
+
+                fast = scale < 1.0 and not high_quality
+                if fast:
+                    # JPEG: 解码时直接做 DCT 缩放 (1/2, 1/4, 1/8)，结果不小于目标尺寸
+                    img.draft(target_mode, (target_w, target_h))
+
+                if img.mode != target_mode:
+                    img = img.convert(target_mode)
+
+                if fast:
+                    # 其他格式 (或 DCT 缩放后仍偏大): 先整数倍 box 降采样
+                    factor = min(img.width // target_w, img.height // target_h)
+                    if factor >= 2:
+                        img = img.reduce(factor)
                 
-                if scale < 1.0:
-                    target_w, target_h = int(orig_w * scale), int(orig_h * scale)
-                    img = img.resize((target_w, target_h), Image.Resampling.LANCZOS)
+                if img.size != (target_w, target_h):
+                    resample = Image.Resampling.LANCZOS if high_quality else Image.Resampling.BILINEAR
+                    img = img.resize((target_w, target_h), resample)
                 
-                img_data = np.array(img).astype(np.uint8)
+                img_data = np.asarray(img)
+                if img_data.ndim == 2:
+                    img_data = img_data[:, :, np.newaxis]
                 return img_data, scale, (orig_w, orig_h)
         except Exception as e:
             print(f"Standard Image Load Error: {e}")
-            return None, 1.0, (0, 0)
\ No newline at end of file
+            return None, 1.0, (0, 0)
+
+    @staticmethod
+    def load_thumbnail(path, max_dim):
+        """
+        渐进显示用的快速缩略图，只支持 JPEG (解码时直接 DCT 缩放，代价远小于整图解码)
+        其他格式返回 None，GeoTIFF 见 tile_engine.read_thumbnail
+        返回: (image_data_uint8, original_size_tuple) 或 None
+        """
+        try:
+            with Image.open(path) as img:
+                if img.format != "JPEG": return None
+                target_mode = 'L' if img.mode in GRAY_MODES else 'RGB'
+                orig_w, orig_h = img.size
+                # draft 选结果不小于请求尺寸的最大缩小倍数: 按目标的一半请求，
+                # 解码结果落在 [max_dim/2, max_dim] 时不再需要额外缩放
+                s = max_dim / 2 / max(orig_w, orig_h)
+                img.draft(target_mode, (max(1, int(orig_w * s)), max(1, int(orig_h * s))))
+                if img.mode != target_mode:
+                    img = img.convert(target_mode)
+                img.thumbnail((max_dim, max_dim), Image.Resampling.BILINEAR)
+                img_data = np.asarray(img)
+                if img_data.ndim == 2:
+                    img_data = img_data[:, :, np.newaxis]
+                return img_data, (orig_w, orig_h)
+        except Exception as e:
+            print(f"Thumbnail Load Error: {e}")
+            return None
@@ -0,0 +1,178 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import rasterio
+from PIL import Image
+
+from src.utils import dataset_scanner
+from src.utils.annotation_io import atomic_write_json
+from src.utils.disk_cache import CACHE_DIR_NAME
+from src.utils.image_loader import ImageLoader
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HEADER_WORKERS = 8
+
+
+def read_header(path):
+    """只读文件头: 宽高、波段数、数据类型、仿射变换 (非 GeoTIFF 为 None)"""
+    if ImageLoader.is_geotiff(path):
+        with rasterio.open(path) as src:
+            return {
+                "width": src.width,
+                "height": src.height,
+                "count": src.count,
+                "dtype": src.dtypes[0],
+                "transform": list(src.transform)[:6],
+            }
+    with Image.open(path) as img:
+        return {
+            "width": img.width,
+            "height": img.height,
+            "count": len(img.getbands()),
+            "dtype": "uint8",
+            "transform": None,
+        }
+
+
+class DatasetManifest:
+    """
+    数据集元数据清单 (缓存在 <dataset>/.tracker_cache/manifest.json)
+    - 文件列表 (已按日期排好序)、大小、mtime、解析出的日期、栅格头信息
+    - 目录 mtime 未变: 直接使用缓存，不遍历目录、不解析日期、不读任何文件头
+    - 目录 mtime 变化但图片文件名集合没变 (通常是本程序自己写的标注 JSON / 编辑日志 / 缓存目录):
+      一次不带 stat 的 scandir 确认后只更新记录的 mtime
+    - 图片有增删: 重新 scandir，只对新增或大小/mtime 改变的文件重新读取文件头
+    注意: 原地覆盖写入某个文件不会改变文件名集合，这种情况需要 refresh() 强制校验
+    """
+
+    def __init__(self, folder, files=None, order=None, dir_mtime_ns=None):
+        self.folder = Path(folder)
+        self.files = files or {}      # 文件名 -> 元数据 dict
+        self.order = order or []      # 按帧顺序排列的文件名
+        self.dir_mtime_ns = dir_mtime_ns
+        self.rebuilt = 0              # 本次重新读取文件头的数量 (0 表示完全命中缓存)
+
+    @property
+    def path(self):
+        return self.folder / CACHE_DIR_NAME / MANIFEST_NAME
+
+    def frame_paths(self):
+        folder = str(self.folder)
+        return [os.path.join(folder, name) for name in self.order]
+
+    def info(self, path_or_name):
+        return self.files.get(Path(path_or_name).name)
+
+    # === 读写 ===
+
+    @classmethod
+    def load(cls, folder):
+        manifest = cls(folder)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if raw.get("version") != MANIFEST_VERSION:
+            return manifest
+        manifest.files = raw.get("files", {})
+        manifest.order = raw.get("order", [])
+        manifest.dir_mtime_ns = raw.get("dir_mtime_ns")
+        return manifest
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.path, {
+                "version": MANIFEST_VERSION,
+                "dir_mtime_ns": self.dir_mtime_ns,
+                "order": self.order,
+                "files": self.files,
+            }, indent=None)
+        except OSError as e:
+            # 只读目录等情况: 只是下次无法复用，不影响使用
+            print(f"Manifest Write Error: {e}")
+
+    @classmethod
+    def load_or_build(cls, folder, read_headers=True):
+        """
+        :param read_headers: False 时只扫描文件列表 (GUI 线程打开数据集时使用)，
+                             文件头之后用 fill_headers() 在后台补齐
+        """
+        manifest = cls.load(folder)
+        try:
+            dir_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return manifest
+        if manifest.dir_mtime_ns == dir_mtime and manifest.order:
+            return manifest
+        if manifest.order and manifest.same_images():
+            manifest.dir_mtime_ns = dir_mtime
+            manifest.save()
+            return manifest
+        manifest.refresh(dir_mtime, read_headers)
+        manifest.save()
+        return manifest
+
+    # === 增量重建 ===
+
+    def same_images(self):
+        """目录中的图片文件名集合与清单一致 (只看 d_type，不 stat)"""
+        try:
+            names = {e.name for e in dataset_scanner.scan_images(self.folder)}
+        except OSError:
+            return False
+        return names == self.files.keys()
+
+    def refresh(self, dir_mtime_ns, read_headers=True):
+        """重新扫描目录；未变化的文件沿用旧记录"""
+        old = self.files
+        files, stale = {}, []
+        for entry in dataset_scanner.scan_images(self.folder):
+            st = entry.stat()
+            prev = old.get(entry.name)
+            if (prev is not None and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns
+                    and ("width" in prev or not read_headers)):
+                files[entry.name] = prev
+                continue
+            files[entry.name] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "date": dataset_scanner.parse_date(entry.name),
+            }
+            stale.append(entry.name)
+
+        self.files = files
+        if read_headers and stale: self._read_headers(stale)
+        self.order = sorted(files, key=lambda n: (dataset_scanner.date_sort_key(files[n].get("date")), n))
+        # 记录扫描开始前的目录 mtime: 扫描期间有变化时下次仍会重新校验
+        self.dir_mtime_ns = dir_mtime_ns
+        self.rebuilt = len(stale)
+
+    def _read_headers(self, names):
+        def header(name):
+            try:
+                return name, read_header(os.path.join(self.folder, name))
+            except Exception as e:
+                print(f"Header Read Error ({name}): {e}")
+                return name, {}
+        with ThreadPoolExecutor(max_workers=HEADER_WORKERS) as pool:
+            for name, hdr in pool.map(header, names):
+                self.files[name].update(hdr)
+
+    def missing_headers(self):
+        return [name for name in self.order if "width" not in self.files.get(name, {})]
+
+    def fill_headers(self):
+        """
+        补读缺少的文件头并保存 (打开数据集时不读文件头，由后台线程调用这里补齐)
+        :return: 补读的文件数
+        """
+        missing = self.missing_headers()
+        if not missing: return 0
+        self._read_headers(missing)
+        self.save()
+        return len(missing)
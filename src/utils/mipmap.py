@@ -0,0 +1,27 @@
+import numpy as np
+from PIL import Image
+
+# 长边不超过该尺寸时不再继续缩小 (也不为更小的图建立金字塔)
+MIP_MIN_SIZE = 1024
+
+
+def build_mip_levels(image, min_size=MIP_MIN_SIZE, cancelled=None):
+    """
+    逐级 2x2 盒式滤波缩小 (PIL reduce)，返回从大到小的 uint8 数组列表 (不含原图)
+    - image: (H, W, C) uint8，C = 1 或 3
+    - 长边 <= min_size 时停止；原图本身不超过 min_size 时返回空列表
+    - cancelled: 可选回调，返回 True 时提前结束并返回已生成的级别
+    """
+    h, w, c = image.shape
+    if max(h, w) <= min_size: return []
+    mode = "L" if c == 1 else "RGB"
+    src = image[:, :, 0] if c == 1 else image
+    pil = Image.fromarray(np.ascontiguousarray(src), mode)
+    levels = []
+    while max(pil.size) > min_size and min(pil.size) >= 2:
+        if cancelled is not None and cancelled(): break
+        pil = pil.reduce(2)
+        level = np.asarray(pil)
+        if c == 1: level = level[:, :, None]
+        levels.append(np.ascontiguousarray(level))
+    return levels
@@ -0,0 +1,49 @@
+import math
+
+# 每条边的网格数 (单元格边长 = 图像长边 / GRID_CELLS)
+GRID_CELLS = 32
+
+
+class BoxGrid:
+    """
+    矩形框的均匀网格索引 (点选命中测试)
+    - 每个框登记到它覆盖的所有单元格，点查询只检查该点所在单元格里的框
+    - 框按传入顺序编号，query_point 返回的编号升序排列 (编号越大越靠上层)
+    """
+
+    def __init__(self, boxes, cell_size):
+        """
+        :param boxes: [(x, y, w, h), ...]
+        :param cell_size: 单元格边长 (与 boxes 同一坐标系)
+        """
+        self.boxes = list(boxes)
+        self.cell = max(float(cell_size), 1.0)
+        self.cells = {}
+        for i, (x, y, w, h) in enumerate(self.boxes):
+            for key in self._cells_for(x, y, x + w, y + h):
+                self.cells.setdefault(key, []).append(i)
+
+    @classmethod
+    def for_image(cls, boxes, image_w, image_h):
+        return cls(boxes, max(image_w, image_h) / GRID_CELLS)
+
+    def _cells_for(self, x0, y0, x1, y1):
+        c = self.cell
+        for cx in range(math.floor(x0 / c), math.floor(x1 / c) + 1):
+            for cy in range(math.floor(y0 / c), math.floor(y1 / c) + 1):
+                yield cx, cy
+
+    def query_point(self, px, py):
+        """包含该点 (含边界) 的框编号，升序"""
+        c = self.cell
+        hits = []
+        for i in self.cells.get((math.floor(px / c), math.floor(py / c)), ()):
+            x, y, w, h = self.boxes[i]
+            if x <= px <= x + w and y <= py <= y + h:
+                hits.append(i)
+        return hits
+
+    def top_at(self, px, py):
+        """最上层 (编号最大) 的命中框编号，没有命中返回 None"""
+        hits = self.query_point(px, py)
+        return hits[-1] if hits else None
@@ -0,0 +1,221 @@
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from src.utils import contrast
+from src.utils.cog import resolve_source
+
+TILE_SIZE = 512          # 瓦片边长 (该层级下的像素)
+MAX_CACHED_TILES = 256   # LRU 中最多保留的瓦片数 (512x512x3 约 0.75MB/块)
+PREVIEW_SIZE = 2048      # 整图预览的最长边，只用于缩小看全图
+
+
+def read_preview(path, max_dim=PREVIEW_SIZE):
+    """
+    读取整图低分辨率预览 (会自动命中 overview)，并以此确定全图统一的拉伸区间
+    返回: (preview_uint8, stretch, original_size)，stretch 为 contrast.compute_stretch 的结果
+    """
+    with rasterio.open(resolve_source(path)) as src:
+        return _read_stretched(src, max_dim)
+
+
+def read_thumbnail(path, max_dim):
+    """
+    渐进显示用的快速缩略图: 只在有 overview 时读取 (会命中最小可用层级)
+    没有 overview 时返回 None —— 整图重采样的代价和正式加载差不多，不值得先读一遍
+    返回值同 read_preview
+    """
+    with rasterio.open(resolve_source(path)) as src:
+        if not src.overviews(1): return None
+        return _read_stretched(src, max_dim)
+
+
+def _read_stretched(src, max_dim):
+    bands = [1, 2, 3] if src.count >= 3 else [1]
+    nodata = [src.nodatavals[b - 1] for b in bands]
+    scale = min(1.0, max_dim / max(src.width, src.height))
+    pw, ph = max(1, int(src.width * scale)), max(1, int(src.height * scale))
+    raw = _read_hwc(src, bands, None, pw, ph)
+    stretch = contrast.compute_stretch(raw, nodata)
+    return contrast.apply_stretch(raw, stretch, nodata), stretch, (src.width, src.height)
+
+
+def _read_hwc(src, bands, window, out_w, out_h):
+    """波段交错直接读入预分配的 (H, W, C) 缓冲区"""
+    raw = np.empty((out_h, out_w, len(bands)), dtype=src.dtypes[0])
+    src.read(bands, window=window, out=raw.transpose(2, 0, 1))
+    return raw
+
+
+class TileEngine:
+    """
+    视口驱动的 GeoTIFF 瓦片引擎
+    - 只读取当前视口需要的窗口，并按缩放比例选择金字塔层级 (overview)
+    - 读好的瓦片进入 LRU 缓存，内存只和屏幕大小相关，与原图大小无关
+    - 所有坐标均为原图像素坐标 (full-res)
+    """
+
+    def __init__(self, path, tile_size=TILE_SIZE, max_tiles=MAX_CACHED_TILES, workers=2, preview=None):
+        """:param preview: 已解码的 (preview_uint8, stretch)，为空时自行读取"""
+        self.path = str(path)
+        # 实际读取的文件 (优先旁路 COG)
+        self.source = resolve_source(self.path)
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+
+        with rasterio.open(self.source) as src:
+            self.width, self.height = src.width, src.height
+            self.band_indexes = [1, 2, 3] if src.count >= 3 else [1]
+            self.nodata = [src.nodatavals[b - 1] for b in self.band_indexes]
+            factors = src.overviews(1) or []
+
+        # 可用的降采样层级: 1 (原图) + 2 的幂，直到整图能放进一块瓦片
+        max_level = 1
+        while max(self.width, self.height) / (max_level * 2) >= tile_size:
+            max_level *= 2
+        self.levels = sorted(set([1] + [f for f in factors if f <= max_level] +
+                                 [2 ** i for i in range(1, int(math.log2(max_level)) + 1)]))
+
+        self._cache = OrderedDict()   # key -> uint8 (H, W, C)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._handles = []
+        self._closed = False
+        self._running = 0             # 正在执行的读取数 (关闭后等它们结束再释放句柄)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+        if preview is None:
+            image, stretch, _ = read_preview(self.path)
+        else:
+            image, stretch = preview
+        self.preview = image
+        self.stretch = stretch   # 全图统一的逐波段拉伸区间，保证瓦片之间颜色一致
+
+    # === 数据集句柄 (每个线程一个, GDAL 句柄不能跨线程共享) ===
+
+    def _dataset(self):
+        src = getattr(self._local, "src", None)
+        if src is None:
+            src = rasterio.open(self.source)
+            self._local.src = src
+            with self._lock:
+                self._handles.append(src)
+        return src
+
+    def _read(self, window, out_w, out_h):
+        return _read_hwc(self._dataset(), self.band_indexes, window, out_w, out_h)
+
+    # === 层级 / 瓦片几何 ===
+
+    def level_for_scale(self, screen_per_orig):
+        """
+        根据"每个原图像素占多少屏幕像素"选择层级:
+        选不超过 1/screen_per_orig 的最大层级，保证瓦片分辨率不低于屏幕分辨率
+        """
+        if screen_per_orig <= 0:
+            return self.levels[-1]
+        target = 1.0 / screen_per_orig
+        level = self.levels[0]
+        for lv in self.levels:
+            if lv <= target:
+                level = lv
+        return level
+
+    def preview_per_orig(self):
+        if self.preview is None:
+            return 0.0
+        return self.preview.shape[1] / float(self.width)
+
+    def tile_rect(self, key):
+        """瓦片对应的原图区域 (x, y, w, h)"""
+        level, tx, ty = key
+        span = self.tile_size * level
+        x, y = tx * span, ty * span
+        return x, y, min(span, self.width - x), min(span, self.height - y)
+
+    def tiles_for_region(self, x0, y0, x1, y1, level):
+        """覆盖原图区域 [x0, x1) x [y0, y1) 的瓦片 key 列表"""
+        span = self.tile_size * level
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width, x1), min(self.height, y1)
+        if x1 <= x0 or y1 <= y0:
+            return []
+        return [(level, tx, ty)
+                for ty in range(int(y0 // span), int(math.ceil(y1 / span)))
+                for tx in range(int(x0 // span), int(math.ceil(x1 / span)))]
+
+    # === 缓存与异步读取 ===
+
+    def get_tile(self, key):
+        with self._lock:
+            tile = self._cache.get(key)
+            if tile is not None:
+                self._cache.move_to_end(key)
+            return tile
+
+    def request(self, keys, callback=None):
+        """后台读取缺失的瓦片，读完后调用 callback(key) (在工作线程中调用)"""
+        with self._lock:
+            if self._closed:
+                return
+            missing = [k for k in keys if k not in self._cache and k not in self._pending]
+            self._pending.update(missing)
+        try:
+            for key in missing:
+                self._executor.submit(self._fetch, key, callback)
+        except RuntimeError:
+            pass    # 其他线程刚刚 close()，线程池已关闭
+
+    def _fetch(self, key, callback):
+        with self._lock:
+            if self._closed:
+                self._pending.discard(key)
+                return
+            self._running += 1
+        try:
+            level = key[0]
+            x, y, w, h = self.tile_rect(key)
+            out_w, out_h = max(1, int(math.ceil(w / level))), max(1, int(math.ceil(h / level)))
+            tile = contrast.apply_stretch(self._read(Window(x, y, w, h), out_w, out_h),
+                                          self.stretch, self.nodata)
+            with self._lock:
+                if self._closed: return
+                self._cache[key] = tile
+                while len(self._cache) > self.max_tiles:
+                    self._cache.popitem(last=False)
+        except Exception as e:
+            print(f"Tile Load Error {key}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+                self._running -= 1
+                release = self._closed and self._running == 0
+            if release: self._release()
+        if callback and not self._closed:
+            callback(key)
+
+    def close(self):
+        """
+        不等待: 取消排队中的读取后立即返回 (在 GUI 线程翻帧时调用)
+        正在进行的读取 (粗层级读条带 TIFF 可能要几秒) 结束后由最后一个工作线程释放句柄
+        """
+        with self._lock:
+            if self._closed: return
+            self._closed = True
+            self._cache.clear()
+            release = self._running == 0
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if release: self._release()
+
+    def _release(self):
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for src in handles:
+            src.close()
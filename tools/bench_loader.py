@@ -0,0 +1,105 @@
+"""
+图像加载基准测试 (无需启动 GUI)
+
+每个文件在独立子进程中加载，统计耗时与峰值内存 (ru_maxrss；Windows 上用 psutil 的 peak_wset)，
+测量范围: ImageLoader.load + 包装为 QImage (与 GUI 显示路径一致)；
+未安装 PyQt6 时只测量 ImageLoader.load
+
+用法:
+    python -m tools.bench_loader path/to/a.tif path/to/b.jpg [--repeat 3] [--quality]
+    --quality: 普通图片使用 LANCZOS 高质量模式 (默认为交互模式)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    """进程峰值内存 (MB)；无法获取时为 nan"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss 单位: macOS 为字节，Linux 为 KB
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    try:
+        import psutil
+    except ImportError:
+        return float("nan")
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+
+
+def run_child(path, repeat, high_quality):
+    from src.utils.image_loader import ImageLoader
+    try:
+        from src.ui.image_utils import array_to_qimage
+    except ImportError:
+        # 服务器上没有 PyQt6: 只测解码
+        array_to_qimage = None
+
+    base_rss = _peak_rss_mb()
+    times = []
+    shape = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        img_data, _, _ = ImageLoader.load(path, high_quality=high_quality)
+        if img_data is None:
+            print(json.dumps({"path": path, "error": "load failed"}))
+            return
+        q_img = array_to_qimage(img_data) if array_to_qimage is not None else None
+        times.append(time.perf_counter() - t0)
+        shape = img_data.shape
+        del q_img, img_data
+
+    print(json.dumps({
+        "path": path,
+        "shape": list(shape),
+        "best_s": min(times),
+        "mean_s": sum(times) / len(times),
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_delta_mb": _peak_rss_mb() - base_rss,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ImageLoader decode time and peak RSS")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quality", action="store_true", help="use the LANCZOS quality path for JPEG/PNG")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.paths[0], args.repeat, args.quality)
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'file':<40} {'shape':<18} {'best(s)':>8} {'mean(s)':>8} {'peak RSS(MB)':>13} {'delta(MB)':>10}")
+    for path in args.paths:
+        cmd = [sys.executable, "-m", "tools.bench_loader", "--child", "--repeat", str(args.repeat), path]
+        if args.quality:
+            cmd.append("--quality")
+        proc = subprocess.run(cmd,
+                              cwd=root, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            print(f"{os.path.basename(path):<40} failed: {proc.stderr.strip()[-200:]}")
+            continue
+        r = json.loads(lines[-1])
+        if "error" in r:
+            print(f"{os.path.basename(path):<40} {r['error']}")
+            continue
+        shape = "x".join(str(v) for v in r["shape"])
+        print(f"{os.path.basename(path):<40} {shape:<18} {r['best_s']:>8.2f} {r['mean_s']:>8.2f} "
+              f"{r['peak_rss_mb']:>13.0f} {r['peak_delta_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
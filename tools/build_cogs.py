@@ -0,0 +1,116 @@
+"""
+数据集预处理: 把条带 (stripped)、无金字塔的 GeoTIFF 转为瓦片化的 Cloud-Optimized GeoTIFF
+不依赖 PyQt，可在服务器上直接运行
+
+扫描规则与 GUI 的 "Open Root Folder" 一致。默认生成旁路文件 <dataset>/.cog/<name>，
+GUI 读取时会自动优先使用 (原图保持不变); --inplace 则直接原子替换原图。
+
+用法:
+    python -m tools.build_cogs /data/root --dry-run
+    python -m tools.build_cogs /data/root --workers 4 [--inplace] [--force] [--compress DEFLATE]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.utils.cog import convert_to_cog, inspect_tiff, sidecar_path
+from src.utils.dataset_scanner import find_datasets, list_images
+from src.utils.image_loader import ImageLoader
+
+
+def collect_tiffs(root):
+    tiffs = []
+    for folder in find_datasets(root):
+        tiffs.extend(sorted(p for p in list_images(folder) if ImageLoader.is_geotiff(p)))
+    return tiffs
+
+
+def plan_job(path, inplace, force):
+    """返回 (action, info): action 为 convert / skip / error"""
+    try:
+        info = inspect_tiff(path)
+    except Exception as e:
+        return "error", {"error": str(e)}
+    if not inplace:
+        side = sidecar_path(path)
+        if side.exists() and side.stat().st_mtime >= os.stat(path).st_mtime and not force:
+            return "skip", dict(info, reason="sidecar up to date")
+    if info["is_cog_like"] and not force:
+        return "skip", dict(info, reason="already tiled with overviews")
+    return "convert", info
+
+
+def convert_job(path, inplace, compress):
+    """进程池中执行的单个转换任务，返回 (输入文件大小, 耗时)"""
+    t0 = time.perf_counter()
+    # 转换前记录大小: --inplace 时转换后 path 已是输出文件
+    size = os.path.getsize(path)
+    dst = path if inplace else sidecar_path(path)
+    convert_to_cog(path, dst, compress=compress)
+    return size, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert dataset GeoTIFFs to tiled COGs with overviews")
+    parser.add_argument("root", help="root folder (same as 'Open Root Folder' in the GUI)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be converted")
+    parser.add_argument("--inplace", action="store_true", help="rewrite the original files instead of writing .cog/ sidecars")
+    parser.add_argument("--force", action="store_true", help="convert even if the file already looks cloud-optimized")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--compress", default="DEFLATE", help="DEFLATE / LZW / ZSTD / NONE")
+    args = parser.parse_args(argv)
+
+    tiffs = collect_tiffs(args.root)
+    if not tiffs:
+        print("No GeoTIFFs found.")
+        return 0
+
+    todo, skipped, errors = [], 0, 0
+    for path in tiffs:
+        action, info = plan_job(path, args.inplace, args.force)
+        name = os.path.relpath(path, args.root)
+        if action == "error":
+            errors += 1
+            print(f"ERROR    {name}: {info['error']}")
+            continue
+        layout = (f"{info['width']}x{info['height']}x{info['count']} {info['dtype']} "
+                  f"block={info['block'][0]}x{info['block'][1]} overviews={info['overviews'] or '-'}")
+        if action == "skip":
+            skipped += 1
+            print(f"SKIP     {name} [{layout}] ({info['reason']})")
+        else:
+            todo.append(path)
+            print(f"CONVERT  {name} [{layout}]")
+
+    total_in = sum(os.path.getsize(p) for p in todo)
+    print(f"\n{len(tiffs)} tiffs: {len(todo)} to convert ({total_in / 1e6:.1f} MB), "
+          f"{skipped} skipped, {errors} unreadable")
+    if args.dry_run or not todo:
+        return 0 if errors == 0 else 1
+
+    t0 = time.perf_counter()
+    done_bytes, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(convert_job, p, args.inplace, args.compress): p for p in todo}
+        for i, fut in enumerate(as_completed(futures), 1):
+            name = os.path.relpath(futures[fut], args.root)
+            try:
+                size, secs = fut.result()
+                done_bytes += size
+                elapsed = time.perf_counter() - t0
+                print(f"[{i}/{len(todo)}] {name} {size / 1e6:.1f} MB in {secs:.1f}s "
+                      f"(overall {done_bytes / 1e6 / max(elapsed, 1e-6):.1f} MB/s)")
+            except Exception as e:
+                failed += 1
+                print(f"[{i}/{len(todo)}] {name} FAILED: {e}")
+
+    elapsed = time.perf_counter() - t0
+    print(f"\nConverted {len(todo) - failed}/{len(todo)} files, {done_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+          f"({done_bytes / 1e6 / max(elapsed, 1e-6):.1f} MB/s, {(len(todo) - failed) / max(elapsed, 1e-6):.2f} files/s)")
+    return 0 if failed == 0 and errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+全局标注目录 (Catalog): 把根目录下所有数据集的标注索引到 <root>/.tracker_catalog.sqlite，跨数据集查询
+不依赖 PyQt，可在服务器上直接运行；GUI 中启用 "全局标注目录 (Catalog)" 后使用的是同一个数据库
+
+sync 只重新索引标注文件 mtime 有变化的数据集 (--force 全部重建)，已删除的数据集会从目录中移除。
+query 的过滤条件可以任意组合；--group-by 输出分组计数而不是事件列表。
+
+用法:
+    python -m tools.catalog sync /data/root [--force] [--workers 8]
+    python -m tools.catalog query /data/root --category 建筑施工 --quality bad
+    python -m tools.catalog query /data/root --text 塔吊 --limit 20
+    python -m tools.catalog query /data/root --frame 2023-05-01.tif
+    python -m tools.catalog query /data/root --quality bad --group-by category
+"""
+import argparse
+import sys
+import time
+
+from src.utils.catalog import Catalog, GROUP_COLUMNS
+
+
+def cmd_sync(catalog, args):
+    t0 = time.perf_counter()
+    total, synced = catalog.sync_root(args.root, workers=args.workers, force=args.force)
+    summary = catalog.summary()
+    print(f"Synced {synced}/{total} datasets in {time.perf_counter() - t0:.2f}s "
+          f"({summary['events']} events, {summary['poor_frames']} poor frames)")
+    return 0
+
+
+def cmd_query(catalog, args):
+    filters = {"category": args.category, "quality": args.quality, "text": args.text,
+               "dataset": args.dataset, "frame": args.frame}
+    t0 = time.perf_counter()
+    if args.group_by:
+        groups = catalog.count(group_by=args.group_by, **filters)
+        elapsed = time.perf_counter() - t0
+        for key, n in groups:
+            print(f"{n:8d}  {key}")
+        print(f"\n{len(groups)} groups in {elapsed * 1e3:.1f} ms")
+        return 0
+
+    rows = catalog.query(limit=args.limit, **filters)
+    total = catalog.count(**filters)
+    elapsed = time.perf_counter() - t0
+    for row in rows:
+        qc = "bad:" + (row["reject_reason"] or "") if row["quality_status"] == "bad" else "good"
+        frames = "-" if row["first_frame"] is None else f"{row['first_frame'] + 1}-{row['last_frame'] + 1}"
+        print(f"{row['dataset']}\tID {row['eid']}\t{row['category']}\t{qc}\t{frames}\t{row['caption']}")
+    shown = f", showing {len(rows)}" if total > len(rows) else ""
+    print(f"\n{total} events{shown} in {elapsed * 1e3:.1f} ms")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index all annotations under a root folder and query across datasets")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_sync = sub.add_parser("sync", help="index (changed) datasets under the root")
+    p_sync.add_argument("root", help="root folder (same as 'Open Root Folder' in the GUI)")
+    p_sync.add_argument("--force", action="store_true", help="re-index every dataset")
+    p_sync.add_argument("--workers", type=int, default=8, help="parallel annotation readers")
+
+    p_query = sub.add_parser("query", help="query events across datasets")
+    p_query.add_argument("root", help="root folder with an existing catalog")
+    p_query.add_argument("--category")
+    p_query.add_argument("--quality", choices=["good", "bad"])
+    p_query.add_argument("--text", help="caption / category keyword (full-text)")
+    p_query.add_argument("--dataset", help="dataset folder name")
+    p_query.add_argument("--frame", help="frame file name: events covering this frame")
+    p_query.add_argument("--group-by", choices=sorted(GROUP_COLUMNS), help="print counts per group")
+    p_query.add_argument("--limit", type=int, default=100)
+
+    args = parser.parse_args(argv)
+    catalog = Catalog.for_root(args.root)
+    if args.command == "sync":
+        return cmd_sync(catalog, args)
+    return cmd_query(catalog, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+标注文件格式转换: 当前格式 (逐帧文件名列表 + 全量 image_quality, indent=4) <-> 紧凑格式 v2
+不依赖 PyQt，可在服务器上直接运行
+
+扫描规则与 GUI 的 "Open Root Folder" 一致，帧顺序与 GUI 相同 (按文件名日期排序)。
+读取 {folder}.json (不存在时读旧版 annotations.json)，结果写回 {folder}.json (原子替换)，
+并报告转换前后的文件大小和解析耗时。
+
+用法:
+    python -m tools.convert_annotations /data/root --dry-run
+    python -m tools.convert_annotations /data/root [--to v2|v1] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from src.utils import annotation_io
+from src.utils.annotation_io import FORMAT_V1, FORMAT_V2
+from src.utils.dataset_scanner import find_datasets, list_images, sort_frames
+
+
+def timed_load(path, image_map, repeat):
+    """json.load + 解析为事件记录的最短耗时 (秒)"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = annotation_io.load_annotations(path, image_map)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def convert_dataset(folder, version, dry_run, repeat):
+    src_path, is_legacy = annotation_io.find_annotation_file(folder)
+    if src_path is None:
+        return None
+    names = [Path(p).name for p in sort_frames(list_images(folder))]
+    image_map = {name: i for i, name in enumerate(names)}
+
+    src_size = os.path.getsize(src_path)
+    src_time, (annotations, quality_map, src_version) = timed_load(src_path, image_map, repeat)
+    info = {"folder": Path(folder).name, "events": len(annotations), "frames": len(names),
+            "src": src_path.name, "src_version": src_version, "src_size": src_size, "src_time": src_time}
+    if src_version == version and not is_legacy:
+        info["status"] = "already v%d" % version
+        return info
+    if dry_run:
+        info["status"] = "would convert"
+        return info
+
+    dst_path = annotation_io.annotation_path(folder)
+    annotation_io.save_annotations(dst_path, annotations, names, quality_map, version)
+    dst_time, _ = timed_load(dst_path, image_map, repeat)
+    info.update(status="converted", dst_size=os.path.getsize(dst_path), dst_time=dst_time)
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert dataset annotation files between the current and compact v2 formats")
+    parser.add_argument("root", help="root folder (same as 'Open Root Folder' in the GUI)")
+    parser.add_argument("--to", choices=["v1", "v2"], default="v2", help="target format (default: v2)")
+    parser.add_argument("--dry-run", action="store_true", help="only report sizes and parse times")
+    parser.add_argument("--repeat", type=int, default=3, help="parse each file N times and keep the best time")
+    args = parser.parse_args(argv)
+    version = FORMAT_V2 if args.to == "v2" else FORMAT_V1
+
+    total_src = total_dst = 0
+    converted = failed = 0
+    for folder in find_datasets(args.root):
+        try:
+            info = convert_dataset(folder, version, args.dry_run, max(1, args.repeat))
+        except (OSError, ValueError, KeyError) as e:
+            failed += 1
+            print(f"ERROR    {Path(folder).name}: {e}")
+            continue
+        if info is None: continue
+        line = (f"{info['folder']}: {info['src']} v{info['src_version']} {info['src_size'] / 1e3:.1f} KB, "
+                f"parse {info['src_time'] * 1e3:.1f} ms ({info['events']} events, {info['frames']} frames)")
+        if info["status"] == "converted":
+            converted += 1
+            total_src += info["src_size"]; total_dst += info["dst_size"]
+            line += (f" -> v{version} {info['dst_size'] / 1e3:.1f} KB, parse {info['dst_time'] * 1e3:.1f} ms "
+                     f"({info['dst_size'] / max(info['src_size'], 1):.1%} size)")
+        else:
+            line += f" [{info['status']}]"
+        print(line)
+
+    if converted:
+        print(f"\nConverted {converted} files: {total_src / 1e6:.2f} MB -> {total_dst / 1e6:.2f} MB")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())